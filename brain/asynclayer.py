@@ -0,0 +1,111 @@
+"""
+asyncio facade for database - contains connectAsync() and AsyncConnection class
+"""
+
+import asyncio
+import concurrent.futures
+import functools
+
+from . import interface
+from .connection import connect, TRANSACTED_METHODS
+
+# methods, calls to which will be forwarded to connection object
+_PURE_METHODS = ['begin', 'beginSync', 'beginAsync', 'commit', 'rollback',
+	'getRemoveConflicts']
+_CONNECTION_METHODS = _PURE_METHODS + TRANSACTED_METHODS
+
+
+async def connectAsync(*args, **kwds):
+	"""
+	Connect to database.
+	Parameters are the same as for connect().
+	Returns AsyncConnection object.
+	"""
+	executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+	# connection must be created in the thread it will be used in
+	# (some engines do not allow using connections from other threads)
+	loop = asyncio.get_running_loop()
+	try:
+		conn = await loop.run_in_executor(executor, functools.partial(connect, *args, **kwds))
+	except:
+		executor.shutdown(wait=False)
+		raise
+
+	return AsyncConnection(conn, executor)
+
+
+class _Transaction:
+	"""
+	Asynchronous context manager for synchronous transaction.
+	Commits transaction on exit, or rolls it back if exception was raised.
+	"""
+
+	def __init__(self, conn):
+		self._conn = conn
+
+	async def __aenter__(self):
+		await self._conn.beginSync()
+		return self._conn
+
+	async def __aexit__(self, exc_type, exc_value, traceback):
+		if exc_type is None:
+			await self._conn.commit()
+		else:
+			# transaction may have been already finished by error handler
+			try:
+				await self._conn.rollback()
+			except interface.FacadeError:
+				pass
+
+		# do not suppress the exception
+		return False
+
+
+class AsyncConnection:
+	"""
+	Wrapper on top of object with Connection interface, which provides
+	coroutine versions of its methods.
+	All calls are performed in a separate thread, dedicated to this connection,
+	so that they do not block the event loop; calls to different connections
+	can be processed simultaneously.
+	"""
+
+	def __init__(self, conn, executor):
+		self._conn = conn
+		self._executor = executor
+
+	async def _run(self, func, *args, **kwds):
+		"""Call given function in connection thread"""
+		loop = asyncio.get_running_loop()
+		return await loop.run_in_executor(self._executor,
+			functools.partial(func, *args, **kwds))
+
+	def transaction(self):
+		"""
+		Returns asynchronous context manager, which wraps synchronous transaction:
+		async with conn.transaction():
+			...
+		"""
+		return _Transaction(self)
+
+	async def close(self):
+		"""
+		Disconnect from database.
+		All uncommitted changes will be lost.
+		"""
+		try:
+			await self._run(self._conn.close)
+		finally:
+			self._executor.shutdown(wait=False)
+
+	def __getattr__(self, name):
+		"""Coroutine handlers generator"""
+
+		if name not in _CONNECTION_METHODS:
+			raise AttributeError("Unknown method: " + name)
+
+		async def handler(*args, **kwds):
+			return await self._run(getattr(self._conn, name), *args, **kwds)
+
+		return handler
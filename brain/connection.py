@@ -2,23 +2,44 @@
 Facade for database - contains connect() and Connection class
 """
 
+import ast
 import copy
 import inspect
+import linecache
+import re
+import threading
+import weakref
 
 from . import interface, logic, engine, op
 from .interface import Field
 from .data import *
 
 # methods, which should be handled using the transaction logic
-TRANSACTED_METHODS = ['create', 'modify', 'read', 'delete', 'insert',
-	'readByMask', 'readByMasks', 'insertMany', 'deleteMany', 'objectExists', 'search',
+TRANSACTED_METHODS = ['create', 'createMany', 'modify', 'read', 'delete', 'insert',
+	'readByMask', 'readByMasks', 'readMany', 'insertMany', 'deleteMany', 'objectExists',
+	'search', 'searchCount', 'searchExists', 'searchRead', 'searchPage', 'explainSearch',
 	'dump', 'repair']
 
-def connect(engine_tag, *args, remove_conflicts=False, **kwds):
+# transacted methods, which do not change database contents
+READ_ONLY_METHODS = ['read', 'readByMask', 'readByMasks', 'readMany', 'objectExists',
+	'search', 'searchCount', 'searchExists', 'searchRead', 'searchPage', 'explainSearch', 'dump']
+
+# transacted methods, which take search condition as positional arguments
+SEARCH_METHODS = ['search', 'searchCount', 'searchExists', 'searchRead', 'searchPage',
+	'explainSearch']
+
+def connect(engine_tag, *args, remove_conflicts=False, storage=None, lists=None,
+		fulltext=None, **kwds):
 	"""
 	Connect to database.
 	engine_tag - tag of engine which handles the database layer
 	remove_conflicts - default setting of this parameter for modify() and insert()
+	storage - storage layout for new database ('tables' or 'eav');
+		if None, the layout of existing database or 'tables' is used
+	lists - format of lists for new database ('dense' or 'sparse');
+		if None, the format of existing database or 'dense' is used
+	fulltext - full-text index mode for new database ('none' or 'all');
+		if None, the mode of existing database or 'none' is used
 	args and kwds - engine-specific parameters
 	Returns Connection object for local connections or session ID for remote connections.
 	"""
@@ -38,7 +59,12 @@ def connect(engine_tag, *args, remove_conflicts=False, **kwds):
 			engine_kwds[key] = kwds[key]
 
 	engine_obj = engine_class(*args, **engine_kwds)
-	return Connection(engine_obj, remove_conflicts=remove_conflicts)
+	try:
+		return Connection(engine_obj, remove_conflicts=remove_conflicts, storage=storage,
+			lists=lists, fulltext=fulltext)
+	except:
+		engine_obj.close()
+		raise
 
 def _isNotSearchCondition(arg):
 	"""
@@ -131,31 +157,223 @@ def _propagateInversion(condition):
 		_propagateInversion(condition.operand2)
 
 
+# comparison operators, which can be used in lambdas
+_LAMBDA_COMPARISONS = {ast.Eq: op.EQ, ast.Lt: op.LT, ast.Gt: op.GT,
+	ast.LtE: op.LTE, ast.GtE: op.GTE}
+
+# comparison operators, which give the same result if operands are swapped
+_SWAPPED_COMPARISONS = {op.EQ: op.EQ, op.LT: op.GT, op.GT: op.LT,
+	op.LTE: op.GTE, op.GTE: op.LTE}
+
+# cache of parsed source files, {file name: (list of lines, module AST)}
+_parsed_sources = {}
+
+# cache of found lambdas, {code object: Lambda node}
+_lambda_nodes = weakref.WeakKeyDictionary()
+
+def _findLambdaNode(func):
+	"""Find AST node of the lambda in its source file"""
+
+	code = func.__code__
+	if code in _lambda_nodes:
+		return _lambda_nodes[code]
+
+	if func.__name__ != '<lambda>':
+		raise interface.FormatError("Only lambda can be used as search condition")
+
+	lines = linecache.getlines(code.co_filename, func.__globals__)
+	if len(lines) == 0:
+		raise interface.FormatError("Source code of the lambda is not available")
+
+	# source lines are not changed while they are cached by linecache
+	cached = _parsed_sources.get(code.co_filename)
+	if cached is None or cached[0] is not lines:
+		cached = (lines, ast.parse("".join(lines)))
+		_parsed_sources[code.co_filename] = cached
+
+	nodes = [node for node in ast.walk(cached[1])
+		if isinstance(node, ast.Lambda) and node.lineno == code.co_firstlineno]
+
+	# several lambdas in one line can be distinguished by positions of their instructions
+	if len(nodes) > 1 and hasattr(code, 'co_positions'):
+		positions = [(line, col) for line, end_line, col, end_col in code.co_positions()
+			if line is not None and col is not None and end_col is not None and end_col > col]
+		nodes = [node for node in nodes if any(
+			(node.body.lineno, node.body.col_offset) <= position <=
+				(node.body.end_lineno, node.body.end_col_offset)
+			for position in positions)]
+
+	if len(nodes) != 1:
+		raise interface.FormatError("Cannot find source code of the lambda")
+
+	_lambda_nodes[code] = nodes[0]
+	return nodes[0]
+
+
+class _LambdaTranslator:
+	"""Translator of restricted lambda to search condition in list form"""
+
+	def __init__(self, func):
+		self._func = func
+		self._node = _findLambdaNode(func)
+
+		args = self._node.args
+		if len(args.args) != 1 or args.vararg is not None or args.kwarg is not None or \
+				len(args.kwonlyargs) > 0 or len(getattr(args, 'posonlyargs', [])) > 0:
+			raise interface.FormatError("Lambda should have exactly one argument")
+		self._arg = args.args[0].arg
+
+		# values in lambda can refer to its closure
+		code = func.__code__
+		self._locals = {name: cell.cell_contents
+			for name, cell in zip(code.co_freevars, func.__closure__ or ())}
+
+	def translate(self):
+		"""Returns list with search condition"""
+		body = self._node.body
+
+		# lambda, which is always true, matches all objects
+		if isinstance(body, ast.Constant) and body.value is True:
+			return []
+
+		return self._translateCondition(body)
+
+	def _error(self, message, node):
+		source = ast.unparse(node) if hasattr(ast, 'unparse') else ast.dump(node)
+		return interface.FormatError(message + ": " + source)
+
+	def _dependsOnObject(self, node):
+		return any(isinstance(child, ast.Name) and child.id == self._arg
+			for child in ast.walk(node))
+
+	def _evaluate(self, node):
+		"""Evaluate expression, which does not depend on the object"""
+		if self._dependsOnObject(node):
+			raise self._error("Value should not depend on the object", node)
+
+		expression = ast.Expression(body=node)
+		code = compile(expression, self._func.__code__.co_filename, 'eval')
+		return eval(code, self._func.__globals__, self._locals)
+
+	def _translatePath(self, node):
+		"""Returns path for expression like o['key'][0]"""
+		path = []
+		while isinstance(node, ast.Subscript):
+			key = node.slice
+			# before Python 3.9 keys were wrapped in Index nodes
+			if type(key).__name__ == 'Index':
+				key = key.value
+			path.insert(0, self._evaluate(key))
+			node = node.value
+
+		if not isinstance(node, ast.Name) or node.id != self._arg or len(path) == 0:
+			raise self._error("Field of the object is expected", node)
+
+		return path
+
+	def _translateCondition(self, node):
+		if isinstance(node, ast.BoolOp):
+			operator = op.AND if isinstance(node.op, ast.And) else op.OR
+			result = [self._translateCondition(node.values[0])]
+			for value in node.values[1:]:
+				result += [operator, self._translateCondition(value)]
+			return result
+
+		if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+			return [op.NOT, self._translateCondition(node.operand)]
+
+		if isinstance(node, ast.Compare):
+			# chained comparisons are joined by AND
+			operands = [node.left] + node.comparators
+			result = [self._translateComparison(operands[0], node.ops[0], operands[1])]
+			for i in range(1, len(node.ops)):
+				result += [op.AND,
+					self._translateComparison(operands[i], node.ops[i], operands[i + 1])]
+			return result[0] if len(result) == 1 else result
+
+		if isinstance(node, ast.Call) and len(node.args) == 2 and len(node.keywords) == 0 and \
+				not self._dependsOnObject(node.func) and self._evaluate(node.func) is re.search:
+			return [self._translatePath(node.args[1]), op.REGEXP,
+				self._evaluate(node.args[0])]
+
+		raise self._error("Cannot translate to search condition", node)
+
+	def _translateComparison(self, left, operator, right):
+
+		if isinstance(operator, (ast.In, ast.NotIn)):
+			values = list(self._evaluate(right))
+			if len(values) == 0:
+				raise self._error("Cannot search for values from empty collection", right)
+
+			path = self._translatePath(left)
+			result = [[path, op.EQ, values[0]]]
+			for value in values[1:]:
+				result += [op.OR, [path, op.EQ, value]]
+
+			return [op.NOT, result] if isinstance(operator, ast.NotIn) else result
+
+		if isinstance(operator, ast.NotEq):
+			return [op.NOT] + self._translateComparison(left, ast.Eq(), right)
+
+		if type(operator) not in _LAMBDA_COMPARISONS:
+			raise self._error("Cannot translate comparison",
+				ast.Compare(left=left, ops=[operator], comparators=[right]))
+
+		comparison = _LAMBDA_COMPARISONS[type(operator)]
+		if self._dependsOnObject(left):
+			return [self._translatePath(left), comparison, self._evaluate(right)]
+		else:
+			return [self._translatePath(right), _SWAPPED_COMPARISONS[comparison],
+				self._evaluate(left)]
+
+def _prepareSearchArgs(args):
+	"""
+	If search condition is given as a lambda, returns arguments with equivalent
+	condition in list form; otherwise returns arguments unchanged.
+	"""
+	if len(args) == 1 and callable(args[0]):
+		condition = _LambdaTranslator(args[0]).translate()
+		return (condition,) if len(condition) > 0 else ()
+	return args
+
+
+class _TransactionState(threading.local):
+	"""State of transaction, separate for each thread"""
+
+	def __init__(self):
+		self.transaction = False
+		self.sync = False
+		self.requests = []
+
+
 class TransactedConnection:
 	"""
 	Class which implemets basic transaction logic
 	(including special logic for synchronous and asynchronous transactions).
+	Transaction belongs to the thread, which has started it; requests from other
+	threads are processed as if there is no transaction in progress.
 	"""
 
 	def __init__(self):
-		self.__transaction = False
-		self.__sync = False
-		self.__requests = []
+		self.__state = _TransactionState()
 
 	def _sync(self):
-		return self.__sync
+		return self.__state.sync
+
+	def _inTransaction(self):
+		return self.__state.transaction
 
 	def begin(self, sync):
 		"""Begin synchronous or asynchronous transaction."""
 
-		if self.__transaction:
+		if self.__state.transaction:
 			raise interface.FacadeError("Transaction is already in progress")
 
 		self._begin(sync)
 
-		self.__requests = []
-		self.__transaction = True
-		self.__sync = sync
+		self.__state.requests = []
+		self.__state.transaction = True
+		self.__state.sync = sync
 
 	def beginAsync(self):
 		"""
@@ -198,12 +416,12 @@ class TransactedConnection:
 		Commit current transaction.
 		Returns results in case of asynchronous transaction.
 		"""
-		if not self.__transaction:
+		if not self.__state.transaction:
 			raise interface.FacadeError("Transaction is not in progress")
 
-		self.__transaction = False
+		self.__state.transaction = False
 
-		if self.__sync:
+		if self.__state.sync:
 		# Synchronous transaction - just try to commit whatever was done
 			self._commit()
 		else:
@@ -218,7 +436,7 @@ class TransactedConnection:
 			prepared_commit_args, prepared_commit_kwds = self._prepareRequest('commit')
 
 			requests = [('begin', prepared_begin_args, prepared_begin_kwds)] + \
-				self.__requests + \
+				self.__state.requests + \
 				[('commit', prepared_commit_args, prepared_commit_kwds)]
 
 			try:
@@ -243,16 +461,23 @@ class TransactedConnection:
 
 	def rollback(self):
 		"""Rollback current transaction"""
-		if not self.__transaction:
+		if not self.__state.transaction:
 			raise interface.FacadeError("Transaction is not in progress")
 
-		self.__transaction = False
-		if self.__sync:
+		self.__state.transaction = False
+		if self.__state.sync:
 			self._rollback()
 
 	def _onError(self):
 		"""Default transaction error handler"""
-		self.__transaction = False
+		self.__state.transaction = False
+
+	def _concurrentReads(self):
+		"""
+		Returns True if read-only requests outside of transactions
+		should be passed to _handleReadOnlyRequest()
+		"""
+		return False
 
 	def close(self):
 		"""
@@ -264,7 +489,16 @@ class TransactedConnection:
 	def __transacted(self, name, *args, **kwds):
 		"""Transacted method handler"""
 
-		if not self.__transaction:
+		# lambdas cannot be passed to remote connections, so they are translated here
+		if name in SEARCH_METHODS:
+			args = _prepareSearchArgs(args)
+
+		if not self.__state.transaction:
+			if name in READ_ONLY_METHODS and self._concurrentReads():
+			# read-only request can be processed in separate transaction,
+			# without touching the state of this object
+				return self._handleReadOnlyRequest(name, *args, **kwds)
+
 		# if transaction is not started, start the asynchronous transaction
 			self.beginAsync()
 			getattr(self, name)(*args, **kwds)
@@ -279,7 +513,7 @@ class TransactedConnection:
 			self._onError()
 			raise
 
-		if self.__sync:
+		if self.__state.sync:
 		# synchronous transaction is currently in progress
 
 			try:
@@ -294,7 +528,7 @@ class TransactedConnection:
 
 		else:
 		# asynchronous transaction is currently in progress
-			self.__requests.append((name, prepared_args, prepared_kwds))
+			self.__state.requests.append((name, prepared_args, prepared_kwds))
 
 	def __getattr__(self, name):
 		"""Transacted methods handlers generator"""
@@ -308,10 +542,12 @@ class TransactedConnection:
 class Connection(TransactedConnection):
 	"""Main control class of the database"""
 
-	def __init__(self, engine, remove_conflicts=False):
+	def __init__(self, engine, remove_conflicts=False, storage=None, lists=None,
+			fulltext=None):
 		TransactedConnection.__init__(self)
 		self._engine = engine
-		self._logic = logic.LogicLayer(self._engine)
+		self._logic = logic.LogicLayer(self._engine, storage=storage, lists=lists,
+			fulltext=fulltext)
 		self._remove_conflicts = remove_conflicts
 
 		# Since this class handles asynchronous transaction as if it is
@@ -323,12 +559,19 @@ class Connection(TransactedConnection):
 			'commit': self._engine.commit,
 			'begin': self._manual_begin,
 			'create': self._logic.processCreateRequest,
+			'createMany': self._logic.processCreateManyRequest,
 			'read': self._logic.processReadRequest,
 			'readByMask': self._logic.processReadRequest,
 			'readByMasks': self._logic.processReadRequest,
+			'readMany': self._logic.processReadManyRequest,
 			'delete': self._logic.processDeleteRequest,
 			'deleteMany': self._logic.processDeleteRequest,
 			'search': self._logic.processSearchRequest,
+			'searchCount': self._logic.processSearchCountRequest,
+			'searchExists': self._logic.processSearchExistsRequest,
+			'searchRead': self._logic.processSearchReadRequest,
+			'searchPage': self._logic.processSearchPageRequest,
+			'explainSearch': self._logic.processExplainSearchRequest,
 			'modify': self._logic.processModifyRequest,
 			'insert': self._logic.processInsertRequest,
 			'insertMany': self._logic.processInsertRequest,
@@ -341,16 +584,16 @@ class Connection(TransactedConnection):
 		"""Get current default value of remove_conflicts keyword."""
 		return self._remove_conflicts
 
-	def _engine_begin(self):
-		self._engine.begin()
+	def _engine_begin(self, write=True):
+		self._engine.begin(write=write)
 		self._transaction = True
 
 	def _begin(self, sync):
 		if sync:
 			self._engine_begin()
 
-	def _manual_begin(self, sync):
-		self._engine_begin()
+	def _manual_begin(self, sync, write=True):
+		self._engine_begin(write=write)
 
 	def _commit(self):
 		self._transaction = False
@@ -365,6 +608,21 @@ class Connection(TransactedConnection):
 			self._rollback()
 		TransactedConnection._onError(self)
 
+	def _concurrentReads(self):
+		return self._engine.supportsConcurrentReads()
+
+	def _handleReadOnlyRequest(self, name, *args, **kwds):
+		"""Process request in read-only transaction, which can run in any thread"""
+		prepared_args, prepared_kwds = self._prepareRequest(name, *args, **kwds)
+
+		self._engine.beginRead()
+		try:
+			result = self._handlers[name](*prepared_args, **prepared_kwds)
+		finally:
+			self._engine.endRead()
+
+		return self._processResult(name, result)
+
 	def _handleRequests(self, requests):
 		"""Start/stop transaction, handle exceptions"""
 
@@ -372,8 +630,15 @@ class Connection(TransactedConnection):
 		# package to the underlying layer.
 		# Currently we handle asynchronous and synchronous transaction
 		# similarly - just calling corresponding Logic class methods
+		# contents of asynchronous transaction are known beforehand,
+		# so the engine does not have to prepare for writing if there are only reads
+		write = self._sync() or \
+			any(name not in READ_ONLY_METHODS for name, args, kwds in requests[1:-1])
+
 		res = []
 		for name, args, kwds in requests:
+			if name == 'begin':
+				kwds = dict(kwds, write=write)
 			res.append(self._handlers[name](*args, **kwds))
 		if self._sync():
 			return res
@@ -389,6 +654,16 @@ class Connection(TransactedConnection):
 	def _process_readByMasks(self, result):
 		return self._process_read(result)
 
+	def _process_readMany(self, result):
+		return [self._process_read(fields) for fields in result]
+
+	def _process_searchRead(self, result):
+		for i, e in enumerate(result):
+			# IDs have even indexes, lists of fields have odd ones
+			if i % 2 == 1 and e is not None:
+				result[i] = self._process_read(e)
+		return result
+
 	def _process_dump(self, result):
 		for i, e in enumerate(result):
 			# IDs have even indexes, lists of fields have odd ones
@@ -399,6 +674,32 @@ class Connection(TransactedConnection):
 	def _close(self):
 		self._engine.close()
 
+	def _checkStreamingAllowed(self):
+		if self._inTransaction() and not self._sync():
+			raise interface.FacadeError("Results cannot be streamed " +
+				"during asynchronous transaction")
+
+	def iterSearch(self, *condition, **kwds):
+		"""
+		Same as search(), but returns iterator over found object IDs,
+		which are fetched from database when they are requested.
+		Can be used inside synchronous transaction or outside of transactions.
+		"""
+		self._checkStreamingAllowed()
+		(request,), kwds = self._prepare_search(*_prepareSearchArgs(condition), **kwds)
+		return self._logic.iterSearchRequest(request)
+
+	def iterDump(self):
+		"""
+		Same as dump(), but returns iterator over pairs (object ID, contents),
+		which are fetched from database when they are requested.
+		Can be used inside synchronous transaction or outside of transactions.
+		"""
+		self._checkStreamingAllowed()
+		(request,), kwds = self._prepare_dump()
+		return ((obj_id, self._process_read(fields))
+			for obj_id, fields in self._logic.iterDumpRequest(request))
+
 	def _prepare_modify(self, id, path, value, remove_conflicts=None):
 		"""
 		Modify existing object.
@@ -424,6 +725,11 @@ class Connection(TransactedConnection):
 		path - path to read from (root by default)
 		masks - if specified, read only paths which start with one of given masks
 		"""
+		path, masks = self._prepareReadFields(path, masks)
+		return (interface.ReadRequest(id, path=path, masks=masks),), {}
+
+	def _prepareReadFields(self, path, masks):
+		"""Returns field objects for path and masks of read request"""
 		if masks is not None:
 			masks = [Field(self._engine, mask) for mask in masks]
 
@@ -433,7 +739,7 @@ class Connection(TransactedConnection):
 				for mask in masks:
 					mask.addNamePrefix(path.name)
 
-		return (interface.ReadRequest(id, path=path, masks=masks),), {}
+		return path, masks
 
 	def _prepare_readByMask(self, id, mask=None):
 		"""
@@ -451,6 +757,17 @@ class Connection(TransactedConnection):
 		"""
 		return self._prepare_read(id, path=None, masks=masks)
 
+	def _prepare_readMany(self, ids, path=None, masks=None):
+		"""
+		Read data structures from several objects.
+		ids - list of object IDs
+		path - path to read from (root by default)
+		masks - if specified, read only paths which start with one of given masks
+		Returns list of data structures in the same order as ids.
+		"""
+		path, masks = self._prepareReadFields(path, masks)
+		return (interface.ReadManyRequest(ids, path=path, masks=masks),), {}
+
 	def _prepare_insert(self, id, path, value, remove_conflicts=None):
 		"""
 		Insert value into list.
@@ -503,12 +820,24 @@ class Connection(TransactedConnection):
 		return (interface.DeleteRequest(id, [Field(self._engine, path) for path in paths]
 			if paths is not None else None),), {}
 
-	def _prepare_search(self, *condition):
+	def _prepare_search(self, *condition, order_by=None, descending=False,
+			limit=None, offset=None, cursor=None):
 		"""
 		Search for object with specified fields.
 		condition - [[NOT, ]condition, operator, condition] or
-		[[NOT, ]field_name, operator, value]
-		Returns list of object IDs.
+		[[NOT, ]field_name, operator, value], or lambda with one argument;
+		lambda is translated using its source code, so lambdas without source file
+		(typed in interactive interpreter, passed to python -c, created by exec()
+		or eval()) are rejected with FormatError
+		order_by - path to the field, whose values define the order of objects
+		(objects without this field go last); objects with equal values are ordered by IDs
+		descending - if True, the order is reversed
+		limit - maximum number of returned IDs
+		offset - number of found objects to skip
+		cursor - cursor of the last object of previous page, returned by searchPage()
+		with the same ordering parameters; only objects, which follow it, are returned
+		Returns list of object IDs; if none of ordering and paging parameters
+		is given, the order of IDs is not defined.
 		"""
 
 		# syntax sugar: you may not wrap plain condition in a list
@@ -516,13 +845,65 @@ class Connection(TransactedConnection):
 			condition = list(condition)
 
 		condition_obj = _listToSearchCondition(condition, engine=self._engine)
-		request = interface.SearchRequest(condition_obj)
+		request = interface.SearchRequest(condition_obj,
+			order_by=Field(self._engine, order_by) if order_by is not None else None,
+			descending=descending, limit=limit, offset=offset, cursor=cursor)
 
 		if request.condition is not None:
 			_propagateInversion(request.condition)
 
 		return (request,), {}
 
+	def _prepare_searchCount(self, *condition):
+		"""
+		Count objects with specified fields.
+		condition - same as for search()
+		Returns number of found objects.
+		"""
+		return self._prepare_search(*condition)
+
+	def _prepare_searchExists(self, *condition):
+		"""
+		Check whether there are objects with specified fields.
+		condition - same as for search()
+		Returns True if at least one object satisfies the condition.
+		"""
+		return self._prepare_search(*condition)
+
+	def _prepare_searchRead(self, *condition, masks=None, order_by=None, descending=False,
+			limit=None, offset=None, cursor=None):
+		"""
+		Search for objects with specified fields and read them.
+		condition, order_by, descending, limit, offset, cursor - same as for search()
+		masks - if specified, read only paths which start with one of given masks
+		Returns list [object ID, data structure, ...] in the same format as dump();
+		objects, which do not have fields matching masks, have None instead of data.
+		"""
+		(search_request,), kwds = self._prepare_search(*condition, order_by=order_by,
+			descending=descending, limit=limit, offset=offset, cursor=cursor)
+		path, masks = self._prepareReadFields(None, masks)
+		return (interface.SearchReadRequest(search_request, masks=masks),), {}
+
+	def _prepare_searchPage(self, *condition, order_by=None, descending=False,
+			limit=None, offset=None, cursor=None):
+		"""
+		Search for objects with specified fields, returning the cursor for the next page.
+		condition, order_by, descending, limit, offset, cursor - same as for search()
+		Returns list [list of object IDs, cursor]; cursor does not depend on the last
+		found object being still in database, and can be passed to search() or searchPage()
+		to get objects, which follow it. If nothing is found, given cursor is returned.
+		"""
+		return self._prepare_search(*condition, order_by=order_by, descending=descending,
+			limit=limit, offset=offset, cursor=cursor)
+
+	def _prepare_explainSearch(self, *condition):
+		"""
+		Describe the plan of search for object with specified fields.
+		condition - same as for search()
+		Returns string with the tree of operations and estimated numbers of records.
+		"""
+		return self._prepare_search(*condition)
+
 	def _prepare_create(self, data, path=None):
 		"""
 		Create object with specified contents.
@@ -539,6 +920,16 @@ class Connection(TransactedConnection):
 
 		return (interface.CreateRequest(fields),), {}
 
+	def _prepare_createMany(self, data_list):
+		"""
+		Create several objects with specified contents.
+		data_list - list of initial contents for each object
+		Returns list of new object IDs.
+		"""
+		return (interface.CreateManyRequest(
+			[[Field(self._engine, path, val) for path, val in treeToPaths(data)]
+				for data in data_list]),), {}
+
 	def _prepare_objectExists(self, id):
 		"""
 		Check whether object exists.
@@ -554,9 +945,14 @@ class Connection(TransactedConnection):
 		"""
 		return (interface.DumpRequest(),), {}
 
-	def _prepare_repair(self):
-		"""Rebuild caching tables in database using existing contents."""
-		return (interface.RepairRequest(),), {}
+	def _prepare_repair(self, max_tables=None):
+		"""
+		Rebuild caching tables in database using existing contents.
+		If max_tables is given, only this number of field tables is processed,
+		and repair should be continued by subsequent calls.
+		Returns tuple (number of processed field tables, total number of field tables).
+		"""
+		return (interface.RepairRequest(max_tables=max_tables),), {}
 
 
 class ObjectCache:
@@ -654,6 +1050,10 @@ class ObjectCache:
 
 		saveToTree(self._root, id, path, copy.deepcopy(data))
 
+	def createMany(self, ids, data_list):
+		for id, data in zip(ids, data_list):
+			self.create(id, data)
+
 	def modify(self, id, path, value, remove_conflicts=None):
 		self._memorize_modified(id)
 
@@ -711,6 +1111,9 @@ class ObjectCache:
 	def readByMask(self, id, mask=None):
 		return self.read(id, path=None, masks=[mask] if mask is not None else None)
 
+	def readMany(self, ids, path=None, masks=None):
+		return [self.read(id, path=path, masks=masks) for id in ids]
+
 	def readByMasks(self, id, masks=None):
 		return self.read(id, path=None, masks=masks)
 
@@ -771,6 +1174,7 @@ class CachedConnection(TransactedConnection):
 
 		self._sync_handlers = {
 			'create': self._handleSyncCreation,
+			'createMany': self._handleSyncCreationMany,
 			'modify': self._handleSyncModification,
 			'insert': self._handleSyncModification,
 			'insertMany': self._handleSyncModification,
@@ -780,7 +1184,8 @@ class CachedConnection(TransactedConnection):
 			'repair': self._handleSyncRepair,
 			'read': self._handleSyncRead,
 			'readByMask': self._handleSyncRead,
-			'readByMasks': self._handleSyncRead
+			'readByMasks': self._handleSyncRead,
+			'readMany': self._handleSyncReadMany
 		}
 
 	def getRemoveConflicts(self):
@@ -811,6 +1216,11 @@ class CachedConnection(TransactedConnection):
 		self._cache.create(new_id, value, path)
 		return new_id
 
+	def _handleSyncCreationMany(self, name, data_list):
+		new_ids = self._conn.createMany(data_list)
+		self._cache.createMany(new_ids, data_list)
+		return new_ids
+
 	def _handleSyncModification(self, name, *args, **kwds):
 		# Object modification - perform on connection,
 		# update cache if necessary and perform same
@@ -829,11 +1239,11 @@ class CachedConnection(TransactedConnection):
 		else:
 			return True
 
-	def _handleSyncRepair(self, name):
+	def _handleSyncRepair(self, name, *args, **kwds):
 		# theoretically, after repair anything can happen,
 		# so cache is no longer valid
 		self._cache.invalidate()
-		self._conn.repair()
+		return self._conn.repair(*args, **kwds)
 
 	def _handleSyncRead(self, name, id, *args, **kwds):
 		# Read to cache first if necessary, then read from cache
@@ -841,6 +1251,24 @@ class CachedConnection(TransactedConnection):
 			self._cache.create(id, self._conn.read(id))
 		return getattr(self._cache, name)(id, *args, **kwds)
 
+	def _handleSyncReadMany(self, name, ids, *args, **kwds):
+		# Read all objects, which are not cached, with one request,
+		# then read from cache
+		missing = self._getMissingIds(ids, self._cache.getIDs())
+		if len(missing) > 0:
+			self._cache.createMany(missing, self._conn.readMany(missing))
+		return self._cache.readMany(ids, *args, **kwds)
+
+	def _getMissingIds(self, ids, cached_ids):
+		"""Returns list of unique IDs from the given list, which are not cached"""
+		missing = []
+		found = set()
+		for id in ids:
+			if id not in cached_ids and id not in found:
+				missing.append(id)
+				found.add(id)
+		return missing
+
 	def _handleSync(self, requests):
 		"""Handle requests during synchronous transaction"""
 
@@ -864,7 +1292,8 @@ class CachedConnection(TransactedConnection):
 
 		# for each request, if corresponding element of this array is True,
 		# it means that additional request was performed, reading or
-		# checking object existence
+		# checking object existence (for readMany(), the element is
+		# the list of objects, which were read additionally)
 		additional_requests = []
 
 		# TODO: probably this select-case can be turned into map of handlers
@@ -897,6 +1326,14 @@ class CachedConnection(TransactedConnection):
 					self._conn.read(id)
 					cached_ids.add(id)
 
+			elif name == 'readMany':
+			# read all objects, which are not cached, with one request
+				missing = self._getMissingIds(args[0], cached_ids)
+				if len(missing) > 0:
+					additional_request = missing
+					self._conn.readMany(missing)
+					cached_ids.update(missing)
+
 			elif name == 'objectExists':
 			# checking if object exists - if it is not cached,
 			# we will have to ask connection
@@ -934,6 +1371,11 @@ class CachedConnection(TransactedConnection):
 				self._cache.create(new_id, *args, **kwds)
 				result = new_id
 
+			elif name == 'createMany':
+				new_ids = raw_results.pop()
+				self._cache.createMany(new_ids, *args, **kwds)
+				result = new_ids
+
 			elif name in ['modify', 'insert', 'insertMany', 'delete', 'deleteMany']:
 			# update cache if there was additional request
 				id = args[0]
@@ -959,8 +1401,14 @@ class CachedConnection(TransactedConnection):
 					self._cache.create(id, raw_results.pop())
 				result = getattr(self._cache, name)(*args, **kwds)
 
+			elif name == 'readMany':
+				if additional_request:
+					self._cache.createMany(additional_request, raw_results.pop())
+				result = self._cache.readMany(*args, **kwds)
+
 			elif name == 'repair':
 				self._cache.invalidate()
+				result = raw_results.pop()
 			else:
 				result = raw_results.pop()
 
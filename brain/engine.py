@@ -13,8 +13,15 @@ except:
 import re
 import os
 import os.path
+import hashlib
+import functools
+import collections
+import threading
+import queue
+import itertools
 
 from . import interface
+from .data import AccessLogger
 
 def getEngineTags():
 	"""Get list of available engine tags"""
@@ -30,6 +37,27 @@ def getEngineByTag(tag):
 	else:
 		return _DB_ENGINES[tag]
 
+@functools.lru_cache(maxsize=1024)
+def _convertPlaceholders(sql_str):
+	"""Replace '?' by '$n's (postgre placeholder syntax)"""
+
+	class Counter:
+		def __init__(self):
+			self.c = 0
+
+		def __call__(self, match_obj):
+			self.c += 1
+			return "$" + str(self.c)
+
+	# FIXME: it is not 100% reliable, because there can be other ?'s in string
+	# but since we are doing this substitution before inserting table names,
+	# it will work for now
+	return re.sub(r'\?', Counter(), sql_str)
+
+def _isSchemaQuery(sql_str):
+	"""Returns True if given query changes database schema"""
+	return sql_str.split(None, 1)[0].upper() in ('CREATE', 'DROP', 'ALTER')
+
 
 class _Engine:
 	"""Engine layer class interface"""
@@ -53,22 +81,205 @@ class _Engine:
 		"""Transform string value so that it could be safely used as table name"""
 		return '"' + s.replace('"', '""') + '"'
 
+	def getIndexName(self, l):
+		"""
+		Get name of index from list; the last element of the list
+		should be the name of the table, which the index belongs to
+		"""
+		return self.getNameString(l)
+
+	_INSERT_CHUNK_SIZE = 1000 # maximum number of rows passed to engine at once
+
 	def insertMany(self, table_name, value_lists):
-		value_string = ", ".join(["?"] * len(value_lists[0]))
-		value_strings = ["(" + value_string + ")"] * len(value_lists)
-		query = ", ".join(value_strings)
+		"""
+		Insert several rows to given table.
+		Rows are passed to the engine in chunks, using the same statement
+		for each chunk, so that query size limits are not exceeded.
+		"""
+		value_lists = iter(value_lists)
+		while True:
+			chunk = list(itertools.islice(value_lists, self._INSERT_CHUNK_SIZE))
+			if len(chunk) == 0:
+				break
+
+			value_string = ", ".join(["?"] * len(chunk[0]))
+			self.executeMany("INSERT INTO {} VALUES (" + value_string + ")",
+				[table_name], chunk)
+
+	def _initIdAllocator(self, id_block_size):
+		"""Initialize state of object ID allocator"""
+		if not isinstance(id_block_size, int) or id_block_size < 1:
+			raise interface.EngineError("ID block size must be a positive integer")
+
+		self._id_block_size = id_block_size
+		self._reserved_ids = collections.deque() # IDs which can be handed out
+		self._max_issued_id = 0 # maximum ID handed out by this engine object
+
+		# True if current block was reserved using changes, which are not committed yet
+		self._id_block_uncommitted = False
 
-		values = []
-		for value_list in value_lists:
-			values += value_list
+	def getNewId(self):
+		"""
+		Returns new unique object ID.
+		IDs are reserved in database by blocks and handed out from memory.
+		"""
+		if len(self._reserved_ids) == 0:
+			self._reserved_ids.extend(self._reserveIds(self._id_block_size,
+				self._max_issued_id + 1))
+
+		new_id = self._reserved_ids.popleft()
+		self._max_issued_id = max(self._max_issued_id, new_id)
+		return new_id
+
+	def getNewIds(self, count):
+		"""
+		Returns list of given number of new unique object IDs.
+		IDs missing from memory are reserved in database by one block.
+		"""
+		missing = count - len(self._reserved_ids)
+		if missing > 0:
+			self._reserved_ids.extend(self._reserveIds(max(missing, self._id_block_size),
+				self._max_issued_id + 1))
+
+		new_ids = [self._reserved_ids.popleft() for i in range(count)]
+		if len(new_ids) > 0:
+			self._max_issued_id = max(self._max_issued_id, max(new_ids))
+		return new_ids
+
+	def _commitIdBlock(self):
+		"""Must be called after transaction is committed"""
+		self._id_block_uncommitted = False
+
+	def _rollbackIdBlock(self):
+		"""Must be called after transaction is rolled back"""
+		# Reservation of the current block was rolled back too, so other connections
+		# can get the same IDs. IDs from blocks reserved by committed transactions
+		# are safe to use even if objects created with them were rolled back.
+		# IDs, which were already handed out, will not be reserved again
+		# by this connection, because new blocks start after the maximum issued ID.
+		if self._id_block_uncommitted:
+			self._reserved_ids.clear()
+			self._id_block_uncommitted = False
+
+	def addRollbackHandler(self, handler):
+		"""
+		Register function without arguments, which will be called after each rollback
+		(used by upper layers to drop cached data, which may have been rolled back)
+		"""
+		self._rollback_handlers.append(handler)
+
+	def _callRollbackHandlers(self):
+		"""Must be called after transaction is rolled back"""
+		for handler in self._rollback_handlers:
+			handler()
+
+	def addCommitHandler(self, handler):
+		"""
+		Register function without arguments, which will be called after each commit
+		(used by upper layers to drop cached data, which can be changed by other
+		connections between transactions)
+		"""
+		self._commit_handlers.append(handler)
+
+	def _callCommitHandlers(self):
+		"""Must be called after transaction is committed"""
+		for handler in self._commit_handlers:
+			handler()
+
+	def supportsConcurrentReads(self):
+		"""
+		Returns True if engine can process read-only transactions
+		(started by beginRead()) concurrently with the main one
+		"""
+		return False
+
+	def _initCatalog(self):
+		"""Initialize state of the cached list of existing tables"""
+		self._catalog = None # dictionary with existing table names as keys
+		self._catalog_version = None # schema version, which catalog corresponds to
+		self._catalog_undo = [] # (name, existed) pairs for changes in current transaction
+		self._schema_changed = False # True if schema was changed in current transaction
+
+	def _syncCatalog(self):
+		"""
+		Must be called in the beginning of transaction.
+		Reloads catalog if the schema was changed by somebody else.
+		"""
+		version = self._getSchemaVersion()
+		if self._catalog is None or version != self._catalog_version:
+			self._catalog = dict.fromkeys(self._queryTablesList())
+			self._catalog_version = version
+		self._catalog_undo = []
+		self._schema_changed = False
+
+	def _catalogAvailable(self):
+		"""Returns True if catalog can be used instead of querying database"""
+		return self._catalog is not None and self.inWriteTransaction()
+
+	def _onSchemaChange(self, sql_str, tables):
+		"""Must be called after successful schema changing query"""
+		if not self._catalogAvailable():
+			# catalog will be reloaded in the beginning of the next transaction
+			self._catalog = None
+			return
+
+		self._schema_changed = True
+		action, target = [x.upper() for x in sql_str.split(None, 2)[:2]]
+		if target != 'TABLE':
+			return
+
+		if tables is None or action == 'ALTER':
+			# cannot track this change, use database queries
+			# until the end of transaction
+			self._catalog = None
+		else:
+			name = tables[0]
+			self._catalog_undo.append((name, name in self._catalog))
+			if action == 'CREATE':
+				self._catalog[name] = None
+			else:
+				self._catalog.pop(name, None)
+
+	def _commitCatalog(self):
+		"""Must be called before transaction is committed"""
+		if self._schema_changed and self._catalog is not None:
+			self._catalog_version = self._getSchemaVersion()
+		self._catalog_undo = []
+		self._schema_changed = False
+
+	def _rollbackCatalog(self):
+		"""Must be called after transaction is rolled back"""
+		if self._catalog is not None:
+			for name, existed in reversed(self._catalog_undo):
+				if existed:
+					self._catalog[name] = None
+				else:
+					self._catalog.pop(name, None)
+		self._catalog_undo = []
+		self._schema_changed = False
 
-		self.execute("INSERT INTO {} VALUES " + query, [table_name], values)
+	def tableExists(self, name):
+		if self._catalogAvailable():
+			return name in self._catalog
+		return self._queryTableExists(name)
+
+	def getTablesList(self):
+		if self._catalogAvailable():
+			return list(self._catalog)
+		return self._queryTablesList()
+
+	def selectExistingTables(self, table_names):
+		"""Returns intersection of existing tables and tables from table_names"""
+		if self._catalogAvailable():
+			return [x for x in table_names if x in self._catalog]
+		return self._querySelectExistingTables(table_names)
 
 
 class _Sqlite3Engine(_Engine):
 	"""Wrapper for Sqlite 3 db engine"""
 
-	def __init__(self, name, open_existing=None, db_path=None):
+	def __init__(self, name, open_existing=None, db_path=None, id_block_size=100,
+		wal=False, readers=4):
 
 		if db_path is not None and name is not None:
 			name = os.path.join(db_path, name)
@@ -85,28 +296,116 @@ class _Sqlite3Engine(_Engine):
 				if os.path.exists(name):
 					os.remove(name)
 
+		self._conn = self._connect(name)
+		self._writer_cur = self._conn.cursor()
+
+		self._initIdAllocator(id_block_size)
+		self._initCatalog()
+		self._rollback_handlers = []
+		self._commit_handlers = []
+
+		# pool of connections for read-only transactions
+		self._readers = None
+		self._local = threading.local()
+		if wal:
+			if name == ':memory:':
+				raise interface.EngineError("WAL mode requires database file")
+			if not isinstance(readers, int) or readers < 1:
+				raise interface.EngineError("Number of readers must be a positive integer")
+
+			# in WAL mode readers do not block writer and are not blocked by it
+			self._writer_cur.execute("PRAGMA journal_mode=WAL").fetchall()
+
+			self._readers = queue.Queue()
+			for i in range(readers):
+				# readers are passed between threads, but each one
+				# is used only by one thread at a time
+				reader = self._connect(name, check_same_thread=False)
+				reader.execute("PRAGMA query_only=1")
+				self._readers.put(reader)
+
+	def _connect(self, name, **kwds):
+		"""Open new connection to database"""
+
 		# isolation_level=None disables autocommit, giving us the
 		# possibility to manage transactions manually
-		self._conn = sqlite3.connect(name, isolation_level=None)
+		conn = sqlite3.connect(name, isolation_level=None, **kwds)
 
 		# Add external regexp handling function
-		self._conn.create_function("regexp", 2, self.__regexp)
+		conn.create_function("regexp", 2, self.__regexp)
 
-		self._cur = self._conn.cursor()
+		return conn
+
+	@property
+	def _cur(self):
+		"""Cursor for current thread: reader's one during read-only transaction"""
+		reader = getattr(self._local, 'reader', None)
+		return self._writer_cur if reader is None else reader[1]
 
 	def close(self):
+		if self._readers is not None:
+			while not self._readers.empty():
+				self._readers.get().close()
 		self._conn.close()
 
-	def getNewId(self):
+	def supportsConcurrentReads(self):
+		return self._readers is not None
+
+	def beginRead(self):
+		"""
+		Begin read-only transaction for current thread.
+		Until endRead() is called, all queries from this thread are
+		performed using one of the reader connections.
+		"""
+		reader = self._readers.get()
+		cur = reader.cursor()
+		try:
+			cur.execute("BEGIN TRANSACTION")
+		except:
+			self._readers.put(reader)
+			raise
+		self._local.reader = (reader, cur)
+
+	def endRead(self):
+		"""Finish read-only transaction, started by beginRead()"""
+		reader, cur = self._local.reader
+		del self._local.reader
+		try:
+			reader.rollback()
+		finally:
+			self._readers.put(reader)
+
+	def _reserveIds(self, count, min_id):
+		"""
+		Reserve given number of IDs, not less than min_id, in database;
+		return list with them
+		"""
 		if not self.tableExists('max_uuid'):
-			self.execute("CREATE TABLE max_uuid (uuid {type})".format(
-				type=self.getIdType()))
+			self.execute("CREATE TABLE {} (uuid " + self.getIdType() + ")", ['max_uuid'])
 			self.execute("INSERT INTO max_uuid VALUES (0)")
 
-		self.execute("UPDATE max_uuid SET uuid=uuid+1")
+		# UPDATE locks the database, so the block cannot be reserved
+		# by another connection before SELECT
+		self.execute("UPDATE max_uuid SET uuid=MAX(uuid, ?)+?", None, [min_id - 1, count])
 		res = self.execute("SELECT uuid FROM max_uuid")
 
-		return res[0][0]
+		self._id_block_uncommitted = self._conn.in_transaction
+		return range(res[0][0] - count + 1, res[0][0] + 1)
+
+	def getSequenceValues(self, name, count, min_value):
+		"""
+		Returns list of given number of new values, not less than min_value,
+		from sequence with given name; sequence is created if it does not exist
+		"""
+		if not self.tableExists(name):
+			self.execute("CREATE TABLE {} (value " + self.getColumnType(int()) + ")", [name])
+			self.execute("INSERT INTO {} VALUES (0)", [name])
+
+		# UPDATE locks the database, so values cannot be taken
+		# by another connection before SELECT
+		self.execute("UPDATE {} SET value=MAX(value, ?)+?", [name], [min_value - 1, count])
+		res = self.execute("SELECT value FROM {}", [name])
+		return list(range(res[0][0] - count + 1, res[0][0] + 1))
 
 	def getIdType(self):
 		return self.getColumnType(int())
@@ -125,37 +424,74 @@ class _Sqlite3Engine(_Engine):
 
 	def execute(self, sql_str, tables=None, values=None):
 		"""Execute given SQL query"""
+		res = self._execute(self._cur, sql_str, tables, values).fetchall()
+		if _isSchemaQuery(sql_str):
+			self._onSchemaChange(sql_str, tables)
+		return res
+
+	def executeUpdate(self, sql_str, tables=None, values=None):
+		"""Execute given data changing query, return number of affected rows"""
+		return self._execute(self._cur, sql_str, tables, values).rowcount
+
+	def executeIter(self, sql_str, tables=None, values=None):
+		"""
+		Execute given SQL query, return iterator over resulting rows.
+		Rows are fetched from DB when they are requested, so other queries
+		can be executed while iterator is still in use.
+		"""
+		# separate cursor is necessary, because the default one can be used
+		# by other queries before this iterator is exhausted
+		return self._execute(self._cur.connection.cursor(), sql_str, tables, values)
+
+	def _execute(self, cur, sql_str, tables, values):
+		"""Execute given SQL query using given cursor"""
 		if tables is not None:
 			tables = [self.getSafeName(x) for x in tables]
 			tables_tuple = tuple(tables)
 			sql_str = sql_str.format(*tables_tuple)
 		if values is None:
-			cur = self._cur.execute(sql_str)
+			return cur.execute(sql_str)
 		else:
-			cur = self._cur.execute(sql_str, tuple(values))
-		return cur.fetchall()
+			return cur.execute(sql_str, tuple(values))
 
-	def tableExists(self, name):
+	def executeMany(self, sql_str, tables, values_lists):
+		"""Execute given SQL query for each list of values"""
+		tables = [self.getSafeName(x) for x in tables]
+		sql_str = sql_str.format(*tuple(tables))
+		self._cur.executemany(sql_str, values_lists)
+
+	def inWriteTransaction(self):
+		"""Returns True if current thread is inside of the main (read-write) transaction"""
+		return self._conn.in_transaction and getattr(self._local, 'reader', None) is None
+
+	def _getSchemaVersion(self):
+		return self._cur.execute("PRAGMA schema_version").fetchall()[0][0]
+
+	def _queryTableExists(self, name):
 		res = self._cur.execute("SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name=?",
 			(name,)).fetchall()
 		return res[0][0] > 0
 
-	def getTablesList(self):
+	def _queryTablesList(self):
 		res = self._cur.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()
 		return [x[0] for x in res]
 
-	def selectExistingTables(self, table_names):
-		"""Returns intersection of existing tables and tables from table_names"""
+	def _querySelectExistingTables(self, table_names):
 		placeholders = ", ".join(["?"] * len(table_names))
 		res = self._cur.execute("SELECT name FROM sqlite_master WHERE name IN (" +
 			placeholders + ")", tuple(table_names)).fetchall()
 		return [x[0] for x in res]
 
+	def indexExists(self, name):
+		res = self._cur.execute("SELECT COUNT(*) FROM sqlite_master WHERE type='index' AND name=?",
+			(name,)).fetchall()
+		return res[0][0] > 0
+
 	def tableIsEmpty(self, name):
 		return self._cur.execute("SELECT COUNT(*) FROM " + self.getSafeName(name)).fetchall()[0][0] == 0
 
 	def deleteTable(self, name):
-		self._cur.execute("DROP TABLE IF EXISTS " + self.getSafeName(name))
+		self.execute("DROP TABLE IF EXISTS {}", [name])
 
 	def getColumnType(self, val):
 		"""Return SQL type for storing given value"""
@@ -173,34 +509,107 @@ class _Sqlite3Engine(_Engine):
 		}
 		return classes[type_str]
 
-	def begin(self):
-		"""Begin transaction"""
-		self._cur.execute("BEGIN TRANSACTION")
+	def begin(self, write=True):
+		"""
+		Begin transaction; if write is False, transaction must not change the database
+		"""
+
+		# Deferred transaction, which has read something, cannot wait for the write lock:
+		# in WAL mode it fails if another connection has committed changes before
+		# it started writing, and with rollback journal two such transactions deadlock
+		# while upgrading their locks (so one of them fails immediately).
+		# The write lock is taken beforehand instead, waiting for it if necessary.
+		# Read-only transactions never upgrade their locks, so they can be deferred
+		# and run concurrently with transactions of other connections.
+		if write:
+			self._cur.execute("BEGIN IMMEDIATE TRANSACTION")
+		else:
+			self._cur.execute("BEGIN TRANSACTION")
+		self._syncCatalog()
 
 	def commit(self):
 		"""Commit current transaction"""
+		self._commitCatalog()
 		self._conn.commit()
+		self._commitIdBlock()
+		self._callCommitHandlers()
 
 	def rollback(self):
 		"""Rollback current transaction"""
 		self._conn.rollback()
+		self._rollbackIdBlock()
+		self._rollbackCatalog()
+		self._callRollbackHandlers()
 
 	def getRegexpOp(self):
 		return "REGEXP"
 
-	def insertMany(self, table_name, value_lists):
-
-		# SQLite does not support normal multiple insert,
-		# so we are using this trick
-		value_string = ", ".join(["?"] * len(value_lists[0]))
-		value_strings = ["SELECT " + value_string] * len(value_lists)
-		query = " UNION ALL ".join(value_strings)
-
-		values = []
-		for value_list in value_lists:
-			values += value_list
-
-		self.execute("INSERT INTO {} " + query, [table_name], values)
+	def getPrefixCondition(self, column, prefix):
+		"""
+		Returns tuple (condition string, values) for the condition,
+		which selects rows with column values starting with given prefix
+		"""
+		# GLOB is case sensitive and can use indexes, unlike default LIKE
+		escaped = re.sub(r'([\*\?\[])', r'[\1]', prefix)
+		return column + " GLOB ?", [escaped + '*']
+
+	def getLimitClause(self, limit, offset):
+		"""
+		Returns tuple (clause string, values) for the clause, which skips
+		given number of selected rows and limits the number of the rest
+		"""
+		# OFFSET requires LIMIT, and negative LIMIT means that there is no limit
+		return " LIMIT ? OFFSET ?", [-1 if limit is None else limit,
+			0 if offset is None else offset]
+
+	def createFullTextIndex(self, name, table_name, column):
+		"""
+		Create full-text index with given name for values in the column of given table;
+		the index is kept up to date when the table is changed
+		"""
+		# the index does not keep its own copy of values, it refers to table rows
+		# by rowid and is updated by triggers
+		content = "'" + table_name.replace("'", "''") + "'"
+		self.execute("CREATE VIRTUAL TABLE {} USING fts5(" + column +
+			", content=" + content + ")", [name])
+
+		triggers = {action: self.getNameString(['trigger', action, table_name])
+			for action in ['insert', 'delete', 'update']}
+		insert_str = "INSERT INTO {} (rowid, " + column + ") " + \
+			"VALUES (new.rowid, new." + column + ");"
+		delete_str = "INSERT INTO {} ({}, rowid, " + column + ") " + \
+			"VALUES ('delete', old.rowid, old." + column + ");"
+
+		self.execute("CREATE TRIGGER {} AFTER INSERT ON {} BEGIN " + insert_str + " END",
+			[triggers['insert'], table_name, name])
+		self.execute("CREATE TRIGGER {} AFTER DELETE ON {} BEGIN " + delete_str + " END",
+			[triggers['delete'], table_name, name, name])
+		self.execute("CREATE TRIGGER {} AFTER UPDATE OF " + column + " ON {} BEGIN " +
+			delete_str + " " + insert_str + " END",
+			[triggers['update'], table_name, name, name, name])
+
+		# index values, which are already in the table
+		self.execute("INSERT INTO {} ({}) VALUES ('rebuild')", [name, name])
+
+	def deleteFullTextIndex(self, name):
+		"""Delete full-text index (triggers are deleted together with the indexed table)"""
+		self.deleteTable(name)
+
+	def getFullTextCondition(self, name, column):
+		"""
+		Returns tuple (condition string, tables) for the condition, which selects
+		rows with column values matching full-text query, using given index
+		"""
+		return "rowid IN (SELECT rowid FROM {} WHERE " + column + " MATCH ?)", [name]
+
+	def getFullTextQuery(self, terms):
+		"""
+		Returns full-text query, which matches values containing all given terms
+		(words or phrases), for the condition from getFullTextCondition()
+		"""
+		# each term is an FTS5 string, so punctuation and operator words
+		# in it are not interpreted as query syntax
+		return " ".join('"' + term.replace('"', '""') + '"' for term in terms)
 
 
 class _PostgreEngine(_Engine):
@@ -208,8 +617,12 @@ class _PostgreEngine(_Engine):
 
 	__FIELD_SEP = '.' # separator for field elements in table name
 
+	# maximum length of identifiers in bytes, longer ones are silently truncated
+	_MAX_NAME_LENGTH = 63
+
 	def __init__(self, name, open_existing=None, host='localhost',
-		port=5432, user='postgres', password='', connection_limit=-1):
+		port=5432, user='postgres', password='', connection_limit=-1,
+		statement_cache_size=100, id_block_size=100):
 
 		if name is None:
 			raise interface.EngineError("Database name must be specified")
@@ -217,6 +630,9 @@ class _PostgreEngine(_Engine):
 		if not isinstance(connection_limit, int):
 			raise interface.EngineError("Connection limit must be an integer")
 
+		if not isinstance(statement_cache_size, int) or statement_cache_size < 0:
+			raise interface.EngineError("Statement cache size must be a non-negative integer")
+
 		conn = postgresql.open(user=user,
 			password=password, host=host, port=port)
 
@@ -242,45 +658,145 @@ class _PostgreEngine(_Engine):
 
 		self._transaction = None
 
+		# cache of prepared statements, keyed by final query text
+		self._statement_cache_size = statement_cache_size
+		self._statements = {}
+		self._statements_access = AccessLogger(statement_cache_size)
+		self._statement_cache_hits = 0
+		self._statement_cache_misses = 0
+
+		self._initIdAllocator(id_block_size)
+		self._initCatalog()
+		self._rollback_handlers = []
+		self._commit_handlers = []
+
 	def close(self):
+		self._statements = {}
 		self._conn.close()
 
 		# Delete connection explicitly - Postgre keeps something there,
 		# which keeps the DB opened and causes failures during further connections
 		del self._conn
 
-	def getNewId(self):
-		if not self.tableExists('max_uuid'):
-			self.execute("CREATE TABLE max_uuid (uuid {type})".format(
-				type=self.getIdType()))
-			self.execute("INSERT INTO max_uuid VALUES (0)")
+	def _reserveIds(self, count, min_id):
+		"""
+		Reserve given number of IDs, not less than min_id, in database;
+		return list with them
+		"""
+
+		# Sequences are not affected by rollbacks, so IDs are never reused
+		# and concurrent connections do not block each other.
+		# IDs in the block may be non-contiguous if sequence is used concurrently,
+		# but all of them are reserved by one query.
+		if not self._sequenceExists('max_uuid_seq'):
+			# continue numbering from max_uuid table, created by older versions
+			start = min_id
+			if self.tableExists('max_uuid'):
+				start = max(start, self.execute("SELECT uuid FROM max_uuid")[0][0] + 1)
+
+			self.execute("CREATE SEQUENCE max_uuid_seq START WITH {start}".format(
+				start=start))
+
+			# sequence creation is transactional, unlike nextval()
+			self._id_block_uncommitted = (self._transaction is not None)
+
+		res = self.execute("SELECT nextval('max_uuid_seq') FROM generate_series(1, ?)",
+			None, [count])
+		return [x[0] for x in res]
 
-		self.execute("UPDATE max_uuid SET uuid=uuid+1")
-		res = self.execute("SELECT uuid FROM max_uuid")
+	def getSequenceValues(self, name, count, min_value):
+		"""
+		Returns list of given number of new values, not less than min_value,
+		from sequence with given name; sequence is created if it does not exist
+		"""
 
-		return res[0][0]
+		# min_value is used only when sequence is created;
+		# after that values are taken by nextval(), which does not block
+		# concurrent connections and never returns the same value twice
+		if not self._sequenceExists(name):
+			self.execute("CREATE SEQUENCE {} START WITH " + str(int(min_value)), [name])
+
+		res = self.execute("SELECT nextval('" + self.getSafeName(name).replace("'", "''") +
+			"') FROM generate_series(1, ?)", None, [count])
+		return [x[0] for x in res]
+
+	def _sequenceExists(self, name):
+		res = self._prepare("SELECT COUNT(*) FROM pg_class WHERE relkind='S' AND relname=$1")(name)
+		return res[0][0] > 0
 
 	def getIdType(self):
 		return self.getColumnType(int())
 
-	def execute(self, sql_str, tables=None, values=None):
-		"""Execute given SQL query"""
+	def _prepare(self, sql_str, cache=True):
+		"""Returns prepared statement for given query, reusing the cached one if possible"""
 
-		# replace '?' by '$n's (postgre placeholder syntax)
+		if not cache or self._statement_cache_size == 0:
+			return self._conn.prepare(sql_str)
 
-		class Counter:
-			def __init__(self):
-				self.c = 0
+		if sql_str in self._statements:
+			self._statement_cache_hits += 1
+			statement = self._statements[sql_str]
+		else:
+			self._statement_cache_misses += 1
+			statement = self._conn.prepare(sql_str)
+			self._statements[sql_str] = statement
+
+		# forget least recently used statements
+		self._statements_access.update(sql_str)
+		for old_sql_str in self._statements_access.delete_oldest():
+			del self._statements[old_sql_str]
+
+		return statement
+
+	def _forgetStatements(self, name):
+		"""Remove all cached statements which use given table"""
+		safe_name = self.getSafeName(name)
+		for sql_str in [x for x in self._statements if safe_name in x]:
+			del self._statements[sql_str]
+			self._statements_access.delete(sql_str)
+
+	def getStatementCacheStats(self):
+		"""Returns dictionary with prepared statements cache statistics"""
+		return {'hits': self._statement_cache_hits,
+			'misses': self._statement_cache_misses,
+			'size': len(self._statements)}
 
-			def __call__(self, match_obj):
-				self.c += 1
-				return "$" + str(self.c)
+	def execute(self, sql_str, tables=None, values=None):
+		"""Execute given SQL query"""
+		statement, prepared_values = self._prepareQuery(sql_str, tables, values)
+		res = statement(*prepared_values)
+		if _isSchemaQuery(sql_str):
+			self._onSchemaChange(sql_str, tables)
+		return res
+
+	def executeUpdate(self, sql_str, tables=None, values=None):
+		"""Execute given data changing query, return number of affected rows"""
+		statement, prepared_values = self._prepareQuery(sql_str, tables, values)
+
+		# for queries, which do not return rows, first() returns their row count
+		return statement.first(*prepared_values)
+
+	def executeIter(self, sql_str, tables=None, values=None):
+		"""
+		Execute given SQL query, return iterator over resulting rows.
+		Rows are fetched from DB when they are requested, so other queries
+		can be executed while iterator is still in use.
+		"""
+		statement, values = self._prepareQuery(sql_str, tables, values)
+		return statement.rows(*values)
+
+	def _prepareQuery(self, sql_str, tables, values):
+		"""Returns prepared statement for given query and tuple with its parameters"""
 
-		# FIXME: it is not 100% reliable, because there can be other ?'s in string
-		# but since we are doing this substitution before inserting table names,
-		# it will work for now
 		if values is not None:
-			sql_str = re.sub(r'\?', Counter(), sql_str)
+			sql_str = _convertPlaceholders(sql_str)
+
+		# there is no point in caching one-time schema changing queries;
+		# moreover, statements for affected tables may become invalid
+		schema_query = _isSchemaQuery(sql_str)
+		if schema_query and tables is not None:
+			for name in tables:
+				self._forgetStatements(name)
 
 		# insert table names
 		if tables is not None:
@@ -290,30 +806,60 @@ class _PostgreEngine(_Engine):
 		if values is None: values = []
 		values = tuple(values)
 
-		return self._conn.prepare(sql_str)(*values)
+		return self._prepare(sql_str, cache=not schema_query), values
 
-	def tableExists(self, name):
-		res = self._conn.prepare("SELECT COUNT(*) FROM pg_tables WHERE tablename=$1")(name)
+	def executeMany(self, sql_str, tables, values_lists):
+		"""Execute given SQL query for each list of values"""
+		sql_str = _convertPlaceholders(sql_str)
+		tables = [self.getSafeName(x) for x in tables]
+		sql_str = sql_str.format(*tuple(tables))
+		self._prepare(sql_str).load_rows(tuple(values) for values in values_lists)
+
+	def inWriteTransaction(self):
+		"""Returns True if current thread is inside of the main (read-write) transaction"""
+		return self._transaction is not None
+
+	def _getSchemaVersion(self):
+		# there is no schema version counter in postgre, but every created
+		# relation gets new OID, and every deleted one decreases their number
+		return tuple(self._prepare("SELECT COUNT(*), MAX(oid) FROM pg_class")()[0])
+
+	def _queryTableExists(self, name):
+		res = self._prepare("SELECT COUNT(*) FROM pg_tables WHERE tablename=$1")(name)
 		return res[0][0] > 0
 
-	def getTablesList(self):
-		res = self._conn.prepare("SELECT tablename FROM pg_tables")()
+	def _queryTablesList(self):
+		res = self._prepare("SELECT tablename FROM pg_tables")()
 		return [x[0] for x in res]
 
-	def selectExistingTables(self, table_names):
-		"""Returns intersection of existing tables and tables from table_names"""
+	def _querySelectExistingTables(self, table_names):
 		placeholders = ", ".join(["$" + str(i) for i in range(1, len(table_names) + 1)])
 		tables_tuple = tuple(table_names)
-		res = self._conn.prepare("SELECT tablename FROM pg_tables WHERE tablename IN (" +
+		res = self._prepare("SELECT tablename FROM pg_tables WHERE tablename IN (" +
 			placeholders + ")")(*tables_tuple)
 		return [x[0] for x in res]
 
+	def getIndexName(self, l):
+		name = self.getNameString(l)
+		if len(name.encode('utf-8')) <= self._MAX_NAME_LENGTH:
+			return name
+
+		# truncated names of different indexes of the same table could coincide,
+		# and they would not be found by indexExists(), so long table name
+		# is replaced by its hash
+		digest = hashlib.sha1(l[-1].encode('utf-8')).hexdigest()[:16]
+		return self.getNameString(l[:-1] + [digest])
+
+	def indexExists(self, name):
+		res = self._prepare("SELECT COUNT(*) FROM pg_indexes WHERE indexname=$1")(name)
+		return res[0][0] > 0
+
 	def tableIsEmpty(self, name):
-		return self._conn.prepare("SELECT COUNT(*) FROM " + self.getSafeName(name))()[0][0] == 0
+		return self._prepare("SELECT COUNT(*) FROM " + self.getSafeName(name))()[0][0] == 0
 
 	def deleteTable(self, name):
 		if self.tableExists(name):
-			self._conn.prepare("DROP TABLE " + self.getSafeName(name))()
+			self.execute("DROP TABLE {}", [name])
 
 	def getColumnType(self, val):
 		"""Return SQL type for storing given value"""
@@ -331,17 +877,23 @@ class _PostgreEngine(_Engine):
 		}
 		return classes[type_str]
 
-	def begin(self):
-		"""Begin transaction"""
+	def begin(self, write=True):
+		"""
+		Begin transaction; if write is False, transaction must not change the database
+		"""
 		self._transaction = self._conn.xact()
 		self._transaction.start()
+		self._syncCatalog()
 
 	def commit(self):
 		"""Commit current transaction"""
+		self._commitCatalog()
 		try:
 			self._transaction.commit()
 		finally:
 			self._transaction = None
+		self._commitIdBlock()
+		self._callCommitHandlers()
 
 	def rollback(self):
 		"""Rollback current transaction"""
@@ -349,10 +901,66 @@ class _PostgreEngine(_Engine):
 			self._transaction.rollback()
 		finally:
 			self._transaction = None
+			self._rollbackIdBlock()
+			self._rollbackCatalog()
+			self._callRollbackHandlers()
 
 	def getRegexpOp(self):
 		return "~"
 
+	def getPrefixCondition(self, column, prefix):
+		"""
+		Returns tuple (condition string, values) for the condition,
+		which selects rows with column values starting with given prefix
+		"""
+		escaped = re.sub(r'([\\%_])', r'\\\1', prefix)
+		return column + " LIKE ?", [escaped + '%']
+
+	def getLimitClause(self, limit, offset):
+		"""
+		Returns tuple (clause string, values) for the clause, which skips
+		given number of selected rows and limits the number of the rest
+		"""
+		clause = ""
+		values = []
+		if limit is not None:
+			clause += " LIMIT ?"
+			values.append(limit)
+		if offset is not None:
+			clause += " OFFSET ?"
+			values.append(offset)
+		return clause, values
+
+	def createFullTextIndex(self, name, table_name, column):
+		"""
+		Create full-text index with given name for values in the column of given table;
+		the index is kept up to date when the table is changed
+		"""
+		self.execute("CREATE INDEX {} ON {} USING GIN (to_tsvector('simple', " +
+			column + "))", [name, table_name])
+
+	def deleteFullTextIndex(self, name):
+		"""Delete full-text index"""
+		self.execute("DROP INDEX IF EXISTS {}", [name])
+
+	def getFullTextCondition(self, name, column):
+		"""
+		Returns tuple (condition string, tables) for the condition, which selects
+		rows with column values matching full-text query, using given index
+		"""
+		# expression must be the same as in the index, so that it could be used
+		return "to_tsvector('simple', " + column + ") @@ " + \
+			"websearch_to_tsquery('simple', ?)", []
+
+	def getFullTextQuery(self, terms):
+		"""
+		Returns full-text query, which matches values containing all given terms
+		(words or phrases), for the condition from getFullTextCondition()
+		"""
+		# quoted terms are phrases for websearch_to_tsquery(), so operator words
+		# and punctuation in them are not interpreted as query syntax
+		return " ".join('"' + term.replace('"', ' ') + '"' for term in terms)
+
 
 _DB_ENGINES = {
 	'sqlite3': _Sqlite3Engine
@@ -1,5 +1,7 @@
 """Internal interface classes"""
 
+import re
+
 from . import op
 
 _POINTER_TYPES = [type(None), list, dict]
@@ -404,6 +406,21 @@ class CreateRequest:
 		return type(self).__name__ + " for fields list " + repr(self.fields)
 
 
+class CreateManyRequest:
+	"""Request for creation of several objects"""
+
+	def __init__(self, field_groups):
+
+		for fields in field_groups:
+			if fields is None or fields == []:
+				raise FormatError("Cannot create empty object")
+
+		self.field_groups = field_groups
+
+	def __str__(self):
+		return type(self).__name__ + " for field groups " + repr(self.field_groups)
+
+
 class ModifyRequest:
 	"""Request for modification of existing objects"""
 
@@ -467,6 +484,32 @@ class ReadRequest:
 			masks="" if self.masks is None else ", masks: " + repr(self.masks))
 
 
+class ReadManyRequest:
+	"""Request for reading several existing objects or their fields"""
+	def __init__(self, ids, path=None, masks=None):
+
+		for id in ids:
+			if id is None:
+				raise FormatError("Cannot read undefined object")
+
+		# path should be determined
+		if path is not None:
+			for elem in path.name:
+				if elem is None:
+					raise FormatError("Path should not have None parts in name")
+
+		self.ids = ids
+		self.path = path
+		self.masks = masks
+
+	def __str__(self):
+		return "{name} for objects {ids}{path}{masks}".format(
+			name=type(self).__name__,
+			ids=self.ids,
+			path="" if self.path is None else (", path: " + repr(self.path)),
+			masks="" if self.masks is None else ", masks: " + repr(self.masks))
+
+
 class InsertRequest:
 	"""Request for insertion into list of fields"""
 
@@ -507,6 +550,16 @@ class InsertRequest:
 			remove_conflicts=", remove conflicts" if self.remove_conflicts else "")
 
 
+def splitFullTextQuery(query):
+	"""
+	Returns list of terms of full-text query: phrases in double quotes
+	(the last one can be unterminated) and words between them
+	"""
+	terms = [match.group(1) if match.group(1) is not None else match.group(2)
+		for match in re.finditer(r'"([^"]*)"?|([^\s"]+)', query)]
+	return [term for term in terms if term.strip() != '']
+
+
 class SearchRequest:
 	"""Request for searching in database"""
 
@@ -515,7 +568,7 @@ class SearchRequest:
 
 		def __init__(self, operand1, operator, operand2, invert=False):
 
-			comparisons = [op.EQ, op.REGEXP, op.GT, op.GTE, op.LT, op.LTE]
+			comparisons = [op.EQ, op.REGEXP, op.MATCH, op.GT, op.GTE, op.LT, op.LTE]
 			operators = [op.AND, op.OR]
 
 			if operator in comparisons:
@@ -531,6 +584,13 @@ class SearchRequest:
 				if operator == op.REGEXP and type(val) not in [str, bytes]:
 					raise FormatError("Values of type " + type(val).__name__ +
 						" do not support regexp condition")
+
+				# full-text search is valid only for strings with some terms
+				if operator == op.MATCH and type(val) != str:
+					raise FormatError("Values of type " + type(val).__name__ +
+						" do not support full-text condition")
+				if operator == op.MATCH and len(splitFullTextQuery(val)) == 0:
+					raise FormatError("Full-text query should contain words or phrases")
 				self.leaf = True
 			elif operator in operators:
 				self.leaf = False
@@ -551,11 +611,64 @@ class SearchRequest:
 				("!" if self.invert else "") + str(self.operator) + \
 				" " + str(self.operand2) + ")"
 
-	def __init__(self, condition=None):
+	def __init__(self, condition=None, order_by=None, descending=False,
+			limit=None, offset=None, cursor=None):
 		self.condition = condition
 
+		# ordering field should be determined
+		if order_by is not None:
+			for elem in order_by.name:
+				if elem is None:
+					raise FormatError("Ordering field should not have None parts in name")
+
+		for name, value in (('Limit', limit), ('Offset', offset)):
+			if value is not None and (not isinstance(value, int) or
+					isinstance(value, bool) or value < 0):
+				raise FormatError(name + " must be a non-negative integer")
+
+		# cursor is returned by searchPage(): [ID] for search without ordering field,
+		# [group number, ID] or [group number, value, ID] otherwise
+		if cursor is not None:
+			if not isinstance(cursor, (list, tuple)) or not 1 <= len(cursor) <= 3 or \
+					(len(cursor) == 1) != (order_by is None) or \
+					any(not isinstance(x, int) or isinstance(x, bool)
+						for x in (cursor[0], cursor[-1])):
+				raise FormatError("Cursor should be a value returned by searchPage()")
+			cursor = list(cursor)
+
+		self.order_by = order_by
+		self.descending = descending
+		self.limit = limit
+		self.offset = offset
+		self.cursor = cursor
+
+	@property
+	def ordered(self):
+		"""True if found objects should be returned in definite order"""
+		return self.order_by is not None or self.descending or self.limit is not None or \
+			self.offset is not None or self.cursor is not None
+
 	def __str__(self):
-		return "SearchRequest: " + str(self.condition)
+		return "SearchRequest: " + str(self.condition) + \
+			("" if self.order_by is None else ", order by: " + repr(self.order_by) +
+				(" descending" if self.descending else "")) + \
+			("" if self.limit is None else ", limit: " + str(self.limit)) + \
+			("" if self.offset is None else ", offset: " + str(self.offset)) + \
+			("" if self.cursor is None else ", after: " + str(self.cursor))
+
+
+class SearchReadRequest:
+	"""Request for reading objects, which satisfy search condition"""
+
+	def __init__(self, search, masks=None):
+		self.search = search
+		self.masks = masks
+
+	def __str__(self):
+		return "{name}: {search}{masks}".format(
+			name=type(self).__name__,
+			search=self.search,
+			masks="" if self.masks is None else ", masks: " + repr(self.masks))
 
 
 class ObjectExistsRequest:
@@ -583,6 +696,14 @@ class DumpRequest:
 class RepairRequest:
 	"""Request for rebuilding caching tables"""
 
+	def __init__(self, max_tables=None):
+		if max_tables is not None and (not isinstance(max_tables, int) or max_tables < 1):
+			raise FormatError("Maximum number of tables must be a positive integer")
+
+		self.max_tables = max_tables
+
 	def __str__(self):
-		return type(self).__name__
+		return "{name} for {tables} tables".format(
+			name=type(self).__name__,
+			tables="all" if self.max_tables is None else self.max_tables)
 
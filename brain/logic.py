@@ -2,8 +2,11 @@
 
 import sqlite3
 import re
+import collections
 import copy
 import functools
+import heapq
+import itertools
 
 from . import interface
 from .interface import Field
@@ -15,105 +18,398 @@ class _StructureLayer:
 	_ID_COLUMN = 'id' # name of column with object id in all tables
 
 	# column names for specification table
-	_FIELD_COLUMN = 'field' # field names
+	_FIELD_COLUMN = 'field' # field path IDs
 	_TYPE_COLUMN = 'type' # field types
 	_REFCOUNT_COLUMN = 'refcount' # number of records with this type
 	_VALUE_COLUMN = 'value' # name of column with field values
 
+	# column names for settings table
+	_SETTING_COLUMN = 'name' # setting names
+	_SETTING_VALUE_COLUMN = 'value' # setting values
 
-	def __init__(self, engine):
+	# column names for path table
+	_PATH_ID_COLUMN = 'path_id' # path IDs
+	_PATH_COLUMN = 'path' # field names
+
+	# column names for repair progress table
+	_TABLE_COLUMN = 'name' # names of field tables, which are already counted
+
+	LAYOUT = 'tables' # storage layout, implemented by this class
+
+	# distance between positions of neighbouring list elements in sparse lists,
+	# allows to insert elements in the middle without renumbering the rest of the list
+	SPARSE_LIST_GAP = 2 ** 16
+
+	# settings of existing databases, which were created before settings table was added
+	DEFAULT_SETTINGS = {'storage': 'tables', 'lists': 'dense', 'fulltext': 'none'}
+
+	# number of field tables, which may have become empty, triggering garbage collection
+	GC_THRESHOLD = 100
+
+	# maximum number of subqueries in one compound query
+	# (sqlite3 does not allow more than 500 by default)
+	_MAX_COMPOUND_QUERIES = 200
+
+	# maximum number of object IDs in one query
+	# (old versions of sqlite3 do not allow more than 999 parameters)
+	_MAX_QUERY_IDS = 500
+
+	# maximum number of records counted when selectivity of search condition is estimated
+	_ESTIMATE_LIMIT = 1000
+
+
+	def __init__(self, engine, lists='dense', fulltext='none'):
 		self._engine = engine
+		self._lists = lists
+		self._fulltext = fulltext
 
 		# memorize strings with support table names
 		self._ID_TABLE = self._engine.getNameString(["id"])
+		self._SETTINGS_TABLE = self._engine.getNameString(["settings"])
+		self._PATH_TABLE = self._engine.getNameString(["paths"])
+		self._PATH_SEQUENCE = self._engine.getNameString(["paths", "sequence"])
+
+		# tables of unfinished repair: new specification table and list of field tables,
+		# which were already counted to it
+		self._REPAIR_TABLE = self._engine.getNameString(["repair", "id"])
+		self._REPAIR_PROGRESS_TABLE = self._engine.getNameString(["repair", "tables"])
 
 		# types for support tables
 		self._ID_TYPE = self._engine.getIdType()
 		self._TEXT_TYPE = self._engine.getColumnType(str())
 		self._INT_TYPE = self._engine.getColumnType(int())
 
+		# mapping of search operators to SQL comparisons
+		self._COMPARISONS = {
+			op.EQ: '=',
+			op.REGEXP: self._engine.getRegexpOp(),
+			op.LT: '<',
+			op.GT: '>',
+			op.LTE: '<=',
+			op.GTE: '>='
+		}
+
+		# types of all values, which can be stored in field tables
+		self._VALUE_TYPES = [self._engine.getColumnType(x)
+			for x in [int(), str(), float(), bytes(), interface.Pointer()]]
+
+		# groups of value types for ordering search results: values are ordered
+		# by group first (in the same order as SQLite compares values of different types),
+		# so that integers and floats are compared with each other
+		self._ORDER_GROUPS = [[self._engine.getColumnType(x) for x in group]
+			for group in [[interface.Pointer()], [int(), float()], [str()], [bytes()]]]
+
+		# cache of path IDs, {name_str: path_id}; paths are never deleted from
+		# the path table, so it is only invalidated if the transaction is rolled back
+		self._path_ids = {}
+		self._engine.addRollbackHandler(self._path_ids.clear)
+
+		# field tables, which may have become empty after deletion of records;
+		# they are checked and deleted by collectGarbage() when there are enough of them
+		# (empty tables do not affect results, so they can stay until then)
+		self._gc_tables = set()
+
+		# cache of object shapes, {id: {name_str: {type_str: refcount}}}; it is filled
+		# only in the main transaction, because objects can be changed by other
+		# connections between transactions
+		self._shapes = {}
+		self._engine.addCommitHandler(self._shapes.clear)
+		self._engine.addRollbackHandler(self._shapes.clear)
+
+		# statistics for search planning, {(table name, field values): number of records};
+		# entries are dropped when records of the field are added or deleted by this
+		# connection, or when the transaction is rolled back. Changes made by other
+		# connections (and uncommitted changes, when numbers are used by read-only
+		# transactions) are not tracked, because numbers are only used for estimates.
+		self._records_numbers = {}
+		self._engine.addRollbackHandler(self._records_numbers.clear)
+
 		# create support tables
 		self._engine.begin()
+		self._createSettingsTable()
+
+		# databases created by older versions keep field names in specification table,
+		# so it should be rebuilt once
+		old_specification = self._engine.tableExists(self._ID_TABLE) and \
+			not self._engine.tableExists(self._PATH_TABLE)
+
 		self._createSupportTables()
-		self._engine.commit()
 
+		# databases created by older versions do not have indexes,
+		# so they should be added once
+		if not self._engine.indexExists(self._getIndexName(self._ID_TABLE, self._ID_COLUMN)):
+			self._createIndexes()
 
-	def _createSupportTables(self):
-		"""Create database support tables (sort of caching)"""
+		if old_specification:
+			self.repairSupportTables()
 
-		# create specification table, which holds field names, their types
-		# and number of records of each type for all database objects
-		id_table_spec = ("({id_column} {id_type}, {field_column} {text_type}, " +
+		self._engine.commit()
+
+
+	def _createSpecificationTable(self, table_name):
+		"""
+		Create specification table, which holds field names, their types
+		and number of records of each type for all database objects
+		"""
+		id_table_spec = ("({id_column} {id_type}, {field_column} {int_type}, " +
 			"{type_column} {text_type}, " +
-			"{refcount_column} {refcount_type})").format(
+			"{refcount_column} {int_type})").format(
 			field_column=self._FIELD_COLUMN,
 			id_column=self._ID_COLUMN,
 			id_type=self._ID_TYPE,
 			refcount_column=self._REFCOUNT_COLUMN,
-			refcount_type=self._INT_TYPE,
+			int_type=self._INT_TYPE,
 			text_type=self._TEXT_TYPE,
 			type_column=self._TYPE_COLUMN)
 
+		self._engine.execute("CREATE table {} " + id_table_spec, [table_name])
+
+	def _createSupportTables(self):
+		"""Create database support tables (sort of caching)"""
+
 		if not self._engine.tableExists(self._ID_TABLE):
-			self._engine.execute("CREATE table {} " + id_table_spec, [self._ID_TABLE])
+			self._createSpecificationTable(self._ID_TABLE)
+			self._createSpecificationIndex()
+
+		# create path table, which maps field names to integer IDs
+		# used in specification table
+		if not self._engine.tableExists(self._PATH_TABLE):
+			self._engine.execute("CREATE TABLE {} (" +
+				self._PATH_ID_COLUMN + " " + self._INT_TYPE + ", " +
+				self._PATH_COLUMN + " " + self._TEXT_TYPE + ")", [self._PATH_TABLE])
+			self._engine.execute("CREATE UNIQUE INDEX {} ON {} (" + self._PATH_COLUMN + ")",
+				[self._getIndexName(self._PATH_TABLE, self._PATH_COLUMN), self._PATH_TABLE])
+			self._engine.execute("CREATE UNIQUE INDEX {} ON {} (" + self._PATH_ID_COLUMN + ")",
+				[self._getIndexName(self._PATH_TABLE, self._PATH_ID_COLUMN), self._PATH_TABLE])
+
+	def _getPathIds(self, name_strs, create=False):
+		"""
+		Returns dictionary {name_str: path_id} for given field names.
+		If create is False, names, which are not in path table, are omitted;
+		otherwise they are added to it.
+		"""
+		result = {}
+		missing = []
+		for name_str in set(name_strs):
+			if name_str in self._path_ids:
+				result[name_str] = self._path_ids[name_str]
+			else:
+				missing.append(name_str)
+
+		for start in range(0, len(missing), self._MAX_QUERY_IDS):
+			chunk = missing[start:start + self._MAX_QUERY_IDS]
+			rows = self._engine.execute("SELECT " + self._PATH_COLUMN + ", " +
+				self._PATH_ID_COLUMN + " FROM {} WHERE " + self._PATH_COLUMN + " IN (" +
+				", ".join(["?"] * len(chunk)) + ")", [self._PATH_TABLE], chunk)
+			for name_str, path_id in rows:
+				result[name_str] = path_id
+
+		new_names = [name_str for name_str in missing if name_str not in result]
+		if create and len(new_names) > 0:
+			# sequence continues numbering of path tables without it
+			rows = self._engine.execute("SELECT COALESCE(MAX(" + self._PATH_ID_COLUMN +
+				"), 0) + 1 FROM {}", [self._PATH_TABLE])
+			path_ids = self._engine.getSequenceValues(self._PATH_SEQUENCE,
+				len(new_names), rows[0][0])
+			self._engine.insertMany(self._PATH_TABLE, zip(path_ids, new_names))
+			result.update(zip(new_names, path_ids))
+
+		for name_str in missing:
+			if name_str in result:
+				self._path_ids[name_str] = result[name_str]
 
-	def _deleteSupportTables(self):
-		self._engine.deleteTable(self._ID_TABLE)
+		return result
 
-	def repairSupportTables(self):
-		"""Recreate support tables according to other information in DB"""
+	def _createSettingsTable(self):
+		"""
+		Create table, which remembers storage layout, list format
+		and full-text index mode of the database
+		"""
+		if not self._engine.tableExists(self._SETTINGS_TABLE):
+			self._engine.execute("CREATE TABLE {} (" +
+				self._SETTING_COLUMN + " " + self._TEXT_TYPE + ", " +
+				self._SETTING_VALUE_COLUMN + " " + self._TEXT_TYPE + ")",
+				[self._SETTINGS_TABLE])
+			self._engine.insertMany(self._SETTINGS_TABLE,
+				[['storage', self.LAYOUT], ['lists', self._lists],
+				['fulltext', self._fulltext]])
+
+	@classmethod
+	def getStoredSettings(cls, engine):
+		"""
+		Returns dictionary with settings of existing database,
+		or None if the database was not created yet
+		"""
+		settings_table = engine.getNameString(["settings"])
+		engine.begin()
+		try:
+			if engine.tableExists(settings_table):
+				rows = engine.execute("SELECT " + cls._SETTING_COLUMN + ", " +
+					cls._SETTING_VALUE_COLUMN + " FROM {}", [settings_table])
+				settings = dict(cls.DEFAULT_SETTINGS)
+				settings.update({name: value for name, value in rows})
+				return settings
+			elif engine.tableExists(engine.getNameString(["id"])):
+				# databases created by older versions do not have settings table
+				return dict(cls.DEFAULT_SETTINGS)
+			else:
+				return None
+		finally:
+			engine.commit()
 
-		# if the repair request was created, we cannot rely on existing tables
-		self._deleteSupportTables()
-		self._createSupportTables()
+	def _getIndexName(self, table_name, column):
+		"""Returns name of the index for given table, starting with given column"""
+		return self._engine.getIndexName(['index', column, table_name])
 
-		# search for all field tables in database
-		tables = self._engine.getTablesList()
+	def _createSpecificationIndex(self):
+		"""Create index for specification table lookups by object, field name and type"""
+		self._engine.execute("CREATE UNIQUE INDEX {} ON {} (" + self._ID_COLUMN + ", " +
+			self._FIELD_COLUMN + ", " + self._TYPE_COLUMN + ")",
+			[self._getIndexName(self._ID_TABLE, self._ID_COLUMN), self._ID_TABLE])
 
-		# we need to filter out non-field tables
-		tables.remove(self._ID_TABLE)
-		tables = [x for x in tables if Field.isFieldTableName(self._engine, x)]
+	def _createFieldIndexes(self, field):
+		"""
+		Create indexes for field table: one for lookups by object ID and list indexes,
+		and one for search conditions on values
 
-		# collect info from field tables and create refcounters table in memory
-		refcounters = {}
+		field should have definite type
+		"""
+		table_name = self.getFieldTableName(field)
+		self._engine.execute("CREATE INDEX {} ON {} (" + self._ID_COLUMN +
+			field.list_indexes_query + ")",
+			[self._getIndexName(table_name, self._ID_COLUMN), table_name])
+		self._engine.execute("CREATE INDEX {} ON {} (" + self._VALUE_COLUMN + ")",
+			[self._getIndexName(table_name, self._VALUE_COLUMN), table_name])
+		self._createFullTextIndex(field)
+
+	def _getFullTextIndexName(self, table_name):
+		"""Returns name of the full-text index for given field table"""
+		return self._engine.getIndexName(['fulltext', table_name])
+
+	def _createFullTextIndex(self, field):
+		"""Create full-text index for the table of text field, if it is enabled"""
+		if self._fulltext == 'all' and field.type_str == self._TEXT_TYPE:
+			table_name = self.getFieldTableName(field)
+			self._engine.createFullTextIndex(self._getFullTextIndexName(table_name),
+				table_name, self._VALUE_COLUMN)
+
+	def _deleteFieldTable(self, table_name):
+		"""Delete field table together with its full-text index"""
+		self._engine.deleteTable(table_name)
+		for key in [key for key in self._records_numbers if key[0] == table_name]:
+			del self._records_numbers[key]
+		if self._fulltext == 'all' and \
+				Field.fromTableName(self._engine, table_name).type_str == self._TEXT_TYPE:
+			self._engine.deleteFullTextIndex(self._getFullTextIndexName(table_name))
+
+	def _createIndexes(self):
+		"""Create indexes for specification table and all existing field tables"""
+
+		self._createSpecificationIndex()
+
+		tables = [x for x in self._engine.getTablesList()
+			if Field.isFieldTableName(self._engine, x)]
 		for table in tables:
-			rows = self._engine.execute("SELECT id FROM {}", [table])
+			field = Field.fromTableName(self._engine, table)
+			if not self._engine.indexExists(self._getIndexName(table, self._ID_COLUMN)):
+				self._createFieldIndexes(field)
 
-			# empty field tables are automatically deleted, so if we found
-			# one, it should be removed too
-			if len(rows) == 0:
-				self._engine.deleteTable(table)
-				continue
+	def repairSupportTables(self, max_tables=None):
+		"""
+		Rebuild specification table according to contents of field tables.
+		New table is filled aside, so the database stays readable, and it replaces
+		the old one when all field tables are counted. If max_tables is not None,
+		no more than this number of field tables is counted, and the repair
+		is continued by the next call (possibly in another transaction).
+		Returns tuple (number of counted field tables, total number of field tables).
+		"""
 
-			ids = [x[0] for x in rows]
-			field = Field.fromTableName(self._engine, table)
-			name_str = field.name_str
-			type_str = field.type_str
+		if not self._engine.tableExists(self._REPAIR_PROGRESS_TABLE):
+			self._createSpecificationTable(self._REPAIR_TABLE)
+			self._engine.execute("CREATE INDEX {} ON {} (" + self._FIELD_COLUMN + ", " +
+				self._TYPE_COLUMN + ")",
+				[self._getIndexName(self._REPAIR_TABLE, self._FIELD_COLUMN), self._REPAIR_TABLE])
+			self._engine.execute("CREATE TABLE {} (" + self._TABLE_COLUMN + " " +
+				self._TEXT_TYPE + ")", [self._REPAIR_PROGRESS_TABLE])
 
-			for obj_id in ids:
-				if obj_id not in refcounters:
-					refcounters[obj_id] = {}
+		tables = self._getFieldTables()
+		rows = self._engine.execute("SELECT " + self._TABLE_COLUMN + " FROM {}",
+			[self._REPAIR_PROGRESS_TABLE])
+		counted = set(table_name for table_name, in rows)
+		uncounted = [table_name for table_name in tables if table_name not in counted]
+		to_count = uncounted if max_tables is None else uncounted[:max_tables]
 
-				if name_str not in refcounters[obj_id]:
-					refcounters[obj_id][name_str] = {}
+		for table_name in to_count:
+			self._countFieldRecords(table_name)
+			self._engine.execute("INSERT INTO {} VALUES (?)",
+				[self._REPAIR_PROGRESS_TABLE], [table_name])
 
-				if type_str not in refcounters[obj_id][name_str]:
-					refcounters[obj_id][name_str][type_str] = 1
-				else:
-					refcounters[obj_id][name_str][type_str] += 1
+		if len(to_count) == len(uncounted):
+			self._finishRepair()
 
-		# flatten refcounters hierarchy
-		values = []
-		for obj_id in refcounters:
-			for name_str in refcounters[obj_id]:
-				for type_str in refcounters[obj_id][name_str]:
-					values.append([obj_id, name_str, type_str,
-						refcounters[obj_id][name_str][type_str]])
+		return len(tables) - len(uncounted) + len(to_count), len(tables)
+
+	def _finishRepair(self):
+		"""Replace specification table with the one built by repair"""
+
+		# path table is kept, because other connections may have its contents cached
+		self._engine.deleteTable(self._ID_TABLE)
+		self._engine.execute("ALTER TABLE {} RENAME TO {}", [self._REPAIR_TABLE, self._ID_TABLE])
+		self._engine.execute("DROP INDEX {}",
+			[self._getIndexName(self._REPAIR_TABLE, self._FIELD_COLUMN)])
+		self._createSpecificationIndex()
+		self._engine.deleteTable(self._REPAIR_PROGRESS_TABLE)
+
+		self._gc_tables.clear()
+		self._shapes.clear()
+		self._records_numbers.clear()
+
+	def _resetRepairProgress(self, name_type_pairs):
+		"""
+		Called when refcounts for given (name string, type string) pairs are changed.
+		If repair is in progress, corresponding field tables should be counted again.
+		"""
+		if len(name_type_pairs) == 0 or \
+				not self._engine.tableExists(self._REPAIR_PROGRESS_TABLE):
+			return
+
+		name_type_pairs = set(name_type_pairs)
+		path_ids = self._getPathIds([name_str for name_str, type_str in name_type_pairs])
+
+		self._engine.executeMany("DELETE FROM {} WHERE " + self._FIELD_COLUMN + "=? AND " +
+			self._TYPE_COLUMN + "=?", [self._REPAIR_TABLE],
+			[(path_ids[name_str], type_str) for name_str, type_str in name_type_pairs])
+
+		table_names = set(self.getFieldTableName(Field.fromNameStr(self._engine, name_str,
+			type_str=type_str)) for name_str, type_str in name_type_pairs)
+		self._engine.executeMany("DELETE FROM {} WHERE " + self._TABLE_COLUMN + "=?",
+			[self._REPAIR_PROGRESS_TABLE], [(table_name,) for table_name in table_names])
+
+	def _getFieldTables(self):
+		"""Returns sorted list of all field tables in database"""
+		return sorted(x for x in self._engine.getTablesList()
+			if Field.isFieldTableName(self._engine, x))
+
+	def _countFieldRecords(self, table_name):
+		"""Count records for each object in given field table and add them to new specification"""
+
+		field = Field.fromTableName(self._engine, table_name)
+		path_id = self._getPathIds([field.name_str], create=True)[field.name_str]
 
-		# fill refcounters table
-		for values_list in values:
-			self._engine.execute("INSERT INTO {} VALUES (?, ?, ?, ?)",
-				[self._ID_TABLE], values_list)
+		# the table could have been counted before it was changed
+		self._engine.execute("DELETE FROM {} WHERE " + self._FIELD_COLUMN + "=? AND " +
+			self._TYPE_COLUMN + "=?", [self._REPAIR_TABLE], [path_id, field.type_str])
+
+		# type casts are necessary for postgre, which cannot deduce parameter types otherwise
+		inserted = self._engine.executeUpdate("INSERT INTO {} SELECT " + self._ID_COLUMN +
+			", CAST(? AS " + self._INT_TYPE + "), CAST(? AS " + self._TEXT_TYPE + "), " +
+			"COUNT(*) FROM {} GROUP BY " + self._ID_COLUMN,
+			[self._REPAIR_TABLE, table_name], [path_id, field.type_str])
+
+		# empty field tables are deleted by garbage collection, so if we found
+		# one, it can be removed now
+		if inserted == 0:
+			self._deleteFieldTable(table_name)
 
 	def updateRefcounts(self, id, to_delete, to_add):
 		"""
@@ -122,61 +418,110 @@ class _StructureLayer:
 		to_add - list of tuples (path string, type string, value)
 		"""
 
-		# delete old refcounts
-		if len(to_delete) > 0:
-			delete_strings = ["(" + self._FIELD_COLUMN + "=? AND " +
-				self._TYPE_COLUMN + "=?)"] * len(to_delete)
-			delete_condition = "(" + " OR ".join(delete_strings) + ")"
-			delete_query_values = [id]
+		path_ids = self._getPathIds([name_str for name_str, type_str in to_delete] +
+			[name_str for name_str, type_str, refcount in to_add], create=True)
 
-			for name_str, type_str in to_delete:
-				delete_query_values += [name_str, type_str]
+		self._resetRepairProgress(to_delete +
+			[(name_str, type_str) for name_str, type_str, refcount in to_add])
 
-			self._engine.execute("DELETE FROM {} WHERE " +
-				self._ID_COLUMN + "=? AND " + delete_condition,
-				[self._ID_TABLE], delete_query_values)
+		# delete old refcounts
+		if len(to_delete) > 0:
+			self._engine.executeMany("DELETE FROM {} WHERE " +
+				self._ID_COLUMN + "=? AND " + self._FIELD_COLUMN + "=? AND " +
+				self._TYPE_COLUMN + "=?", [self._ID_TABLE],
+				[(id, path_ids[name_str], type_str) for name_str, type_str in to_delete])
 
 		# add new refcounts
 		if len(to_add) > 0:
 			add_values = []
 			for name_str, type_str, refcount in to_add:
-				add_values.append([id, name_str, type_str, refcount])
+				add_values.append([id, path_ids[name_str], type_str, refcount])
 			self._engine.insertMany(self._ID_TABLE, add_values)
 
-	def _getValueTypes(self, id, field):
-		"""Returns list of value types already stored in given field"""
+		# keep cached shape up to date
+		shape = self._shapes.get(id)
+		if shape is not None:
+			for name_str, type_str in to_delete:
+				if name_str in shape:
+					shape[name_str].pop(type_str, None)
+					if len(shape[name_str]) == 0:
+						del shape[name_str]
+			for name_str, type_str, refcount in to_add:
+				shape.setdefault(name_str, {})[type_str] = refcount
+
+	def addNewRefcounts(self, records):
+		"""
+		Create reference counters for objects, which do not have any yet.
+		records - list of tuples (id, path string, type string, value)
+		"""
+		name_type_pairs = [(name_str, type_str) for id, name_str, type_str, refcount in records]
+		path_ids = self._getPathIds([name_str for name_str, type_str in name_type_pairs],
+			create=True)
+		self._resetRepairProgress(name_type_pairs)
 
-		# just query specification table for all types for given object and field
-		rows = self._engine.execute("SELECT " + self._TYPE_COLUMN + " FROM {} " +
-			"WHERE " + self._ID_COLUMN + "=? AND " + self._FIELD_COLUMN + "=?",
-			[self._ID_TABLE], [id, field.name_str])
+		self._engine.insertMany(self._ID_TABLE, ([id, path_ids[name_str], type_str, refcount]
+			for id, name_str, type_str, refcount in records))
 
-		return [type_str for type_str, in rows]
+		# shapes of these objects could have been cached before they were created
+		for id, name_str, type_str, refcount in records:
+			self._shapes.pop(id, None)
 
-	def _getAncestorsValueTypes(self, id, field):
+	def _getShape(self, id):
 		"""
-		Returns possible types for field ancestors (not including the field itself)
-		in form of {name_str: [type_str, ...], ...}
+		Returns information about all fields of the object from specification table
+		in form of {name_str: {type_str: refcount}}. The result must not be changed.
 		"""
-		ancestors = field.getAncestors()
-		ancestors.pop() # remove last element, which is equal to 'field'
+		if self._engine.inWriteTransaction() and id in self._shapes:
+			return self._shapes[id]
 
-		values = [id] + [ancestor.name_str for ancestor in ancestors]
-		queries = [self._FIELD_COLUMN + "=?"] * len(ancestors)
-		query = ("AND (" + " OR ".join(queries) + ")") if len(queries) > 0 else ""
+		return self._getShapes([id])[id]
 
-		rows = self._engine.execute("SELECT " + self._FIELD_COLUMN +
-			", " + self._TYPE_COLUMN + " FROM {} " +
-			" WHERE " + self._ID_COLUMN + "=? " + query,
-			[self._ID_TABLE], values)
+	def _getShapes(self, ids):
+		"""
+		Returns dictionary {id: shape} (see _getShape()) for given objects.
+		Specification entries of objects, which are not cached, are read together.
+		"""
+		# cache belongs to the main transaction, and can contain its uncommitted changes
+		if self._engine.inWriteTransaction():
+			shapes = {id: self._shapes[id] for id in ids if id in self._shapes}
+		else:
+			shapes = {}
+		missing = [id for id in set(ids) if id not in shapes]
+
+		for start in range(0, len(missing), self._MAX_QUERY_IDS):
+			chunk = missing[start:start + self._MAX_QUERY_IDS]
+			rows = self._engine.execute("SELECT " + self._ID_COLUMN + ", " +
+				self._PATH_COLUMN + ", " + self._TYPE_COLUMN + ", " +
+				self._REFCOUNT_COLUMN + " FROM {}, {} " +
+				"WHERE " + self._ID_COLUMN + " IN (" + ", ".join(["?"] * len(chunk)) + ") AND " +
+				self._FIELD_COLUMN + "=" + self._PATH_ID_COLUMN,
+				[self._ID_TABLE, self._PATH_TABLE], chunk)
+
+			for id in chunk:
+				shapes[id] = {}
+			for id, name_str, type_str, refcount in rows:
+				shapes[id].setdefault(name_str, {})[type_str] = refcount
+
+		# read-only transactions can run concurrently in other threads,
+		# and they may see different state of the database
+		if self._engine.inWriteTransaction():
+			for id in missing:
+				self._shapes[id] = shapes[id]
+
+		return shapes
 
-		result = {}
-		for name_str, type_str in rows:
-			if name_str not in result:
-				result[name_str] = []
-			result[name_str].append(type_str)
+	def _getValueTypes(self, id, field):
+		"""Returns list of value types already stored in given field"""
+		return list(self._getShape(id).get(field.name_str, {}))
 
-		return result
+	def _getAncestorsValueTypes(self, id, ancestors):
+		"""
+		Returns possible types for given field ancestors
+		in form of {name_str: [type_str, ...], ...}
+		"""
+		shape = self._getShape(id)
+		return {ancestor.name_str: list(shape[ancestor.name_str])
+			for ancestor in ancestors if ancestor.name_str in shape}
 
 	def getFirstConflict(self, id, field):
 		"""
@@ -191,90 +536,147 @@ class _StructureLayer:
 		path leading to the conflict)
 		"""
 
-		ancestors_types = self._getAncestorsValueTypes(id, field)
+		untyped_ancestors = field.getAncestors()
+		untyped_ancestors.pop() # remove last element, which is equal to 'field'
+		ancestors_types = self._getAncestorsValueTypes(id, untyped_ancestors)
+
+		# typed field objects for each possible ancestor, from top to bottom
+		ancestors = []
+		for ancestor in untyped_ancestors:
+			name_str = ancestor.name_str
+			for type_str in ancestors_types.get(name_str, []):
+				ancestors.append((name_str, Field(self._engine, ancestor.name, type_str=type_str)))
+
+		existing_values = self._selectExistingValues(id,
+			[ancestor for name_str, ancestor in ancestors])
 
 		# we will store field objects for all hierarchy leading to conflict here
 		existing_hierarchy = []
 
-		for name_str in sorted(ancestors_types):
-			ancestor = Field.fromNameStr(self._engine, name_str)
-			ancestor.fillListIndexesFromField(field)
-
-			new_structure_type = dict if isinstance(field.name[len(ancestor.name)], str) else list
+		for i, (name_str, ancestor) in enumerate(ancestors):
+			if i in existing_values:
+				new_structure_type = dict if isinstance(field.name[len(ancestor.name)], str) \
+					else list
+
+				# there is no conflict, if we want to add/change key in map
+				# or add/change index in list; otherwise there is a conflict
+				# (values other than pointers cannot contain structures at all)
+				if existing_values[i] is not None:
+					ancestor.db_value = existing_values[i]
+					conflict = type(ancestor.py_value) != new_structure_type
+				else:
+					conflict = True
 
-			# for each possible ancestor type, get ancestor value
-			for type_str in ancestors_types[name_str]:
-				ancestor.type_str = type_str
+				if conflict:
+					return ancestor, existing_hierarchy
 
-				rows = self._engine.execute("SELECT " + self._VALUE_COLUMN +
-					" FROM {} WHERE " + self._ID_COLUMN + "=? " +
-					ancestor.list_indexes_condition,
-					[ancestor.table_name], [id])
+			# all types of this ancestor were checked
+			if i == len(ancestors) - 1 or ancestors[i + 1][0] != name_str:
+				existing_hierarchy.append(name_str)
 
-				if len(rows) > 0:
-					ancestor.db_value, = rows[0]
-					existing_value = type(ancestor.py_value)
+		return None, existing_hierarchy
 
-					# there is no conflict, if we want to add/change key in map
-					# or add/change index in list; otherwise there is a conflict
-					conflict = not ((existing_value == list and new_structure_type == list) or
-						(existing_value == dict and new_structure_type == dict))
+	def _selectExistingValues(self, id, fields):
+		"""
+		Find which of given typed fields have records for given object.
+		Returns dictionary {field position in list: value}; values are read
+		only for pointers (for other types they are None, because pointers
+		cannot be NULL).
+		"""
+		result = {}
+		for start in range(0, len(fields), self._MAX_COMPOUND_QUERIES):
+
+			# all fields are checked with one compound query, where each subquery
+			# returns position of the field together with its value
+			queries = []
+			tables = []
+			values = []
+			for i in range(start, min(len(fields), start + self._MAX_COMPOUND_QUERIES)):
+				field = fields[i]
+				table_name, field_cond, field_values = self._getFieldTable(field)
+				if self._engine.getValueClass(field.type_str) == interface.Pointer:
+					value_str = self._VALUE_COLUMN
+				else:
+					value_str = "NULL"
 
-					if conflict:
-						return ancestor, existing_hierarchy
+				queries.append("SELECT " + str(i) + ", " + value_str + " FROM {} WHERE " +
+					self._ID_COLUMN + "=?" + field_cond + field.list_indexes_condition)
+				tables.append(table_name)
+				values += [id] + field_values
 
-			existing_hierarchy.append(ancestor.name_str)
+			rows = self._engine.execute(" UNION ALL ".join(queries), tables, values)
+			for i, value in rows:
+				result[i] = value
 
-		return None, existing_hierarchy
+		return result
 
 	def getRefcounts(self, id, name_type_pairs):
 		"""Returns reference counts for given (name string, type string) pairs."""
+		shape = self._getShape(id)
+		return {(name_str, type_str): shape[name_str][type_str]
+			for name_str, type_str in name_type_pairs
+			if type_str in shape.get(name_str, {})}
 
-		elem = "(" + self._FIELD_COLUMN + "=? AND " + self._TYPE_COLUMN + "=?)"
-		cond = " OR ".join([elem] * len(name_type_pairs))
-
-		values = [id]
-		for name_str, type_str in name_type_pairs:
-			values += [name_str, type_str]
-
-		rows = self._engine.execute("SELECT " + self._FIELD_COLUMN + ", " +
-			self._TYPE_COLUMN + ", " + self._REFCOUNT_COLUMN +
-			" FROM {} WHERE " + self._ID_COLUMN + "=? AND (" + cond + ")",
-			[self._ID_TABLE], values)
-
-		return {(name_str, type_str): refcount for name_str, type_str, refcount in rows}
-
-	def _getRawFieldsInfo(self, id, masks=None, include_refcounts=False):
+	def _getRawFieldsInfo(self, id, masks=None, include_refcounts=False, shape=None):
 		"""
 		Returns list of all entries in specifictaion table, whose names match one of given masks
+		(shape of the object can be passed, if it is already known)
 		Return value: [(name string, type_string, refcount or None), ...]
 		"""
 
-		# If masks list is given, return only fields, which contain its name in the beginning
-		if masks is not None:
-			regexp_cond_elem = self._FIELD_COLUMN + " " + self._engine.getRegexpOp() + " ?"
-			regexp_cond = " AND (" + " OR ".join([regexp_cond_elem] * len(masks)) + ")"
-			regexp_vals = ["^" + re.escape(mask.name_str) + "(\.\.|$)" for mask in masks]
-		else:
-			regexp_vals = []
-			regexp_cond = ""
+		# if shape is not cached, only matching entries are read from the database
+		if shape is None and masks is not None and \
+				(not self._engine.inWriteTransaction() or id not in self._shapes):
+			return self._selectRawFieldsInfo(id, masks, include_refcounts)
 
-		# Get information
-		rows = self._engine.execute("SELECT " + self._FIELD_COLUMN + ", " + self._TYPE_COLUMN +
-			((", " + self._REFCOUNT_COLUMN) if include_refcounts else "") +
-			" FROM {} WHERE " + self._ID_COLUMN + "=?" + regexp_cond,
-			[self._ID_TABLE], [id] + regexp_vals)
+		if shape is None:
+			shape = self._getShape(id)
+
+		# If masks list is given, return only fields, which contain its name in the beginning.
+		# Name strings do not contain list indexes, so it is enough to select the mask itself
+		# and names, starting with mask name and separator (i.e., mask descendants)
+		if masks is not None:
+			names = set()
+			prefixes = []
+			for mask in masks:
+				names.add(mask.name_str)
+				prefixes.append(Field(self._engine, mask.name + [None]).name_str)
+			prefixes = tuple(prefixes)
 
 		result = []
-		for name_str, type_str, *refcount in rows:
-			if include_refcounts:
-				result.append((name_str, type_str, refcount[0]))
-			else:
-				result.append((name_str, type_str, None))
+		for name_str, types in shape.items():
+			if masks is not None and name_str not in names and \
+					not name_str.startswith(prefixes):
+				continue
+
+			for type_str, refcount in types.items():
+				result.append((name_str, type_str, refcount if include_refcounts else None))
 
 		return result
 
-	def getFieldsInfo(self, id, masks=None, include_refcounts=False):
+	def _selectRawFieldsInfo(self, id, masks, include_refcounts):
+		"""
+		Same as _getRawFieldsInfo(), but matching entries are selected
+		from specification table using prefix conditions for path names
+		"""
+		mask_conds = []
+		mask_vals = []
+		for mask in masks:
+			descendants = Field(self._engine, mask.name + [None])
+			prefix_cond, prefix_vals = self._engine.getPrefixCondition(
+				self._PATH_COLUMN, descendants.name_str)
+			mask_conds.append("(" + self._PATH_COLUMN + "=? OR " + prefix_cond + ")")
+			mask_vals += [mask.name_str] + prefix_vals
+
+		rows = self._engine.execute("SELECT " + self._PATH_COLUMN + ", " + self._TYPE_COLUMN +
+			", " + self._REFCOUNT_COLUMN + " FROM {}, {} WHERE " + self._ID_COLUMN + "=? AND " +
+			self._FIELD_COLUMN + "=" + self._PATH_ID_COLUMN + " AND (" +
+			" OR ".join(mask_conds) + ")", [self._ID_TABLE, self._PATH_TABLE], [id] + mask_vals)
+
+		return [(name_str, type_str, refcount if include_refcounts else None)
+			for name_str, type_str, refcount in rows]
+
+	def getFieldsInfo(self, id, masks=None, include_refcounts=False, shape=None):
 		"""
 		Get field objects and refcounts, which matches one of given masks.
 		List indexes of each field object are defined using indexes from corresponding mask.
@@ -282,7 +684,8 @@ class _StructureLayer:
 		Return value: [(fields_list, refcount or None)]
 		"""
 
-		raw_fields_info = self._getRawFieldsInfo(id, masks, include_refcounts=include_refcounts)
+		raw_fields_info = self._getRawFieldsInfo(id, masks,
+			include_refcounts=include_refcounts, shape=shape)
 
 		# construct resulting list of partially defined fields
 		res = []
@@ -305,25 +708,45 @@ class _StructureLayer:
 
 		return res
 
-	def getFlatFieldsInfo(self, id, masks=None):
+	def getFlatFieldsInfo(self, id, masks=None, shape=None):
 		"""Returns list of typed and defined fields, matching given masks"""
 
-		fields_info = self.getFieldsInfo(id, masks)
+		fields_info = self.getFieldsInfo(id, masks, shape=shape)
 
 		res = []
 		for fields, refcount in fields_info:
 			res += fields
 		return res
 
+	def getFlatFieldsInfoMany(self, ids_masks):
+		"""
+		Same as getFlatFieldsInfo() for several pairs (object ID, masks);
+		specification entries of all objects are read together.
+		Returns list of lists of fields, which can be shared between objects
+		and must not be changed.
+		"""
+		shapes = self._getShapes([id for id, masks in ids_masks])
+
+		# objects usually have the same fields, so results are reused
+		# for objects with the same shape and masks
+		results = {}
+		res = []
+		for id, masks in ids_masks:
+			key = (frozenset((name_str, type_str) for name_str, types in shapes[id].items()
+					for type_str in types),
+				None if masks is None else tuple(tuple(mask.name) for mask in masks))
+			if key not in results:
+				results[key] = self.getFlatFieldsInfo(id, masks, shape=shapes[id])
+			res.append(results[key])
+
+		return res
+
 	def objectExists(self, id):
 		"""Check if object exists in database"""
 
 		# We need just check if there is at least one row with its id
 		# in specification table
-		rows = self._engine.execute("SELECT COUNT(*) FROM {} WHERE " + self._ID_COLUMN + "=?",
-			[self._ID_TABLE], [id])
-
-		return rows[0][0] > 0
+		return len(self._getShape(id)) > 0
 
 	def getFieldValues(self, id, fields):
 		"""
@@ -376,16 +799,22 @@ class _StructureLayer:
 				stub_columns = ""
 
 			# construct query for reading
+			table_name, field_cond, field_values = self._getFieldTable(field)
 			query = "SELECT " + str(i) + ", " + self._VALUE_COLUMN + \
 				field.list_indexes_query + stub_columns + \
-				" FROM {} WHERE " + self._ID_COLUMN + "=?" + \
+				" FROM {} WHERE " + self._ID_COLUMN + "=?" + field_cond + \
 				field.list_indexes_condition
 
-			values.append(id)
-			tables.append(field.table_name)
+			values.append([id] + field_values)
+			tables.append(table_name)
 			queries.append(query)
 
-		rows = self._engine.execute(" UNION ".join(queries), tables, values)
+		# compound query cannot contain too many subqueries
+		rows = []
+		for start in range(0, len(queries), self._MAX_COMPOUND_QUERIES):
+			end = start + self._MAX_COMPOUND_QUERIES
+			rows += self._engine.execute(" UNION ".join(queries[start:end]), tables[start:end],
+				[value for query_values in values[start:end] for value in query_values])
 
 		res = []
 		for index, value, *list_indexes in rows:
@@ -396,29 +825,75 @@ class _StructureLayer:
 
 		return res
 
-	def ensureTablesExist(self, fields):
+	def getFieldValuesMany(self, ids_fields):
 		"""
-		For given list of fields, make sure that corresponding field table exists
-		for each of them.
+		Read values of given fields for several objects.
+		ids_fields is a list of pairs (object ID, list of fields); fields should have
+		definite types, and their tables are assumed to exist.
+		Returns dictionary {id: list of defined field objects}.
 		"""
 
-		# check which field tables already exist
+		# the same field of different objects is read with one query
+		groups = {}
+		for id, fields in ids_fields:
+			for field in fields:
+				key = (field.type_str, tuple(field.name))
+				if key not in groups:
+					groups[key] = (field, [])
+				groups[key][1].append(id)
+
+		result = {id: [] for id, fields in ids_fields}
+		for field, ids in groups.values():
+			table_name, field_cond, field_values = self._getFieldTable(field)
+			for start in range(0, len(ids), self._MAX_QUERY_IDS):
+				chunk = ids[start:start + self._MAX_QUERY_IDS]
+				rows = self._engine.execute("SELECT " + self._ID_COLUMN + ", " +
+					self._VALUE_COLUMN + field.list_indexes_query +
+					" FROM {} WHERE " + self._ID_COLUMN + " IN (" +
+					", ".join(["?"] * len(chunk)) + ")" + field_cond +
+					field.list_indexes_condition, [table_name], chunk + field_values)
+
+				for id, value, *list_indexes in rows:
+					new_field = Field(self._engine, field.name,
+						type_str=field.type_str, db_value=value)
+					new_field.fillListIndexes(list_indexes)
+					result[id].append(new_field)
 
-		elem = "(" + self._FIELD_COLUMN + "=? AND " + self._TYPE_COLUMN + "=?)"
-		cond = " OR ".join([elem] * len(fields))
+		return result
 
-		values = []
-		tables = {(field.name_str, field.type_str): field for field in fields}
-		for name_str, type_str in tables:
-			values += [name_str, type_str]
+	def iterAllFieldValues(self):
+		"""
+		Generator, returning pairs (object ID, list of defined field objects)
+		for all objects in database, ordered by ID.
+		Each field table is scanned once, and scans are merged on the fly.
+		"""
+		streams = [self._iterTableFields(table_name) for table_name in self._getFieldTables()]
+		merged = heapq.merge(*streams, key=lambda x: x[0])
+		for obj_id, group in itertools.groupby(merged, key=lambda x: x[0]):
+			yield obj_id, [field for _, field in group]
+
+	def _iterTableFields(self, table_name):
+		"""Generator, returning pairs (object ID, field object) for all records of the table"""
+		field = Field.fromTableName(self._engine, table_name)
+		rows = self._engine.executeIter("SELECT " + self._ID_COLUMN + ", " +
+			self._VALUE_COLUMN + field.list_indexes_query +
+			" FROM {} ORDER BY " + self._ID_COLUMN, [table_name])
+
+		for obj_id, value, *list_indexes in rows:
+			new_field = Field(self._engine, field.name, type_str=field.type_str, db_value=value)
+			new_field.fillListIndexes(list_indexes)
+			yield obj_id, new_field
 
-		rows = self._engine.execute("SELECT " + self._FIELD_COLUMN + ", " + self._TYPE_COLUMN +
-			" FROM {} WHERE " + cond, [self._ID_TABLE], values)
+	def ensureTablesExist(self, fields):
+		"""
+		For given list of fields, make sure that corresponding field table exists
+		for each of them.
+		"""
 
-		# delete existing field table from list - we do not need to create it
-		for name_str, type_str in rows:
-			if (name_str, type_str) in tables:
-				del tables[(name_str, type_str)]
+		# check which field tables already exist
+		tables = {self.getFieldTableName(field): field for field in fields}
+		for table_name in self._engine.selectExistingTables(list(tables.keys())):
+			del tables[table_name]
 
 		# create all remaining tables
 		for field in tables.values():
@@ -435,93 +910,601 @@ class _StructureLayer:
 			self._VALUE_COLUMN, self._ID_TYPE, self._INT_TYPE)
 		self._engine.execute("CREATE TABLE {} (" + table_spec + ")",
 			[field.table_name])
+		self._createFieldIndexes(field)
 
-	def buildSqlQuery(self, condition):
-		"""Recursive function to transform condition into SQL query"""
+	def getFieldTableName(self, field):
+		"""
+		Returns name of the table, where values of given field are stored
 
-		if condition is None:
-			return "SELECT DISTINCT " + self._ID_COLUMN + " FROM {}", [self._ID_TABLE], []
-
-		if not condition.leaf:
-			# child conditions
-			cond1, tables1, values1 = self.buildSqlQuery(condition.operand1)
-			cond2, tables2, values2 = self.buildSqlQuery(condition.operand2)
-
-			# mapping to SQL operations
-			operations = {
-				op.AND: 'INTERSECT',
-				op.OR: 'UNION'
-			}
-
-			if cond1 is None and cond2 is None:
-				return None, None, None
-			elif cond1 is None:
-				if condition.operator == op.AND:
-					return None, None, None
-				elif condition.operator == op.OR:
-					return cond2, tables2, values2
-			elif cond2 is None:
-				if condition.operator == op.AND:
-					return None, None, None
-				elif condition.operator == op.OR:
-					return cond1, tables1, values1
-
-			return "SELECT * FROM (" + cond1 + ") as temp " + \
-				operations[condition.operator] + " SELECT * FROM (" + \
-				cond2 + ") as temp", tables1 + tables2, values1 + values2
-
-		# Leaf condition
-		op1 = condition.operand1 # it must be Field without value
-		op2 = condition.operand2 # it must be Field with value
+		field should have definite type
+		"""
+		return field.table_name
 
-		# If table with given field does not exist, just return empty query
-		if op1 is None:
-			if condition.invert:
-				return "SELECT DISTINCT " + self._ID_COLUMN + " FROM {}", \
-					[self._ID_TABLE], []
-			else:
-				return None, None, None
+	def _getFieldTable(self, field):
+		"""
+		Returns tuple (table name, condition, values), where condition
+		(either empty or starting with ' AND ') and values select records
+		of given field in its table
 
-		not_str = " NOT " if condition.invert else " "
+		field should have definite type
+		"""
+		return field.table_name, "", []
 
-		# mapping to SQL comparisons
-		comparisons = {
-			op.EQ: '=',
-			op.REGEXP: self._engine.getRegexpOp(),
-			op.LT: '<',
-			op.GT: '>',
-			op.LTE: '<=',
-			op.GTE: '>='
-		}
+	def _getValueRecord(self, id, field):
+		"""Returns list of column values for the record of given field"""
+		return [id] + field.value_record
+
+	def _markTableForCollection(self, table_name):
+		"""Called when object does not have records in field table anymore"""
+		self._gc_tables.add(table_name)
+
+	def collectGarbage(self):
+		"""
+		Delete field tables, which became empty after deletion of records.
+		Tables are considered empty if there are no entries for their fields
+		in specification table.
+		"""
+		if len(self._gc_tables) == 0:
+			return
+
+		# some tables could have been deleted or rolled back since they were marked
+		tables = self._engine.selectExistingTables(list(self._gc_tables))
+		self._gc_tables.clear()
+
+		fields = {}
+		for table_name in tables:
+			field = Field.fromTableName(self._engine, table_name)
+			fields[(field.name_str, field.type_str)] = table_name
+
+		# fields without path IDs cannot have entries in specification table
+		path_ids = self._getPathIds([name_str for name_str, type_str in fields])
+		pairs = [(path_ids[name_str], type_str) for name_str, type_str in fields
+			if name_str in path_ids]
+
+		# all pairs are checked with one query, which returns the ones still in use
+		used = set()
+		chunk_size = self._MAX_QUERY_IDS // 2
+		for start in range(0, len(pairs), chunk_size):
+			chunk = pairs[start:start + chunk_size]
+			rows = self._engine.execute("SELECT DISTINCT " + self._PATH_COLUMN + ", " +
+				self._TYPE_COLUMN + " FROM {}, {} WHERE " +
+				self._FIELD_COLUMN + "=" + self._PATH_ID_COLUMN + " AND (" +
+				" OR ".join(["(" + self._FIELD_COLUMN + "=? AND " +
+					self._TYPE_COLUMN + "=?)"] * len(chunk)) + ")",
+				[self._ID_TABLE, self._PATH_TABLE],
+				[value for pair in chunk for value in pair])
+			used.update((name_str, type_str) for name_str, type_str in rows)
+
+		for key, table_name in sorted(fields.items()):
+			if key not in used:
+				self._deleteFieldTable(table_name)
+
+	def buildSqlQuery(self, condition, distinct=True):
+		"""
+		Transform condition into SQL query.
+		If distinct is False, query can return the same ID several times
+		(it is enough for checking whether anything can be found, and is faster).
+		Returns tuple (query, tables, values); query is None if nothing can be found.
+		"""
+		query, tables, values, plan = self._buildQueryPlan(condition, distinct=distinct)
+		return query, tables, values
+
+	def explainSqlQuery(self, condition):
+		"""Returns text description of the plan, which is used to search by condition"""
+		query, tables, values, plan = self._buildQueryPlan(condition, estimate=True)
+
+		def describe(plan, indent):
+			operation, description, estimate, children = plan
+			line = " " * indent + operation
+			if description != "":
+				line += " " + description
+			if estimate is not None:
+				line += " (~" + str(estimate) + " records)"
+			return [line] + [line for child in children for line in describe(child, indent + 2)]
+
+		return "\n".join(describe(plan, 0))
+
+	def buildPagedSqlQuery(self, condition, order_by=None, descending=False,
+			limit=None, offset=None, cursor=None, with_cursors=False):
+		"""
+		Transform condition into SQL query, which returns IDs of found objects in definite order.
+		Objects are ordered by values of order_by field (objects without it go last)
+		and then by IDs; descending order is exactly reverse to ascending one.
+		If cursor (see getCursor()) is given, only objects, which follow it, are returned.
+		If with_cursors is True, query also returns columns, which are necessary
+		to build cursors for found objects.
+		Returns tuple (query, tables, values); query is None if nothing can be found.
+		"""
+		query, tables, values = self.buildSqlQuery(condition)
+		if query is None:
+			return None, None, None
+
+		joins, join_tables, join_values, key = self._getOrderKey(order_by)
+		columns = ["candidates." + self._ID_COLUMN]
+		if with_cursors and order_by is not None:
+			columns += self._getCursorColumns(key)
+
+		result = "SELECT " + ", ".join(columns) + " FROM (" + query + ") AS candidates" + joins
+		tables = tables + join_tables
+		values = values + join_values
+
+		if cursor is not None:
+			cursor_cond, cursor_values = self._getCursorCondition(key, cursor, descending)
+			result += " WHERE " + cursor_cond
+			values += cursor_values
+
+		direction = " DESC" if descending else ""
+		result += " ORDER BY " + ", ".join([expression + direction
+			for expression, group_num in key] + ["candidates." + self._ID_COLUMN + direction])
 
-		# build query
+		if limit is not None or offset is not None:
+			limit_clause, limit_values = self._engine.getLimitClause(limit, offset)
+			result += limit_clause
+			values += limit_values
+
+		return result, tables, values
+
+	def _getOrderKey(self, field):
+		"""
+		Returns tuple (joins, tables, values, key) for ordering objects, aliased as 'candidates',
+		by given field. joins attach values of the field to objects; key is a list
+		of tuples (expression, group number): the first expression is the number
+		of the group of value types (or the number of groups, if object does not have
+		the field), the others are values of each group, which has field tables
+		(they are NULL, unless the value of the object belongs to the group).
+		The ID of the object is the last part of the key, which is not included in the list.
+		"""
+		if field is None:
+			return "", [], [], []
+
+		joins = ""
 		tables = []
 		values = []
+		cases = []
+		key = []
+		for group_num, group in enumerate(self._ORDER_GROUPS):
+			typed_fields = [Field(self._engine, field.name, type_str=type_str)
+				for type_str in group]
+			existing_tables = self._engine.selectExistingTables(
+				[self.getFieldTableName(typed_field) for typed_field in typed_fields])
+
+			group_values = []
+			for typed_field in typed_fields:
+				if self.getFieldTableName(typed_field) not in existing_tables:
+					continue
+
+				# stored values are never NULL, so NULL means that
+				# the object does not have the value of this type
+				alias = "order" + str(len(tables))
+				records_query, records_tables, records_values = \
+					self._getFieldRecordsQuery(typed_field)
+				joins += " LEFT JOIN (" + records_query + ") AS " + alias + " ON " + \
+					alias + "." + self._ID_COLUMN + "=candidates." + self._ID_COLUMN
+				tables += records_tables
+				values += records_values
+				group_values.append(alias + "." + self._VALUE_COLUMN)
+
+			if len(group_values) > 0:
+				cases.append("WHEN " + " OR ".join([value + " IS NOT NULL"
+					for value in group_values]) + " THEN " + str(group_num))
+				key.append((group_values[0] if len(group_values) == 1 else
+					"COALESCE(" + ", ".join(group_values) + ")", group_num))
+
+		# if the field does not have any tables, all objects are ordered by IDs
+		# (a constant group number would be treated by ORDER BY as a column number)
+		if len(cases) == 0:
+			return "", [], [], []
+
+		group_expression = "CASE " + " ".join(cases) + " ELSE " + \
+			str(len(self._ORDER_GROUPS)) + " END"
+
+		return joins, tables, values, [(group_expression, None)] + key
+
+	def _getFieldRecordsQuery(self, field):
+		"""
+		Returns tuple (query, tables, values) for the query, which selects
+		IDs and values from the records of given field
+		"""
+		table_name, field_cond, field_values = self._getFieldTable(field)
 
-		# construct comparing condition
-		comp_str = "WHERE " + not_str + " " + self._VALUE_COLUMN + " " + \
-			comparisons[condition.operator] + " ?"
-		values = [op2.db_value]
+		if self._lists == 'sparse':
+			list_cond, list_tables, list_values = self._getListPositionsCondition(field)
+		else:
+			list_cond, list_tables, list_values = field.list_indexes_condition, [], []
 
-		# construct query
-		result = "SELECT DISTINCT " + self._ID_COLUMN + " FROM {} " + \
-			comp_str + " " + op1.list_indexes_condition
-		tables = [condition.operand1.table_name]
+		# both conditions are either empty or start with ' AND '
+		records_cond = field_cond + list_cond
+		return "SELECT " + self._ID_COLUMN + ", " + self._VALUE_COLUMN + \
+			" FROM {} AS records" + \
+			(" WHERE " + records_cond[len(" AND "):] if records_cond != "" else ""), \
+			[table_name] + list_tables, field_values + list_values
 
-		if condition.invert:
-		# we will add objects that do not even have such field
-			result += " UNION "
+	def _getCursorColumns(self, key):
+		"""
+		Returns list of expressions for the key of the object in order of given key:
+		the group number and values of each group (NULL for groups without field tables)
+		"""
+
+		# if the field does not have any tables, all objects are in the last group
+		if len(key) == 0:
+			return [str(len(self._ORDER_GROUPS))] + ["NULL"] * len(self._ORDER_GROUPS)
+
+		group_values = {group_num: expression for expression, group_num in key[1:]}
+		return [key[0][0]] + [group_values.get(group_num, "NULL")
+			for group_num in range(len(self._ORDER_GROUPS))]
+
+	def getCursor(self, row):
+		"""
+		Returns cursor for the row of the query, built by buildPagedSqlQuery() with cursors.
+		Cursor is a list [ID] if objects are ordered by IDs only, [group number, ID]
+		if the object does not have the ordering field, and [group number, value, ID] otherwise.
+		"""
+		if len(row) == 1:
+			return [row[0]]
+
+		id, group_num, *group_values = row
+		if group_num < len(self._ORDER_GROUPS):
+			return [group_num, group_values[group_num], id]
+		else:
+			return [group_num, id]
+
+	def _getCursorCondition(self, key, cursor, descending):
+		"""
+		Returns tuple (condition, values) for the condition, which selects objects
+		following given cursor (see getCursor()) in the order of given key
+		"""
+		comparison = " " + ("<" if descending else ">") + " ?"
+		id_column = "candidates." + self._ID_COLUMN
+
+		if len(cursor) == 1:
+			return id_column + comparison, cursor
+
+		# if the field does not have any tables, all objects are in the last group
+		group_expression = key[0][0] if len(key) > 0 else str(len(self._ORDER_GROUPS))
+		cursor_group = cursor[0]
+		cursor_id = cursor[-1]
+		condition = group_expression + comparison + " OR (" + group_expression + "=? AND "
+		cursor_values = [cursor_group, cursor_group]
+
+		# objects of the same group are compared by values of this group
+		if len(cursor) == 3:
+			for expression, group_num in key[1:]:
+				if group_num == cursor_group:
+					condition += "(" + expression + comparison + " OR (" + expression + \
+						"=? AND " + id_column + comparison + ")))"
+					return condition, cursor_values + [cursor[1], cursor[1], cursor_id]
+
+		condition += id_column + comparison + ")"
+		return condition, cursor_values + [cursor_id]
+
+	def _buildQueryPlan(self, condition, estimate=False, distinct=True):
+		"""
+		Recursive function to transform condition into SQL query.
+		Returns tuple (query, tables, values, plan), where query is None if nothing
+		can be found, and plan is a tuple (operation, description, estimated number
+		of records or None, list of child plans).
+		Numbers of records are estimated only if estimate is True, or for the operands
+		of AND, which are ordered by them.
+		If distinct is False, query can return the same ID several times.
+		"""
+
+		select = "SELECT DISTINCT " if distinct else "SELECT "
+
+		if condition is None:
+			return select + self._ID_COLUMN + " FROM {}", [self._ID_TABLE], [], \
+				("ALL", "", None, [])
+
+		if condition.leaf:
+			return self._buildLeafQueryPlan(condition, estimate, distinct)
+
+		if condition.operator == op.OR:
+			query1, tables1, values1, plan1 = self._buildQueryPlan(condition.operand1,
+				estimate, distinct)
+			query2, tables2, values2, plan2 = self._buildQueryPlan(condition.operand2,
+				estimate, distinct)
+
+			if query1 is None:
+				return query2, tables2, values2, plan2
+			elif query2 is None:
+				return query1, tables1, values1, plan1
+
+			return "SELECT * FROM (" + query1 + ") as temp UNION " + \
+				("" if distinct else "ALL ") + "SELECT * FROM (" + \
+				query2 + ") as temp", tables1 + tables2, values1 + values2, \
+				("UNION", "", self._addEstimates(plan1[2], plan2[2]), [plan1, plan2])
+
+		# Conjunction: the operand, which selects least records, is searched for first,
+		# and other operands are checked only for found objects
+
+		operands = []
+		for operand in self._getConjunctionOperands(condition):
+			query, tables, values, plan = self._buildQueryPlan(operand, estimate=True,
+				distinct=distinct)
+			if query is None:
+				return None, None, None, ("NOTHING", "", 0 if estimate else None, [])
+
+			# operand can be true for any object (if it is an inverted condition
+			# for the field, which does not have values)
+			if plan[0] == "ALL":
+				continue
+
+			operands.append((plan[2], operand, query, tables, values, plan))
+
+		if len(operands) == 0:
+			return self._buildQueryPlan(None, distinct=distinct)
+		elif len(operands) == 1:
+			return operands[0][2:]
+
+		operands.sort(key=lambda x: x[0])
+		query, tables, values, plan = operands[0][2:]
+		plans = [plan]
+
+		filters = []
+		for operand_estimate, operand, operand_query, operand_tables, operand_values, plan \
+				in operands[1:]:
+			if operand.leaf:
+			# check records of the object with correlated subquery, using index on object ID
+				filter, operand_tables, operand_values = self._buildLeafFilter(operand)
+				plans.append(("EXISTS",) + plan[1:])
+			else:
+				filter = "candidates." + self._ID_COLUMN + " IN (" + operand_query + ")"
+				plans.append(("IN", "", plan[2], [plan]))
+
+			filters.append(filter)
+			tables = tables + operand_tables
+			values = values + operand_values
+
+		return "SELECT " + self._ID_COLUMN + " FROM (" + query + ") AS candidates WHERE " + \
+			" AND ".join(filters), tables, values, \
+			("INTERSECT", "", operands[0][0], plans)
+
+	def _getConjunctionOperands(self, condition):
+		"""Returns list of operands of the chain of AND conditions"""
+		if condition.leaf or condition.operator != op.AND:
+			return [condition]
+
+		return self._getConjunctionOperands(condition.operand1) + \
+			self._getConjunctionOperands(condition.operand2)
+
+	def _addEstimates(self, estimate1, estimate2):
+		if estimate1 is None or estimate2 is None:
+			return None
+		return estimate1 + estimate2
+
+	def _buildLeafQueryPlan(self, condition, estimate, distinct):
+		"""Returns tuple (query, tables, values, plan) for leaf condition"""
+
+		# If table with given field does not exist, just return empty query
+		if condition.operand1 is None:
+			if condition.invert:
+				return self._buildQueryPlan(None, distinct=distinct)
+			else:
+				return None, None, None, ("NOTHING", "", 0 if estimate else None, [])
+
+		records_cond, tables, values = self._getRecordsCondition(condition)
+		result = ("SELECT DISTINCT " if distinct else "SELECT ") + self._ID_COLUMN + \
+			" FROM {} AS records WHERE " + records_cond
 
 		# if we need to invert results, we have to add all objects that do
 		# not have this field explicitly, because they won't be caught by previous query
 		if condition.invert:
-			result += "SELECT " + self._ID_COLUMN + " FROM " + \
+			missing_cond, missing_tables, missing_values = self._getMissingFieldCondition(
+				condition.operand1)
+			result += " UNION SELECT " + self._ID_COLUMN + " FROM " + \
 				"(SELECT DISTINCT " + self._ID_COLUMN + " FROM {} " + \
-				"EXCEPT SELECT DISTINCT " + self._ID_COLUMN + " FROM {}) as temp"
-			tables += [self._ID_TABLE, condition.operand1.table_name]
+				"EXCEPT SELECT DISTINCT " + self._ID_COLUMN + " FROM {} AS spec WHERE " + \
+				missing_cond + ") as temp"
+			tables += [self._ID_TABLE, self._ID_TABLE] + missing_tables
+			values += missing_values
+
+		plan = ("SEARCH", self._describeCondition(condition),
+			self._estimateRecords(condition) if estimate else None, [])
+		return result, tables, values, plan
+
+	def _buildLeafFilter(self, condition):
+		"""
+		Returns tuple (filter, tables, values), where filter checks that object
+		from the subquery, aliased as 'candidates', satisfies given leaf condition
+		"""
+		records_cond, tables, values = self._getRecordsCondition(condition)
+		result = "EXISTS (SELECT 1 FROM {} AS records WHERE records." + self._ID_COLUMN + \
+			"=candidates." + self._ID_COLUMN + " AND " + records_cond + ")"
+
+		if condition.invert:
+			missing_cond, missing_tables, missing_values = self._getMissingFieldCondition(
+				condition.operand1)
+			result = "(" + result + " OR NOT EXISTS (SELECT 1 FROM {} AS spec WHERE spec." + \
+				self._ID_COLUMN + "=candidates." + self._ID_COLUMN + " AND " + \
+				missing_cond + "))"
+			tables += [self._ID_TABLE] + missing_tables
+			values += missing_values
 
 		return result, tables, values
 
+	def _getRecordsCondition(self, condition):
+		"""
+		Returns tuple (condition, tables, values) for leaf condition; the first table
+		is the field table, aliased as 'records', which should be filtered by condition.
+		"""
+		op1 = condition.operand1 # it must be Field without value
+
+		not_str = "NOT " if condition.invert else ""
+
+		# construct comparing condition
+		table_name, field_cond, field_values = self._getFieldTable(op1)
+		comparison, comp_tables, comp_values = self._getComparison(condition, table_name)
+		comp_str = not_str + comparison + field_cond
+		values = comp_values + field_values
+
+		# positions in sparse lists are not equal to stored list indexes
+		if self._lists == 'sparse':
+			list_cond, list_tables, list_values = self._getListPositionsCondition(op1)
+		else:
+			list_cond, list_tables, list_values = op1.list_indexes_condition, [], []
+
+		return comp_str + " " + list_cond, [table_name] + comp_tables + list_tables, \
+			values + list_values
+
+	def _getComparison(self, condition, table_name):
+		"""
+		Returns tuple (comparison, tables, values) for leaf condition; comparison
+		checks values in the field table with given name
+		"""
+		if condition.operator == op.MATCH:
+			comparison, tables = self._engine.getFullTextCondition(
+				self._getFullTextIndexName(table_name), self._VALUE_COLUMN)
+			query = self._engine.getFullTextQuery(
+				interface.splitFullTextQuery(condition.operand2.py_value))
+			return comparison, tables, [query]
+		else:
+			return self._VALUE_COLUMN + " " + self._COMPARISONS[condition.operator] + " ?", \
+				[], [condition.operand2.db_value]
+
+	def _getMissingFieldCondition(self, field):
+		"""
+		Returns tuple (condition, tables, values); condition selects entries
+		of the field in specification table
+		"""
+		return self._FIELD_COLUMN + " IN (SELECT " + self._PATH_ID_COLUMN + " FROM {} WHERE " + \
+			self._PATH_COLUMN + "=?) AND " + self._TYPE_COLUMN + "=?", \
+			[self._PATH_TABLE], [field.name_str, field.type_str]
+
+	def _describeCondition(self, condition):
+		"""Returns text description of leaf condition"""
+		return repr(condition.operand1.name) + " " + ("NOT " if condition.invert else "") + \
+			condition.operator + " " + repr(condition.operand2.py_value)
+
+	def _estimateRecords(self, condition):
+		"""
+		Returns estimated number of records, satisfying leaf condition.
+		Matching records are counted using index on values (or full-text index),
+		but not more than _ESTIMATE_LIMIT of them; if there are more, or the index
+		cannot be used, the number of records of the field is returned.
+		"""
+		field = condition.operand1
+		if condition.invert or condition.operator == op.REGEXP:
+			return self._getRecordsNumber(field)
+
+		table_name, field_cond, field_values = self._getFieldTable(field)
+		comparison, comp_tables, comp_values = self._getComparison(condition, table_name)
+		rows = self._engine.execute("SELECT COUNT(*) FROM (SELECT 1 FROM {} WHERE " +
+			comparison + field_cond + " LIMIT " + str(self._ESTIMATE_LIMIT) + ") AS probe",
+			[table_name] + comp_tables, comp_values + field_values)
+
+		if rows[0][0] < self._ESTIMATE_LIMIT:
+			return rows[0][0]
+		else:
+			return max(rows[0][0], self._getRecordsNumber(field))
+
+	def _getRecordsNumber(self, field):
+		"""
+		Returns number of records of the field with definite type.
+		Numbers are cached until records of the field are changed (see __init__()).
+		"""
+		table_name, field_cond, field_values = self._getFieldTable(field)
+		key = (table_name, tuple(field_values))
+		if key not in self._records_numbers:
+			rows = self._engine.execute("SELECT COUNT(*) FROM {}" +
+				(" WHERE " + field_cond[len(" AND "):] if field_cond != "" else ""),
+				[table_name], field_values)
+			self._records_numbers[key] = rows[0][0]
+
+		return self._records_numbers[key]
+
+	def _forgetRecordsNumber(self, table_name, field_values):
+		"""Drop cached number of records of the field, which is selected by given values"""
+		self._records_numbers.pop((table_name, tuple(field_values)), None)
+
+	def _getListPositionsCondition(self, field):
+		"""
+		Returns tuple (condition, tables, values) for sparse lists; condition (either empty
+		or starting with ' AND ') selects records of given field in table, aliased as
+		'records', whose list elements have positions equal to list indexes of the field.
+		Position of the element is the number of elements with lesser keys in the same list.
+		"""
+		conditions = []
+		tables = []
+		values = []
+
+		element_name = []
+		parent_columns = []
+		for elem in field.name:
+			if isinstance(elem, str):
+				element_name.append(elem)
+				continue
+
+			element_name.append(None)
+			column = "c" + str(len(parent_columns))
+
+			if elem is not None:
+				# each list element has exactly one record (with value of some type)
+				# in the table of the field, pointing to this element
+				element_tables = {}
+				for type_str in self._VALUE_TYPES:
+					element = Field(self._engine, element_name, type_str=type_str)
+					element_tables[self.getFieldTableName(element)] = element
+				existing_tables = self._engine.selectExistingTables(list(element_tables.keys()))
+
+				counts = []
+				for table_name in existing_tables:
+					table_name, field_cond, field_values = \
+						self._getFieldTable(element_tables[table_name])
+					counts.append("(SELECT COUNT(*) FROM {} AS elements WHERE " +
+						"elements." + self._ID_COLUMN + "=records." + self._ID_COLUMN +
+						"".join([" AND elements." + col + "=records." + col
+							for col in parent_columns]) +
+						" AND elements." + column + "<records." + column + field_cond + ")")
+					tables.append(table_name)
+					values += field_values
+
+				conditions.append("(" + (" + ".join(counts) if len(counts) > 0 else "0") +
+					")=?")
+				values.append(elem)
+
+			parent_columns.append(column)
+
+		condition = "".join([" AND " + cond for cond in conditions])
+		return condition, tables, values
+
+	def getListKeys(self, id, field, offset=0, limit=None):
+		"""
+		Returns keys of list elements, stored in list columns, grouped by lists:
+		{tuple of keys of parent lists: sorted list of keys}.
+		Field should point to list element with undefined index; indexes of parent
+		lists, which are defined, are used to select lists.
+		If limit is given, only keys with given offset in sorted list are returned
+		(makes sense only if all parent indexes are defined).
+		"""
+		field_copy = Field(self._engine, field.name)
+		queries = []
+		tables = []
+		values = []
+		for type_str in self._getValueTypes(id, field_copy):
+			field_copy.type_str = type_str
+			table_name, field_cond, field_values = self._getFieldTable(field_copy)
+			queries.append("SELECT " + field_copy.list_indexes_query[2:] +
+				" FROM {} WHERE " + self._ID_COLUMN + "=?" + field_cond +
+				field_copy.list_indexes_condition)
+			tables.append(table_name)
+			values += [id] + field_values
+
+		if len(queries) == 0:
+			return {}
+
+		query = " UNION ".join(queries)
+		if limit is not None:
+			query += " ORDER BY " + str(field_copy.list_indexes_number) + " LIMIT ? OFFSET ?"
+			values += [limit, offset]
+
+		result = {}
+		for *parent_keys, key in self._engine.execute(query, tables, values):
+			result.setdefault(tuple(parent_keys), []).append(key)
+
+		for keys in result.values():
+			keys.sort()
+
+		return result
+
 	def renumberLists(self, id, field, shift):
 		"""Renumber list elements in field and its descendants"""
 
@@ -533,11 +1516,46 @@ class _StructureLayer:
 		fields_to_reenum = self.getFlatFieldsInfo(id, [field])
 
 		for fld in fields_to_reenum:
+			table_name, field_cond, field_values = self._getFieldTable(fld)
 			self._engine.execute("UPDATE {} " +
 				"SET " + col_name + "=" + col_name + "+? " +
-				"WHERE " + self._ID_COLUMN + "=?" + cond +
+				"WHERE " + self._ID_COLUMN + "=?" + field_cond + cond +
 				" AND " + col_name + ">=?",
-				[fld.table_name], [shift, id, col_val])
+				[table_name], [shift, id] + field_values + [col_val])
+
+	def moveListElements(self, id, field, keys):
+		"""
+		Change keys of list elements in field and its descendants.
+		keys - dictionary {old key: new key}, which must preserve order of elements
+		"""
+
+		# Get the name of last numerical column
+		col_name, col_val = field.getLastListColumn()
+		cond = field.renumber_condition
+
+		# Elements, which move up, are processed starting from the last one, and elements,
+		# which move down, starting from the first one. Since the order is preserved,
+		# an element never gets the key of another element, which was not moved yet,
+		# so keys can be changed by several queries.
+		up = sorted((key for key in keys if keys[key] > key), reverse=True)
+		down = sorted(key for key in keys if keys[key] < key)
+		chunk_size = self._MAX_QUERY_IDS // 3
+		chunks = [moved[start:start + chunk_size]
+			for moved in [up, down] for start in range(0, len(moved), chunk_size)]
+
+		# Get all child field names
+		fields_to_move = self.getFlatFieldsInfo(id, [field])
+
+		for fld in fields_to_move:
+			table_name, field_cond, field_values = self._getFieldTable(fld)
+			for chunk in chunks:
+				# type casts are necessary for postgre, which cannot deduce parameter types
+				self._engine.execute("UPDATE {} SET " + col_name + "=CASE " + col_name +
+					(" WHEN ? THEN CAST(? AS " + self._INT_TYPE + ")") * len(chunk) + " END " +
+					"WHERE " + self._ID_COLUMN + "=?" + field_cond + cond + " AND " +
+					col_name + " IN (" + ", ".join(["?"] * len(chunk)) + ")",
+					[table_name], [x for key in chunk for x in (key, keys[key])] +
+					[id] + field_values + chunk)
 
 	def addValueRecords(self, id, fields):
 		"""
@@ -545,8 +1563,26 @@ class _StructureLayer:
 		All fields must have the same path and type.
 		"""
 
-		values = [[id] + field.value_record for field in fields]
-		self._engine.insertMany(fields[0].table_name, values)
+		values = [self._getValueRecord(id, field) for field in fields]
+		table_name, field_cond, field_values = self._getFieldTable(fields[0])
+		self._engine.insertMany(table_name, values)
+		self._forgetRecordsNumber(table_name, field_values)
+
+	def addValueRecordsMany(self, record_groups):
+		"""
+		Create records for given groups of pairs (object ID, field).
+		All fields in a group must have the same path and type;
+		records for each table are inserted together.
+		"""
+		tables = {}
+		for records in record_groups:
+			table_name, field_cond, field_values = self._getFieldTable(records[0][1])
+			values = tables.setdefault(table_name, [])
+			values += [self._getValueRecord(id, field) for id, field in records]
+			self._forgetRecordsNumber(table_name, field_values)
+
+		for table_name, values in tables.items():
+			self._engine.insertMany(table_name, values)
 
 	def getMaxListIndex(self, id, field):
 		"""Get maximum index in list, specified by given field"""
@@ -557,8 +1593,9 @@ class _StructureLayer:
 		max = -1
 		for type_str in self._getValueTypes(id, field):
 			temp = Field(self._engine, field.name, type_str=type_str)
+			table_name, field_cond, field_values = self._getFieldTable(temp)
 			rows = self._engine.execute("SELECT MAX(" + col_name + ") FROM {} WHERE " +
-				self._ID_COLUMN + "=?" + cond, [temp.table_name], [id])
+				self._ID_COLUMN + "=?" + field_cond + cond, [table_name], [id] + field_values)
 
 			max_for_type, = rows[0]
 
@@ -585,11 +1622,12 @@ class _StructureLayer:
 		list_indexes_condition = field_copy.list_indexes_condition
 		for type in types:
 			field_copy.type_str = type
+			table_name, field_cond, field_values = self._getFieldTable(field_copy)
 			queries.append("SELECT " + self._ID_COLUMN +
-				" FROM {} WHERE " + self._ID_COLUMN + "=?" +
+				" FROM {} WHERE " + self._ID_COLUMN + "=?" + field_cond +
 				list_indexes_condition)
-			tables.append(field_copy.table_name)
-			values.append(id)
+			tables.append(table_name)
+			values += [id] + field_values
 		query = "SELECT COUNT(*) FROM (" + " UNION ".join(queries) + ") AS temp"
 
 		rows = self._engine.execute(query, tables, values)
@@ -624,42 +1662,336 @@ class _StructureLayer:
 			else:
 				condition_str = ""
 
-			query_str = "FROM {} WHERE " + self._ID_COLUMN + "=? " + condition_str
-			tables = [fields[0].table_name] # table names for all fields in group are the same
-			values = [id]
+			# table names for all fields in group are the same
+			table_name, field_cond, field_values = self._getFieldTable(fields[0])
+			query_str = "FROM {} WHERE " + self._ID_COLUMN + "=?" + field_cond + " " + \
+				condition_str
+			tables = [table_name]
+			values = [id] + field_values
+
+			# delete records; number of deleted rows is compared with refcount
+			# from specification table to find out if any of them are left
+			del_num = self._engine.executeUpdate("DELETE " + query_str, tables, values)
+			if del_num == 0:
+				continue
+			self._forgetRecordsNumber(table_name, field_values)
+
+			name_str = field.name_str
+			type_str = field.type_str
+
+			to_delete.append((name_str, type_str))
+			if del_num != refcount:
+				to_add.append((name_str, type_str, refcount - del_num))
+			else:
+				self._markTableForCollection(table_name)
+
+		if masks is None:
+			# object is deleted completely, so all its refcounts can go at once
+			self._engine.execute("DELETE FROM {} WHERE " + self._ID_COLUMN + "=?",
+				[self._ID_TABLE], [id])
+			self._shapes.pop(id, None)
+			self._resetRepairProgress(to_delete)
+		else:
+			self.updateRefcounts(id, to_delete, to_add)
+
+		if len(self._gc_tables) >= self.GC_THRESHOLD:
+			self.collectGarbage()
+
+
+class _EavStructureLayer(_StructureLayer):
+	"""
+	Structure layer, which stores values of all fields with the same type and
+	number of list indexes in one table, with path ID of the field in additional column
+	(entity-attribute-value layout). Keeps the number of tables in database small
+	for objects with many distinct field names.
+	"""
+
+	LAYOUT = 'eav'
+
+	def _isValueTableName(self, name_str):
+		"""Returns True if given name resembles name of the value table"""
+		return name_str.startswith(self._engine.getNameString(['value', '']))
+
+	def getFieldTableName(self, field):
+		return self._engine.getNameString(['value', field.type_str,
+			str(field.list_indexes_number)])
+
+	def _getPathId(self, name_str, create=False):
+		"""
+		Returns path ID for given field name; if create is False
+		and the name is not in path table, returns None
+		"""
+		return self._getPathIds([name_str], create=create).get(name_str)
+
+	def _getFieldTable(self, field):
+		# fields, which are not in path table, have no records, and NULL matches nothing
+		return self.getFieldTableName(field), " AND " + self._PATH_ID_COLUMN + "=?", \
+			[self._getPathId(field.name_str)]
+
+	def _getValueRecord(self, id, field):
+		return [id, self._getPathId(field.name_str, create=True)] + field.value_record
+
+	def _markTableForCollection(self, table_name):
+		# value tables are shared between fields, so they are kept
+		pass
+
+	def _createFieldTable(self, field):
+		list_columns = "".join([", c" + str(i) + " " + self._INT_TYPE
+			for i in range(field.list_indexes_number)])
+		self._engine.execute("CREATE TABLE {} (" +
+			self._ID_COLUMN + " " + self._ID_TYPE + ", " +
+			self._PATH_ID_COLUMN + " " + self._INT_TYPE + ", " +
+			self._VALUE_COLUMN + " " + field.type_str + list_columns + ")",
+			[self.getFieldTableName(field)])
+		self._createFieldIndexes(field)
+
+	def _createFieldIndexes(self, field):
+		table_name = self.getFieldTableName(field)
+		self._engine.execute("CREATE INDEX {} ON {} (" + self._ID_COLUMN + ", " +
+			self._PATH_ID_COLUMN + field.list_indexes_query + ")",
+			[self._getIndexName(table_name, self._ID_COLUMN), table_name])
+		self._engine.execute("CREATE INDEX {} ON {} (" + self._PATH_ID_COLUMN + ", " +
+			self._VALUE_COLUMN + ")",
+			[self._getIndexName(table_name, self._VALUE_COLUMN), table_name])
+		self._createFullTextIndex(field)
+
+	def _createIndexes(self):
+		# value tables are always created with indexes
+		self._createSpecificationIndex()
+
+	def _getFieldTables(self):
+		return sorted(x for x in self._engine.getTablesList() if self._isValueTableName(x))
+
+	def _iterTableFields(self, table_name):
+		type_str, list_indexes_number = self._engine.getNameList(table_name)[1:3]
+		list_columns = "".join([", records.c" + str(i)
+			for i in range(int(list_indexes_number))])
+		rows = self._engine.executeIter("SELECT records." + self._ID_COLUMN + ", " +
+			"paths." + self._PATH_COLUMN + ", records." + self._VALUE_COLUMN + list_columns +
+			" FROM {} AS records, {} AS paths WHERE records." + self._PATH_ID_COLUMN +
+			"=paths." + self._PATH_ID_COLUMN + " ORDER BY records." + self._ID_COLUMN,
+			[table_name, self._PATH_TABLE])
+
+		# value tables contain records of many fields, so their names are cached
+		names = {}
+		for obj_id, name_str, value, *list_indexes in rows:
+			if name_str not in names:
+				names[name_str] = self._engine.getNameList(name_str)[1:]
+			new_field = Field(self._engine, names[name_str], type_str=type_str, db_value=value)
+			new_field.fillListIndexes(list_indexes)
+			yield obj_id, new_field
+
+	def _countFieldRecords(self, table_name):
+		type_str = self._engine.getNameList(table_name)[1]
 
-			# get number of records to be deleted
-			# (unfortunately, some databases (like sqlite) do not return number of
-			# deleted rows as a result of DELETE query)
-			rows = self._engine.execute("SELECT COUNT(*) " + query_str, tables, values)
-			del_num = rows[0][0]
+		rows = self._engine.execute("SELECT DISTINCT " + self._PATH_ID_COLUMN + " FROM {}",
+			[table_name])
+		path_ids = [path_id for path_id, in rows]
+		if len(path_ids) == 0:
+			return
 
-			# if there are any, delete them
-			if del_num > 0:
-				table_name = field.table_name
-				name_str = field.name_str
-				type_str = field.type_str
+		# the table could have been counted before it was changed
+		self._engine.execute("DELETE FROM {} WHERE " + self._TYPE_COLUMN + "=? AND " +
+			self._FIELD_COLUMN + " IN (" + ", ".join(["?"] * len(path_ids)) + ")",
+			[self._REPAIR_TABLE], [type_str] + path_ids)
 
-				self._engine.execute("DELETE " + query_str, tables, values)
+		# type casts are necessary for postgre, which cannot deduce parameter types otherwise
+		self._engine.execute("INSERT INTO {} SELECT " + self._ID_COLUMN + ", " +
+			self._PATH_ID_COLUMN + ", CAST(? AS " + self._TEXT_TYPE + "), " +
+			"COUNT(*) FROM {} GROUP BY " + self._ID_COLUMN + ", " + self._PATH_ID_COLUMN,
+			[self._REPAIR_TABLE, table_name], [type_str])
 
-				# check if the table is empty and if it is - delete it too
-				if self._engine.tableIsEmpty(table_name):
-					self._engine.deleteTable(table_name)
 
-				to_delete.append((name_str, type_str))
-				if del_num != refcount:
-					to_delete.append((name_str, type_str))
-					to_add.append((name_str, type_str, refcount - del_num))
+_STORAGE_LAYOUTS = {cls.LAYOUT: cls for cls in [_StructureLayer, _EavStructureLayer]}
 
-		self.updateRefcounts(id, to_delete, to_add)
+def getStorageLayouts():
+	"""Returns list of available storage layouts"""
+	return list(_STORAGE_LAYOUTS.keys())
+
+
+_LIST_FORMATS = ['dense', 'sparse']
+
+def getListFormats():
+	"""Returns list of available list formats"""
+	return list(_LIST_FORMATS)
+
+
+_FULLTEXT_MODES = ['none', 'all']
+
+def getFullTextModes():
+	"""Returns list of available full-text index modes"""
+	return list(_FULLTEXT_MODES)
 
 
 class LogicLayer:
 	"""Class, representing DDB logic"""
 
-	def __init__(self, engine):
+	def __init__(self, engine, storage=None, lists=None, fulltext=None):
 		self._engine = engine
-		self._structure = _StructureLayer(engine)
+
+		settings = _StructureLayer.getStoredSettings(engine)
+		storage = self._chooseSetting(settings, 'storage', "storage layout",
+			storage, getStorageLayouts())
+		lists = self._chooseSetting(settings, 'lists', "list format",
+			lists, getListFormats())
+		self._fulltext = self._chooseSetting(settings, 'fulltext', "full-text index mode",
+			fulltext, getFullTextModes())
+
+		# in sparse lists, list columns contain keys, which only define order of elements,
+		# and new elements are appended with this distance from the last one
+		self._sparse_lists = (lists == 'sparse')
+		self._list_gap = _StructureLayer.SPARSE_LIST_GAP if self._sparse_lists else 1
+
+		self._structure = _STORAGE_LAYOUTS[storage](engine, lists=lists,
+			fulltext=self._fulltext)
+
+	def _chooseSetting(self, settings, name, description, requested, available):
+		"""
+		Returns value of the setting, checking that requested value
+		is compatible with the one stored in database
+		"""
+		stored = None if settings is None else settings[name]
+		if requested is None:
+			return _StructureLayer.DEFAULT_SETTINGS[name] if stored is None else stored
+		elif requested not in available:
+			raise interface.FacadeError("Unknown " + description + ": " + str(requested))
+		elif stored is not None and requested != stored:
+			raise interface.StructureError("Database has " + description + " " +
+				repr(stored) + ", but " + repr(requested) + " was requested")
+		else:
+			return requested
+
+	def _getStoredFields(self, id, field, extend=False, positions=None, missing=None):
+		"""
+		Returns list of fields, whose list indexes are replaced by keys of corresponding
+		elements in sparse lists (several fields are returned, if field has undefined list
+		indexes before defined ones). Elements, which do not exist, are skipped, or,
+		if extend is True, get keys as if the list was extended up to them
+		(fields for elements between the end of the list and these ones are added
+		to missing list, if it is given).
+		If positions dictionary is given, found keys are memorized in it
+		(see _fillListPositions()).
+		"""
+		if not self._sparse_lists:
+			return [field]
+
+		names = [[]]
+		for i, elem in enumerate(field.name):
+			if not isinstance(elem, int):
+				names = [name + [elem] for name in names]
+				continue
+
+			element_name_str = Field(self._engine, field.name[:i + 1]).name_str
+			new_names = []
+			for name in names:
+				element = Field(self._engine, name + [None])
+
+				# if the list is defined, it is enough to read the key of the element
+				# itself (unless it is beyond the end of the list)
+				offset = 0
+				lists = {}
+				if None not in name:
+					lists = self._structure.getListKeys(id, element, offset=elem, limit=1)
+					if len(lists) > 0:
+						offset = elem
+					elif extend:
+						lists = self._structure.getListKeys(id, element)
+						if len(lists) == 0:
+							lists = {tuple(x for x in name if not isinstance(x, str)): []}
+				else:
+					lists = self._structure.getListKeys(id, element)
+
+				for parent_keys, keys in lists.items():
+					reversed_keys = list(reversed(parent_keys))
+					list_name = [x if isinstance(x, str) else reversed_keys.pop() for x in name]
+
+					if elem - offset < len(keys):
+						key = keys[elem - offset]
+					elif extend:
+						last = keys[-1] if len(keys) > 0 else -self._list_gap
+						new_keys = [last + self._list_gap * (j + 1)
+							for j in range(elem - len(keys) + 1)]
+						key = new_keys.pop()
+						if missing is not None:
+							missing += [Field(self._engine, list_name + [x]) for x in new_keys]
+					else:
+						continue
+
+					if positions is not None:
+						positions.setdefault((element_name_str, parent_keys), {})[key] = elem
+
+					new_names.append(list_name + [key])
+
+			names = new_names
+
+		return [Field(self._engine, name) for name in names]
+
+	def _fillListPositions(self, id, fields, positions=None):
+		"""
+		Replace keys of sparse list elements in names of given fields by positions
+		of these elements. positions is a dictionary with already known positions,
+		{(element name string, parent keys): {key: position}}
+		"""
+		if not self._sparse_lists:
+			return
+
+		if positions is None:
+			positions = {}
+
+		# lists, for which positions of all elements were read from database
+		complete = set()
+
+		for field in fields:
+			parent_keys = ()
+			for i, elem in enumerate(field.name):
+				if isinstance(elem, str):
+					continue
+
+				element_name_str = Field(self._engine, field.name[:i + 1]).name_str
+				known = positions.get((element_name_str, parent_keys), {})
+				if elem not in known and element_name_str not in complete:
+					element = Field(self._engine,
+						[x if isinstance(x, str) else None for x in field.name[:i + 1]])
+					for keys_parent, keys in self._structure.getListKeys(id, element).items():
+						positions[(element_name_str, keys_parent)] = \
+							{key: position for position, key in enumerate(keys)}
+					complete.add(element_name_str)
+					known = positions.get((element_name_str, parent_keys), {})
+
+				field.name[i] = known[elem]
+				parent_keys += (elem,)
+
+	def _getListPositions(self, fields):
+		"""
+		Returns positions of sparse list elements, which are mentioned in given fields,
+		in the format used by _fillListPositions()
+		"""
+		if not self._sparse_lists:
+			return {}
+
+		keys = {}
+		for field in fields:
+			parent_keys = ()
+			for i, elem in enumerate(field.name):
+				if isinstance(elem, str):
+					continue
+
+				element_name_str = Field(self._engine, field.name[:i + 1]).name_str
+				keys.setdefault((element_name_str, parent_keys), set()).add(elem)
+				parent_keys += (elem,)
+
+		return {list_id: {key: position for position, key in enumerate(sorted(list_keys))}
+			for list_id, list_keys in keys.items()}
+
+	def _scaleListIndexes(self, fields):
+		"""Replace list indexes in names of given fields by keys for sparse lists"""
+		if not self._sparse_lists:
+			return
+
+		for field in fields:
+			for i, elem in enumerate(field.name):
+				if isinstance(elem, int):
+					field.name[i] = elem * self._list_gap
 
 	def _checkForConflicts(self, id, field, remove_conflicts):
 		"""
@@ -758,9 +2090,14 @@ class LogicLayer:
 
 		return result
 
-	def _modifyFields(self, id, path, fields, remove_conflicts):
-		"""Store values of given fields"""
+	def _modifyFields(self, id, path, fields, remove_conflicts, missing_elements=None):
+		"""
+		Store values of given fields. For sparse lists, list indexes in path should be
+		already replaced by keys, and list elements to autocreate should be passed
+		in missing_elements (see _getStoredFields()).
+		"""
 
+		self._scaleListIndexes(fields)
 		for field in fields:
 			field.addNamePrefix(path.name)
 
@@ -779,9 +2116,25 @@ class LogicLayer:
 			ancestors = path.getAncestors()
 			del ancestors[0] # remove root object
 
-			for ancestor in ancestors:
-				if ancestor.pointsToListElement():
-					fields += self._getMissingListElements(id, ancestor)
+			if self._sparse_lists:
+				if missing_elements is not None:
+					fields += missing_elements
+			else:
+				for ancestor in ancestors:
+					if ancestor.pointsToListElement():
+						fields += self._getMissingListElements(id, ancestor)
+
+			# keys of sparse list elements are taken from their own records,
+			# so autocreated elements should have them too
+			if self._sparse_lists:
+				existing_names = [field.name for field in fields]
+				for ancestor in ancestors[:-1]:
+					if ancestor.pointsToListElement() and \
+							ancestor.name not in existing_names and \
+							not self._structure.objectHasField(id, ancestor):
+						ancestor.py_value = dict() \
+							if isinstance(path.name[len(ancestor.name)], str) else list()
+						fields.append(ancestor)
 
 		self._setFieldValues(id, fields)
 
@@ -790,13 +2143,53 @@ class LogicLayer:
 		self._modifyFields(new_id, interface.Field(self._engine, []), request.fields, True)
 		return new_id
 
+	def processCreateManyRequest(self, request):
+		new_ids = self._engine.getNewIds(len(request.field_groups))
+
+		# objects are new, so there can be no conflicts and no existing refcounts;
+		# records of all objects are grouped by field name and type
+		refcounts = []
+		record_groups = {}
+		name_strs = {} # objects usually have the same fields, so names are cached
+		for new_id, fields in zip(new_ids, request.field_groups):
+			self._scaleListIndexes(fields)
+
+			counts = {}
+			for field in fields:
+				name = tuple(field.name)
+				if name not in name_strs:
+					name_strs[name] = field.name_str
+				key = (name_strs[name], field.type_str)
+				counts[key] = counts.get(key, 0) + 1
+				record_groups.setdefault(key, []).append((new_id, field))
+
+			refcounts += [(new_id, name_str, type_str, refcount)
+				for (name_str, type_str), refcount in counts.items()]
+
+		record_groups = list(record_groups.values())
+		if len(record_groups) > 0:
+			self._structure.ensureTablesExist([records[0][1] for records in record_groups])
+		self._structure.addNewRefcounts(refcounts)
+		self._structure.addValueRecordsMany(record_groups)
+
+		return new_ids
+
 	def processModifyRequest(self, request):
-		self._modifyFields(request.id, request.path,
-			request.fields, request.remove_conflicts)
+		missing = []
+		path, = self._getStoredFields(request.id, request.path, extend=True, missing=missing)
+		self._modifyFields(request.id, path, request.fields, request.remove_conflicts,
+			missing_elements=missing)
 
 	def processDeleteRequest(self, request):
 
-		if request.fields is not None:
+		if request.fields is not None and self._sparse_lists:
+			# elements of sparse lists can be deleted without renumbering
+			fields = []
+			for field in request.fields:
+				fields += self._getStoredFields(request.id, field)
+			if len(fields) > 0:
+				self._structure.deleteFields(request.id, fields)
+		elif request.fields is not None:
 			# remove specified fields
 			self._structure.deleteFields(request.id, request.fields)
 
@@ -808,28 +2201,38 @@ class LogicLayer:
 			# delete whole object
 			self._structure.deleteFields(request.id)
 
-	def processReadRequest(self, request):
-
-		path = None if (request.path is None or len(request.path.name) == 0) else request.path
-		masks = None if (request.masks is None or len(request.masks) == 0) else request.masks
+	def _getReadMasks(self, id, path, masks):
+		"""
+		Returns tuple (masks, positions) for reading given path of the object:
+		list of masks (or None, if the whole object is read), in which positions
+		of sparse list elements are replaced by their keys, and dictionary with
+		positions of these elements (see _fillListPositions())
+		"""
 
 		# construct list of masks for reading
 		if masks is None:
 			if path is None:
 				fields = None
 			else:
-				fields = [request.path]
+				fields = [path]
 		else:
 			fields = []
 			for mask in masks:
 				if path is None or mask.matches(path):
 					fields.append(mask)
 
-		# get list of typed fields to read (whose tables are guaranteed to exist)
-		fields_list = self._structure.getFlatFieldsInfo(request.id, fields)
+		# for sparse lists, positions of elements should be replaced by their keys
+		positions = {}
+		if fields is not None and self._sparse_lists:
+			stored_fields = []
+			for field in fields:
+				stored_fields += self._getStoredFields(id, field, positions=positions)
+			fields = stored_fields
+
+		return fields, positions
 
-		# read values
-		result_list = self._structure.getFieldValues(request.id, fields_list)
+	def _finishRead(self, id, path, masks, result_list):
+		"""Check that some fields were read and remove root path from their names"""
 
 		# if no fields were read - throw error (so that user could distinguish
 		# this case from the case when None was read, for example)
@@ -839,37 +2242,208 @@ class LogicLayer:
 				if path is None:
 					path_str = "exist"
 				else:
-					path_str = "have field " + str(request.path.name)
+					path_str = "have field " + str(path.name)
 
-				raise interface.LogicError("Object " + str(request.id) +
+				raise interface.LogicError("Object " + str(id) +
 					" does not " + path_str)
 			else:
-				raise interface.LogicError("Object " + str(request.id) +
+				raise interface.LogicError("Object " + str(id) +
 					" does not have fields matching given masks")
 
 		# remove root path from values
-		if request.path is not None:
+		if path is not None:
 			for field in result_list:
-				del field.name[:len(request.path.name)]
+				del field.name[:len(path.name)]
+
+	def processReadRequest(self, request):
+
+		path = None if (request.path is None or len(request.path.name) == 0) else request.path
+		masks = None if (request.masks is None or len(request.masks) == 0) else request.masks
+
+		fields, positions = self._getReadMasks(request.id, path, masks)
+
+		if fields is not None and len(fields) == 0:
+			# requested list elements do not exist
+			result_list = []
+		else:
+			# get list of typed fields to read (whose tables are guaranteed to exist)
+			fields_list = self._structure.getFlatFieldsInfo(request.id, fields)
 
+			# read values
+			result_list = self._structure.getFieldValues(request.id, fields_list)
+			self._fillListPositions(request.id, result_list, positions)
+
+		self._finishRead(request.id, path, masks, result_list)
 		return result_list
 
+	def processReadManyRequest(self, request):
+
+		path = None if (request.path is None or len(request.path.name) == 0) else request.path
+		masks = None if (request.masks is None or len(request.masks) == 0) else request.masks
+
+		# each object is read once, even if it is requested several times
+		ids = list(collections.OrderedDict.fromkeys(request.ids))
+		results = self._readObjects(ids, path, masks)
+
+		result = []
+		returned = set()
+		for id in request.ids:
+			fields = results[id]
+			if id in returned:
+			# fields can be converted to data structures in place, so repeated objects
+			# should get their own copies
+				fields = [Field(self._engine, field.name, type_str=field.type_str,
+					db_value=field.db_value) for field in fields]
+			returned.add(id)
+			result.append(fields)
+
+		return result
+
+	def _readObjects(self, ids, path, masks, check=True):
+		"""
+		Read given path of several distinct objects, filtered by masks.
+		Returns dictionary {id: list of fields}; if check is False, objects,
+		which do not have requested fields, get empty lists instead of raising an error.
+		"""
+		read_masks = {}
+		positions = {}
+		for id in ids:
+			read_masks[id], positions[id] = self._getReadMasks(id, path, masks)
+
+		# objects, whose requested list elements do not exist, are not read
+		ids_masks = [(id, read_masks[id]) for id in ids
+			if read_masks[id] is None or len(read_masks[id]) > 0]
+		fields_lists = self._structure.getFlatFieldsInfoMany(ids_masks)
+		values = self._structure.getFieldValuesMany(
+			[(id, fields_list) for (id, _), fields_list in zip(ids_masks, fields_lists)])
+
+		results = {}
+		for id in ids:
+			result_list = values.get(id, [])
+
+			# when the whole object is read, all elements of its sparse lists are present,
+			# so their positions can be found without additional queries
+			if read_masks[id] is None:
+				positions[id] = self._getListPositions(result_list)
+
+			self._fillListPositions(id, result_list, positions[id])
+			if check or len(result_list) > 0:
+				self._finishRead(id, path, masks, result_list)
+			results[id] = result_list
+
+		return results
+
 	def processSearchRequest(self, request):
 		"""Search for all objects using given search condition"""
+		query = self._buildSearchQuery(request)
+		if query is None:
+			return []
+
+		result = self._engine.execute(*query)
+		return [x[0] for x in result]
+
+	def iterSearchRequest(self, request):
+		"""Generator, returning IDs of objects which satisfy search condition"""
+		query = self._buildSearchQuery(request)
+		if query is None:
+			return
+
+		for row in self._engine.executeIter(*query):
+			yield row[0]
+
+	def processSearchCountRequest(self, request):
+		"""Returns number of objects, which satisfy search condition"""
+		query = self._buildSearchQuery(request)
+		if query is None:
+			return 0
+
+		query, tables, values = query
+		result = self._engine.execute("SELECT COUNT(*) FROM (" + query + ") AS found",
+			tables, values)
+		return result[0][0]
+
+	def processSearchExistsRequest(self, request):
+		"""Returns True if there is at least one object, which satisfies search condition"""
+		query = self._buildSearchQuery(request, distinct=False)
+		if query is None:
+			return False
+
+		query, tables, values = query
+		result = self._engine.execute("SELECT 1 FROM (" + query + ") AS found LIMIT 1",
+			tables, values)
+		return len(result) > 0
+
+	def processSearchReadRequest(self, request):
+		"""
+		Read objects, which satisfy search condition.
+		Returns list [object ID, list of fields or None, ...]; None means that
+		the object does not have fields matching masks.
+		"""
+		ids = self.processSearchRequest(request.search)
+		masks = None if (request.masks is None or len(request.masks) == 0) else request.masks
+		results = self._readObjects(ids, None, masks, check=False)
+
+		result = []
+		for id in ids:
+			result += [id, results[id] if len(results[id]) > 0 else None]
+
+		return result
+
+	def processSearchPageRequest(self, request):
+		"""
+		Returns list [IDs of found objects, cursor of the last of them];
+		if nothing is found, the cursor from request is returned.
+		"""
+		query = self._buildSearchQuery(request, with_cursors=True)
+		rows = [] if query is None else self._engine.execute(*query)
+		if len(rows) == 0:
+			return [[], request.cursor]
+
+		return [[row[0] for row in rows], self._structure.getCursor(rows[-1])]
+
+	def processExplainSearchRequest(self, request):
+		"""Returns text description of the plan, which is used for given search request"""
+		self._prepareSearchCondition(request)
+		return self._structure.explainSqlQuery(request.condition)
+
+	def _buildSearchQuery(self, request, distinct=True, with_cursors=False):
+		"""
+		Returns tuple (query, tables, values) for given search request
+		or None, if nothing can be found.
+		If distinct is False, query can return the same ID several times.
+		If with_cursors is True, found objects are ordered, and query returns
+		columns for their cursors after IDs.
+		"""
+		self._prepareSearchCondition(request)
+		if request.ordered or with_cursors:
+			query, tables, values = self._structure.buildPagedSqlQuery(request.condition,
+				order_by=request.order_by, descending=request.descending,
+				limit=request.limit, offset=request.offset, cursor=request.cursor,
+				with_cursors=with_cursors)
+		else:
+			query, tables, values = self._structure.buildSqlQuery(request.condition,
+				distinct=distinct)
+		return None if query is None else (query, tables, values)
+
+	def _prepareSearchCondition(self, request):
+		"""Remove fields, which do not have values in database, from search condition"""
 
 		def getMentionedFields(condition):
 			if isinstance(condition.operand1, interface.SearchRequest.Condition):
 				fields = getMentionedFields(condition.operand1)
 				return fields.union(getMentionedFields(condition.operand2))
 			else:
-				return {condition.operand1.table_name}
+				if condition.operator == op.MATCH and self._fulltext == 'none':
+					raise interface.StructureError(
+						"Full-text search is not enabled in this database")
+				return {self._structure.getFieldTableName(condition.operand1)}
 
 		def updateCondition(condition, existing_tables):
 			if isinstance(condition.operand1, interface.SearchRequest.Condition):
 				updateCondition(condition.operand1, existing_tables)
 				updateCondition(condition.operand2, existing_tables)
 			else:
-				if condition.operand1.table_name not in existing_tables:
+				if self._structure.getFieldTableName(condition.operand1) not in existing_tables:
 					condition.operand1 = None
 
 		if request.condition is not None:
@@ -877,15 +2451,6 @@ class LogicLayer:
 			table_names = self._engine.selectExistingTables(table_names)
 			updateCondition(request.condition, table_names)
 
-		request, tables, values = self._structure.buildSqlQuery(request.condition)
-		if request is None:
-			return []
-
-		result = self._engine.execute(request, tables, values)
-		list_res = [x[0] for x in result]
-
-		return list_res
-
 	def processInsertRequest(self, request):
 
 		def enumerate(field_groups, col_num, starting_num):
@@ -898,7 +2463,9 @@ class LogicLayer:
 
 		# check that dictionary does not already exist at the place
 		# where request.path is pointing to
-		parent_field = Field(self._engine, request.path.name[:-1])
+		missing = []
+		parent_field, = self._getStoredFields(request.id,
+			Field(self._engine, request.path.name[:-1]), extend=True, missing=missing)
 		if self._structure.objectHasField(request.id, parent_field):
 			parent = self._structure.getFieldValues(request.id, [parent_field])
 		else:
@@ -909,11 +2476,16 @@ class LogicLayer:
 			# try to autocreate list
 				new_val = Field(self._engine, [], list())
 				self._modifyFields(request.id, parent_field,
-					[new_val], remove_conflicts=request.remove_conflicts)
+					[new_val], remove_conflicts=request.remove_conflicts,
+					missing_elements=missing)
 			else:
 			# in this case we can raise more meaningful error
 				raise interface.StructureError("Cannot insert to non-list")
 
+		if self._sparse_lists:
+			self._insertToSparseList(request, parent_field)
+			return
+
 		# if path does not point to beginning of the list, fill
 		# missing elements with Nones
 		fields = []
@@ -940,17 +2512,140 @@ class LogicLayer:
 		fields += functools.reduce(list.__add__, request.field_groups, [])
 		self._setFieldValues(request.id, fields)
 
+	def _insertToSparseList(self, request, parent_field):
+		"""
+		Insert field groups from request to sparse list. New elements get keys between
+		keys of neighbouring elements, so that existing elements keep their keys
+		(unless there is no space between neighbours left).
+		"""
+		gap = self._list_gap
+		num = len(request.field_groups)
+		target_col = len(request.path.name) - 1 # last column in name of target field
+		position = request.path.name[-1]
+
+		element = Field(self._engine, parent_field.name + [None])
+
+		# read keys of elements, between which new ones will be inserted
+		neighbours = []
+		if position is not None:
+			offset = max(position - 1, 0)
+			lists = self._structure.getListKeys(request.id, element, offset=offset, limit=2)
+			if len(lists) > 0:
+				neighbours, = lists.values()
+
+		fields = []
+		if position is None or position - offset >= len(neighbours):
+		# inserting elements to the end, possibly after missing elements
+			if position is None:
+				missing = 0
+				last = self._structure.getMaxListIndex(request.id,
+					Field(self._engine, parent_field.name + [0]))
+			else:
+				lists = self._structure.getListKeys(request.id, element)
+				keys = list(lists.values())[0] if len(lists) > 0 else []
+				missing = position - len(keys)
+				last = keys[-1] if len(keys) > 0 else None
+
+			if last is None:
+				last = -gap
+
+			for i in range(missing):
+				fields.append(Field(self._engine, parent_field.name + [last + gap * (i + 1)]))
+			new_keys = [last + gap * (missing + i + 1) for i in range(num)]
+		else:
+		# inserting elements to the beginning or to the middle
+			upper = neighbours[position - offset]
+			lower = neighbours[0] if position > 0 else upper - gap * (num + 1)
+
+			if upper - lower > num:
+				step = (upper - lower) // (num + 1)
+				new_keys = [lower + step * (i + 1) for i in range(num)]
+			else:
+				# there is no space left between neighbours
+				new_keys = self._respaceSparseList(request.id, element, position, num)
+
+		for field_group, key in zip(request.field_groups, new_keys):
+			# list indexes inside inserted values are relative
+			self._scaleListIndexes(field_group)
+			for field in field_group:
+				field.name[:target_col] = parent_field.name
+				field.name[target_col] = key
+			fields += field_group
+
+		self._setFieldValues(request.id, fields)
+
+	def _respaceSparseList(self, id, element, position, num):
+		"""
+		Spread keys of elements around given position in sparse list to make space
+		for num new elements before it; returns keys for new elements.
+		element - field, pointing to list element with undefined index.
+		"""
+		gap = self._list_gap
+		half_size = num + 1
+
+		# The window of elements around the position grows until there is enough space
+		# between its bounds. Required distance between keys grows with the window,
+		# so that the space is not used up again soon after large window is rearranged;
+		# then each element is moved only a few times per each doubling of the window.
+		while True:
+			start = max(position - half_size, 0)
+			end = position + half_size
+
+			# keys, which bound the window, are read together with it
+			first = max(start - 1, 0)
+			lists = self._structure.getListKeys(id, element, offset=first, limit=end + 1 - first)
+			keys, = lists.values()
+			lower = keys.pop(0) if start > 0 else None
+			upper = keys.pop() if len(keys) > end - start else None
+
+			count = len(keys) + num
+			if lower is not None and upper is not None:
+				required = min(gap, 2 * count)
+			else:
+				# window reaches the end of the list, so it can be extended
+				required = gap
+				if upper is None:
+					lower = keys[0] - gap if lower is None else lower
+					upper = lower + gap * (count + 1)
+				else:
+					lower = upper - gap * (count + 1)
+
+			step = (upper - lower) // (count + 1)
+			if step >= required:
+				break
+
+			half_size *= 2
+
+		new_keys = [lower + step * (i + 1) for i in range(count)]
+		inserted = position - start
+		moved = {key: new_key for key, new_key in
+			zip(keys, new_keys[:inserted] + new_keys[inserted + num:]) if key != new_key}
+		if len(moved) > 0:
+			self._structure.moveListElements(id,
+				Field(self._engine, element.name[:-1] + [keys[0]]), moved)
+
+		return new_keys[inserted:inserted + num]
+
 	def processObjectExistsRequest(self, request):
 		return self._structure.objectExists(request.id)
 
 	def processDumpRequest(self, request):
-		ids = self.processSearchRequest(interface.SearchRequest())
-
 		result = []
-		for obj_id in ids:
-			result += [obj_id, self.processReadRequest(interface.ReadRequest(obj_id))]
+		for obj_id, fields in self.iterDumpRequest(request):
+			result += [obj_id, fields]
 
 		return result
 
+	def iterDumpRequest(self, request):
+		"""
+		Generator, returning pairs (object ID, list of fields) for all objects.
+		Field tables are scanned in parallel, so objects are not read one by one.
+		"""
+		for obj_id, fields in self._structure.iterAllFieldValues():
+			# all elements of sparse lists are present, so their positions
+			# can be found without additional queries
+			self._fillListPositions(obj_id, fields, self._getListPositions(fields))
+			yield obj_id, fields
+
 	def processRepairRequest(self, request):
-		self._structure.repairSupportTables()
+		return self._structure.repairSupportTables(request.max_tables)
@@ -3,6 +3,7 @@ AND = "AND"
 OR = "OR"
 EQ = "=="
 REGEXP = "=~"
+MATCH = "MATCH"
 LT = "<"
 GT = ">"
 LTE = "<="
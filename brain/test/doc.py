@@ -298,7 +298,8 @@ Currently two engines are supported:
 **sqlite3**:
   SQLite 3 engine, built in Python 3.
 
-  **Arguments**: ``(name, open_existing=None, db_path=None)``
+  **Arguments**: ``(name, open_existing=None, db_path=None, id_block_size=100,
+  wal=False, readers=4)``
 
   ``name``:
     Database file name. If equal to ``None``, in-memory database is created.
@@ -318,12 +319,33 @@ Currently two engines are supported:
   ``db_path``:
     If is not None, will be concatenated (using platform-specific path join) with ``name``
 
+  ``id_block_size``:
+    Number of object IDs, which are reserved in database at once. IDs from the reserved
+    block are handed out without database queries. Unused IDs are lost when connection
+    is closed, so objects IDs may have gaps.
+
+  ``wal``:
+    If True, database file is switched to write-ahead logging mode, and a pool of
+    read-only connections is opened alongside the main one. Read-only requests
+    (``read()``, ``readByMask()``, ``readByMasks()``, ``readMany()``, ``search()``,
+    ``searchCount()``, ``searchExists()``, ``searchRead()``, ``searchPage()``, ``explainSearch()``,
+    ``objectExists()`` and ``dump()``),
+    which are called outside of transaction, are processed by these
+    connections. They are not blocked by active write transactions and can be called
+    from several threads simultaneously. Transaction belongs to the thread, which has
+    started it, so read-only requests from other threads are processed by the pool
+    even while it is in progress; transactions and modifying requests must be made
+    from the thread, which has created the connection. Cannot be used with in-memory database.
+
+  ``readers``:
+    Number of read-only connections in the pool (used only if ``wal`` is True).
+
 **postgre**:
   Postgre 8 engine. Will be used if `py-postgresql <http://python.projects.postgresql.org>`_
   is installed.
 
   **Arguments**: ``(name, open_existing=None, host='localhost', port=5432, user='postgres',
-  password='', connection_limit=-1)``
+  password='', connection_limit=-1, statement_cache_size=100, id_block_size=100)``
 
   ``name``:
     Database name.
@@ -343,6 +365,13 @@ Currently two engines are supported:
   ``connection_limit``:
     Connection limit for newly created database. Unlimited by default.
 
+  ``statement_cache_size``:
+    Number of prepared statements, which are kept for reuse (least recently used ones
+    are discarded first). If equal to 0, statements are prepared anew for each query.
+
+  ``id_block_size``:
+    Same logic as for SQLite3 engine. IDs are taken from ``max_uuid_seq`` sequence.
+
 Tests
 ~~~~~
 
@@ -402,6 +431,41 @@ which has the following parameters:
     Integer which will be used as starting seed for random number generator. This wil allow
     to get reproduceable results. By default, random seed is generated.
 
+``perf`` **parameters**:
+  ``-b NAME``, ``--benchmark=NAME``:
+    If specified, given benchmark will be run instead of default performance tests.
+    Available benchmarks:
+
+    * ``indexes``: read and search latency for growing number of objects.
+    * ``insertMany``: creation of and insertion into long lists.
+    * ``storage``: storage layouts for growing number of distinct field names
+      (sizes are numbers of field names).
+    * ``lists``: list formats for insertion to and deletion from the beginning of
+      long lists (sizes are numbers of list elements).
+    * ``deepModify``: modification of new fields deep in the hierarchy (sizes are
+      depths of the hierarchy).
+    * ``dump``: full database dump (sizes are numbers of objects).
+    * ``createMany``: creation of small objects one by one and with
+      ``createMany()`` (sizes are numbers of objects).
+    * ``readMany``: reading of small objects one by one and with ``readMany()``
+      (sizes are numbers of objects).
+    * ``search``: search by conjunctions of conditions with different selectivity
+      (sizes are numbers of objects).
+    * ``pages``: reading pages of ordered search results with offset and with cursor
+      (sizes are numbers of objects).
+    * ``count``: counting found objects with ``search()`` and ``searchCount()``, and
+      checking their existence with ``searchExists()`` (sizes are numbers of objects).
+    * ``searchRead``: reading of found objects one by one and with ``searchRead()``
+      (sizes are numbers of found objects).
+    * ``lambda``: filtering of dumped objects by Python function and search with the same
+      lambda as condition (sizes are numbers of objects).
+    * ``fulltext``: search for words by regexp and with full-text index, and search for
+      phrases with full-text index (sizes are numbers of objects).
+
+  ``--sizes=LIST``:
+    Comma-separated list of database sizes (in objects) to be used by benchmark.
+    Each benchmark has its own default list.
+
 .. _connect():
 
 brain.connect()
@@ -409,7 +473,7 @@ brain.connect()
 
 Connect to the database (or create the new one).
 
-**Arguments**: ``connect(engine_tag, *args, remove_conflicts=False, **kwds)``
+**Arguments**: ``connect(engine_tag, *args, remove_conflicts=False, storage=None, lists=None, fulltext=None, **kwds)``
 
 ``engine_tag``:
   String, specifying the DB engine to use. Can be obtained by `getEngineTags()`_.
@@ -418,11 +482,58 @@ Connect to the database (or create the new one).
 ``remove_conflicts``:
   Default value of this parameter for `Connection.modify()`_ and `Connection.insert()`_.
 
+``storage``:
+  Storage layout of the database. The layout is chosen when the database is created
+  and remembered in it; if it differs from the layout of existing database,
+  `StructureError` is raised. If equal to ``None``, the layout of existing
+  database is used (``'tables'`` for new databases). Available layouts:
+
+  * ``'tables'``: values of each field are kept in separate table. Fast for objects
+    with small number of distinct field names.
+  * ``'eav'``: values of all fields with the same type and nesting level of lists are kept
+    in one table together with field names. Keeps the number of tables small, which is
+    better for objects with many distinct field names.
+
+``lists``:
+  Format of lists in the database. Like the storage layout, it is chosen when the database
+  is created and remembered in it. If equal to ``None``, the format of existing database
+  is used (``'dense'`` for new databases). Available formats:
+
+  * ``'dense'``: list elements are numbered by their positions. Insertion to or deletion
+    from the middle of the list renumbers all following elements and their children.
+  * ``'sparse'``: list elements are numbered by keys with large gaps between them, so
+    insertion and deletion change only the affected elements. Following elements are
+    renumbered only when there is no space left between neighbours. Reading elements
+    by position requires reading keys of all elements of the list.
+
+``fulltext``:
+  Full-text index mode of the database, which is required for ``MATCH`` search conditions
+  (see `brain.op`_). Like the storage layout, it is chosen when the database is created
+  and remembered in it. If equal to ``None``, the mode of existing database is used
+  (``'none'`` for new databases). Available modes:
+
+  * ``'none'``: there is no full-text index.
+  * ``'all'``: all string values are added to full-text index. The index is updated
+    together with values, which makes writing of strings slower.
+
 ``args``, ``kwds``:
   Engine-specific parameters. See `Engines`_ section for further information.
 
 **Returns**: `Connection`_ object.
 
+.. _connectAsync():
+
+brain.connectAsync()
+~~~~~~~~~~~~~~~~~~~~
+
+Coroutine, which connects to the database in a separate thread.
+
+**Arguments**: ``connectAsync(*args, **kwds)``
+
+Same as for `connect()`_ (all arguments are passed to it).
+
+**Returns**: `AsyncConnection`_ object.
+
 .. _getDefaultEngineTag():
 
 brain.getDefaultEngineTag()
@@ -458,13 +569,20 @@ This submodule contains operator definitions for `Connection.search()`_ request:
 
 * logical operators ``OR`` and ``AND`` - can be used to link simple conditions.
 
-* comparison operators ``EQ`` (equal to), ``REGEXP``, ``LT`` (lower than), ``LTE`` (lower than or equal to),
+* comparison operators ``EQ`` (equal to), ``REGEXP``, ``MATCH``, ``LT`` (lower than), ``LTE`` (lower than or equal to),
   ``GT`` (greater than) and ``GTE`` (greater than or equal to) - can be used in simple conditions.
 
   * ``EQ`` can be used for all value types.
 
   * ``REGEXP`` can be used only for strings. It should support POSIX regexps.
 
+  * ``MATCH`` can be used only for strings, and only if the database was created with
+    full-text index (see `connect()`_); otherwise `StructureError` is raised.
+    It is a full-text search: value is a query, which consists of words (all of them must
+    be present in the string, in any order and case) and phrases in double quotes.
+    Punctuation and words like ``AND`` or ``NOT`` are searched as text, not treated
+    as query syntax. Query without words raises `FormatError`_.
+
   * ``LT``, ``LTE``, ``GT`` and ``GTE`` can be used for integers and floats.
 
 .. _Connection:
@@ -485,20 +603,29 @@ Currently the following connection methods are available:
  * `Connection.close()`_
  * `Connection.commit()`_
  * `Connection.create()`_
+ * `Connection.createMany()`_
  * `Connection.delete()`_
  * `Connection.deleteMany()`_
  * `Connection.dump()`_
+ * `Connection.explainSearch()`_
  * `Connection.getRemoveConflicts()`_
  * `Connection.insert()`_
  * `Connection.insertMany()`_
+ * `Connection.iterDump()`_
+ * `Connection.iterSearch()`_
  * `Connection.modify()`_
  * `Connection.objectExists()`_
  * `Connection.read()`_
  * `Connection.readByMask()`_
  * `Connection.readByMasks()`_
+ * `Connection.readMany()`_
  * `Connection.repair()`_
  * `Connection.rollback()`_
  * `Connection.search()`_
+ * `Connection.searchCount()`_
+ * `Connection.searchExists()`_
+ * `Connection.searchPage()`_
+ * `Connection.searchRead()`_
 
 Connection.begin()
 ==================
@@ -644,6 +771,30 @@ Create new object in database.
  {'key': [1, 2, 3]}
  >>> conn.close()
 
+Connection.createMany()
+=======================
+
+Create several new objects in database. Records of all objects are grouped by field
+tables and written together, so it is much faster than calling `Connection.create()`_
+for each object.
+
+**Arguments**: ``createMany(self, data_list)``
+
+``data_list``:
+  List of initial object contents (see `Connection.create()`_ for details).
+
+**Returns**: list of object IDs in the same order as ``data_list``
+
+**Example**:
+
+ >>> conn = brain.connect(None, None)
+ >>> ids = conn.createMany([[1, 2, 3], {'key': 'val'}])
+ >>> print(ids)
+ [1, 2]
+ >>> print(conn.read(ids[1]))
+ {'key': 'val'}
+ >>> conn.close()
+
 .. _Connection.delete():
 
 .. _Connection.deleteMany():
@@ -712,6 +863,38 @@ Get all database contents.
  [1, [1, 2, 3], 2, {'key': 'val'}]
  >>> conn.close()
 
+Connection.explainSearch()
+==========================
+
+Describe the plan, which is used by `Connection.search()`_ for given condition.
+Operands of ``AND`` are ordered by the estimated number of matching records: the most
+selective one is searched for first, and others are checked only for found objects
+(using index on object IDs). Numbers of records are estimated using index on values
+(exactly, if there are few matching records) and the number of records of the field.
+This number is cached by the connection. It is dropped when the connection itself
+inserts or deletes records of the field, when the field table is deleted, on rollback
+and on `Connection.repair()`_. Changes made by other connections are not noticed, so
+the cached number can stay stale for the lifetime of the connection. Only estimates
+(and therefore the chosen plan) are affected by this, never the search results.
+
+**Arguments**: ``explainSearch(condition)``
+
+``condition``:
+  Same as for `Connection.search()`_.
+
+**Returns**: string with the tree of operations (one per line) and estimated numbers
+of records.
+
+**Example**:
+
+ >>> conn = brain.connect(None, None)
+ >>> ids = conn.createMany([{'name': 'object ' + str(i), 'number': i} for i in range(100)])
+ >>> print(conn.explainSearch([['number'], op.GTE, 0], op.AND, [['name'], op.EQ, 'object 5']))
+ INTERSECT (~1 records)
+   SEARCH ['name'] == 'object 5' (~1 records)
+   EXISTS ['number'] >= 0 (~100 records)
+ >>> conn.close()
+
 Connection.getRemoveConflicts()
 ===============================
 
@@ -818,6 +1001,53 @@ Insert given data to list in object.
  brain.interface.FormatError: Last element of target field name should be None or integer
  >>> conn.close()
 
+Connection.iterDump()
+=====================
+
+Same as `Connection.dump()`_, but object contents are read from database when they
+are requested, so the whole database is not kept in memory. All field tables are
+scanned simultaneously in the order of object IDs, so the number of queries does not
+depend on the number of objects. Available only for local
+connections. Can be used outside of transactions or inside synchronous transaction.
+
+**Arguments**: ``iterDump()``
+
+**Returns**: iterator over tuples (object ID, object contents)
+
+**Example**:
+
+ >>> conn = brain.connect(None, None)
+ >>> id1 = conn.create([1, 2, 3])
+ >>> id2 = conn.create({'key': 'val'})
+ >>> for obj_id, data in conn.iterDump():
+ ...     print(obj_id, data)
+ 1 [1, 2, 3]
+ 2 {'key': 'val'}
+ >>> conn.close()
+
+Connection.iterSearch()
+=======================
+
+Same as `Connection.search()`_, but found object IDs are fetched from database
+when they are requested, so that large result sets can be processed in constant
+memory. Available only for local connections. Can be used outside of transactions
+or inside synchronous transaction.
+
+**Arguments**: ``iterSearch(condition, order_by=None, descending=False, limit=None,
+offset=None, cursor=None)``
+
+**Returns**: iterator over found object IDs
+
+**Example**:
+
+ >>> conn = brain.connect(None, None)
+ >>> id1 = conn.create({'key': 1})
+ >>> id2 = conn.create({'key': 2})
+ >>> for obj_id in conn.iterSearch(['key'], brain.op.GT, 1):
+ ...     print(obj_id)
+ 2
+ >>> conn.close()
+
 Connection.modify()
 ===================
 
@@ -953,6 +1183,33 @@ Read contents of given object.
  [{'length': 240}, {'length': 300}]
  >>> conn.close()
 
+Connection.readMany()
+=====================
+
+Read contents of several objects. Specification entries of all objects are read
+with one query, and each field is read with one query for all objects, so it is much
+faster than calling `Connection.read()`_ for each object.
+If one of the objects cannot be read, `LogicError`_ is raised.
+
+**Arguments**: ``readMany(ids, path=None, masks=None)``
+
+``ids``:
+  List of object IDs.
+
+``path``, ``masks``:
+  Same as for `Connection.read()`_, applied to each object.
+
+**Returns**: list of resulting data structures in the same order as ``ids``.
+
+**Example**:
+
+ >>> conn = brain.connect(None, None)
+ >>> id1 = conn.create({'name': 'Alex', 'tracks': ['track 1', 'track 2']})
+ >>> id2 = conn.create({'name': 'Bob', 'tracks': ['track 3']})
+ >>> print(conn.readMany([id1, id2], ['tracks']))
+ [['track 1', 'track 2'], ['track 3']]
+ >>> conn.close()
+
 Connection.repair()
 ===================
 
@@ -962,7 +1219,31 @@ database. It can be used when database requests (even `Connection.read()`_) are
 errors with long call stack. These internal tables can be spoiled either by errors in logic
 or because of some errors in underlying SQL engine.
 
-**Arguments**: ``repair()``
+Reference counts are calculated by database itself, one field table at a time. New tables
+are filled aside and replace the old ones only when all field tables are processed, so the
+database stays readable during the repair. Repair of a large database can be split between
+several transactions using ``max_tables`` argument; objects can be modified between them
+(changed field tables will be processed again).
+
+**Arguments**: ``repair(max_tables=None)``
+
+``max_tables``:
+  If specified, no more than given number of field tables will be processed by this call.
+  Repair continues from the same place on the next call.
+
+**Returns**: tuple (number of processed field tables, total number of field tables).
+Repair is finished when these numbers are equal.
+
+**Example**:
+
+ >>> conn = brain.connect(None, None)
+ >>> id1 = conn.create({'name': 'Alex', 'tracks': ['Track 1', 'Track 2'], 'age': 22})
+ >>> processed, total = conn.repair(max_tables=1)
+ >>> while processed < total:
+ ...     processed, total = conn.repair(max_tables=1)
+ >>> print(conn.read(id1, ['tracks']))
+ ['Track 1', 'Track 2']
+ >>> conn.close()
 
 Connection.rollback()
 =====================
@@ -992,7 +1273,8 @@ Connection.search()
 
 Search for objects in database which satisfy given conditions.
 
-**Arguments**: ``search(condition)``
+**Arguments**: ``search(condition, order_by=None, descending=False, limit=None,
+offset=None, cursor=None)``
 
 ``condition``:
   One of three possibilities:
@@ -1003,6 +1285,8 @@ Search for objects in database which satisfy given conditions.
 
   * Empty list (only at root level, cannot be a part of condition)
 
+  * Lambda with one argument (only at root level, cannot be a part of condition)
+
   Simple ``condition`` is a list [``brain.op.NOT``, ] `path`_, comparison_operator, value; complex
   ``condition`` is a list [``brain.op.NOT``, ] ``condition``, [[logical_operator,
   [``brain.op.NOT``, ] ``condition``, ] ... ], where each ``condition`` can be either simple or complex.
@@ -1027,8 +1311,45 @@ Search for objects in database which satisfy given conditions.
   ``[NOT, cond1, op1, cond2, op2, NOT, cond3]`` is evaluated as
   ``[[[NOT cond1], op1, cond2], op2, [NOT, cond3]]``.
 
+  Lambda is translated to equivalent condition using its source code, so the condition
+  is still checked by the database. Its argument stands for the object, and its body
+  can contain comparisons of fields (like ``o['tracks'][None]``) with values
+  (``==``, ``!=``, ``<``, ``<=``, ``>``, ``>=``, chained comparisons, ``in`` and ``not in``
+  with collection of values), ``re.search(regexp, field)``, ``and``, ``or`` and ``not``.
+  Keys in paths and values can be arbitrary expressions, which do not depend on the object.
+  Lambda, which contains anything else, is rejected with `FormatError`_ immediately,
+  even during asynchronous transaction. Lambda ``lambda o: True`` matches all objects.
+  The source code is found through ``linecache``, so lambdas, which do not have it
+  (typed in the standard interactive interpreter, passed to ``python -c``, created by
+  ``exec()`` or ``eval()``), are rejected with `FormatError`_ as well; use the list
+  form of condition in this case.
+
+``order_by``:
+  `path`_ to the field, whose values define the order of found objects. It should not
+  contain ``None`` elements. Values of different types are ordered as in SQLite:
+  ``None``, dictionaries and lists go first, then numbers, strings and binary values.
+  Objects without this field go last. Objects with equal values are ordered by IDs.
+  If ``order_by`` is not given, but any of the following parameters is, objects
+  are ordered by IDs.
+
+``descending``:
+  If ``True``, the order is reversed.
+
+``limit``:
+  Maximum number of returned object IDs.
+
+``offset``:
+  Number of found objects, which should be skipped.
+
+``cursor``:
+  Cursor of the last object of previous page of results, returned by
+  `Connection.searchPage()`_ with the same ``order_by`` and ``descending``. Only objects,
+  which follow it in the order, are returned; unlike ``offset``, this does not require
+  skipping previous pages in the database, and keeps pages consistent if objects are created
+  or deleted between requests (including the object the cursor was taken from).
+
 **Returns**: list of object IDs, satisfying given conditions (note that order can
-depend on DB engine).
+depend on DB engine, unless ordering or paging parameters are given).
 
 **Example**:
 
@@ -1083,6 +1404,144 @@ depend on DB engine).
  ... [['age'], op.EQ, 25], op.AND,
  ... [['height'], op.GT, 175]) == [id2])
  True
+
+* Lambda condition
+
+ >>> min_age = 24
+ >>> print(conn.search(lambda o: o['age'] > min_age and o['name'] != 'Bob') == [id3])
+ True
+
+* Ordered pages of results
+
+ >>> print(conn.search(order_by=['height'], limit=2) == [id3, id2])
+ True
+ >>> print(conn.search(order_by=['age'], descending=True, offset=1) == [id2, id1])
+ True
+ >>> ids, cursor = conn.searchPage(order_by=['age'], limit=1)
+ >>> print(ids == [id1])
+ True
+ >>> print(conn.search(order_by=['age'], cursor=cursor, limit=1) == [id2])
+ True
+ >>> conn.close()
+
+* Full-text condition (requires database with full-text index)
+
+ >>> conn = brain.connect(None, None, fulltext='all')
+ >>> id1 = conn.create({'title': 'The quick brown fox'})
+ >>> id2 = conn.create({'title': 'Lazy dog and quick fox'})
+ >>> print(set(conn.search(['title'], op.MATCH, 'Fox quick')) == set([id1, id2]))
+ True
+ >>> print(conn.search(['title'], op.MATCH, '"quick brown"') == [id1])
+ True
+ >>> conn.close()
+
+Connection.searchCount()
+========================
+
+Count objects in database which satisfy given conditions. Objects are counted
+by the database, so the list of their IDs is not transferred to the caller.
+
+**Arguments**: ``searchCount(condition)``
+
+``condition``:
+  Same as for `Connection.search()`_.
+
+**Returns**: number of found objects.
+
+**Example**:
+
+ >>> conn = brain.connect(None, None)
+ >>> ids = conn.createMany([{'name': 'Alex', 'age': 22}, {'name': 'Bob', 'age': 25}])
+ >>> print(conn.searchCount(['age'], op.GT, 20))
+ 2
+ >>> print(conn.searchCount(['name'], op.EQ, 'Carl'))
+ 0
+ >>> conn.close()
+
+Connection.searchExists()
+=========================
+
+Check whether there are objects in database which satisfy given conditions.
+The search stops at the first found object.
+
+**Arguments**: ``searchExists(condition)``
+
+``condition``:
+  Same as for `Connection.search()`_.
+
+**Returns**: ``True`` if at least one object was found, ``False`` otherwise.
+
+**Example**:
+
+ >>> conn = brain.connect(None, None)
+ >>> ids = conn.createMany([{'name': 'Alex', 'age': 22}, {'name': 'Bob', 'age': 25}])
+ >>> print(conn.searchExists(['age'], op.GT, 24))
+ True
+ >>> print(conn.searchExists(['name'], op.EQ, 'Carl'))
+ False
+ >>> conn.close()
+
+Connection.searchRead()
+=======================
+
+Search for objects in database which satisfy given conditions and read them.
+Found objects are read together, with one query for each field table.
+
+**Arguments**: ``searchRead(condition, masks=None, order_by=None, descending=False, limit=None,
+offset=None, cursor=None)``
+
+``condition``, ``order_by``, ``descending``, ``limit``, ``offset``, ``cursor``:
+  Same as for `Connection.search()`_.
+
+``masks``:
+  Same as for `Connection.readByMasks()`_.
+
+**Returns**: list ``[object ID 1, data 1, object ID 2, data 2, ...]`` for found objects
+(in the same format as `Connection.dump()`_). If object does not have fields matching
+``masks``, its data is ``None``.
+
+**Example**:
+
+ >>> conn = brain.connect(None, None)
+ >>> id1, id2 = conn.createMany([{'name': 'Alex', 'age': 22}, {'name': 'Bob', 'age': 25}])
+ >>> print(conn.searchRead(['age'], op.GT, 20, masks=[['name']], order_by=['age'],
+ ... descending=True) == [id2, {'name': 'Bob'}, id1, {'name': 'Alex'}])
+ True
+ >>> conn.close()
+
+Connection.searchPage()
+=======================
+
+Search for objects in database which satisfy given conditions, and return the cursor
+for requesting the next page of results. The cursor is built from the value of
+the ordering field and the ID of the last found object, so it stays valid
+if this object is changed or deleted.
+
+**Arguments**: ``searchPage(condition, order_by=None, descending=False, limit=None,
+offset=None, cursor=None)``
+
+``condition``, ``order_by``, ``descending``, ``limit``, ``offset``, ``cursor``:
+  Same as for `Connection.search()`_.
+
+**Returns**: list ``[object IDs, cursor]``, where object IDs are ordered as for
+`Connection.search()`_ with ordering parameters. The cursor should be treated as an opaque
+value and can be passed to `Connection.search()`_ and similar methods with the same
+``order_by`` and ``descending``. If nothing is found, the given cursor is returned.
+
+**Example**:
+
+ >>> conn = brain.connect(None, None)
+ >>> ids = conn.createMany([{'age': 22}, {'age': 25}, {'age': 20}])
+ >>> page, cursor = conn.searchPage(order_by=['age'], limit=2)
+ >>> print(page == [ids[2], ids[0]])
+ True
+ >>> conn.delete(ids[0])
+ >>> page, cursor = conn.searchPage(order_by=['age'], limit=2, cursor=cursor)
+ >>> print(page == [ids[1]])
+ True
+ >>> page, cursor = conn.searchPage(order_by=['age'], limit=2, cursor=cursor)
+ >>> print(page)
+ []
  >>> conn.close()
 
 CachedConnection
@@ -1105,6 +1564,35 @@ and, therefore, read operation from the first connection will return the old val
   How many objects the cache must keep in memory. If zero, all accessed objects are kept.
   If non-zero, specifies the number of most recently accessed object kept.
 
+.. _AsyncConnection:
+
+AsyncConnection
+~~~~~~~~~~~~~~~
+
+Connection for using in ``asyncio`` programs; should be created by `connectAsync()`_.
+It has the same methods as `Connection`_ (except for ``iterSearch()`` and ``iterDump()``),
+but they are coroutines. All calls are performed in a separate thread, which belongs to
+this connection, so they do not block event loop, and different connections
+can process requests simultaneously.
+
+In addition, it has ``transaction()`` method, which returns asynchronous context manager.
+It begins synchronous transaction on enter and commits it on exit, or rolls it back
+if an exception was raised.
+
+**Example**:
+
+ >>> import asyncio
+ >>> async def main():
+ ...     conn = await brain.connectAsync(None, None)
+ ...     async with conn.transaction():
+ ...         obj = await conn.create({'a': 1})
+ ...         await conn.modify(obj, ['b'], 2)
+ ...     data = await conn.read(obj)
+ ...     await conn.close()
+ ...     return data
+ >>> print(asyncio.run(main()))
+ {'a': 1, 'b': 2}
+
 Client
 ~~~~~~
 
@@ -1,8 +1,9 @@
 import helpers
-from internal import engine, interface
+from internal import engine, interface, structure
 
 def suite(db_path, all_engines, all_storages):
 	internal_suite = helpers.NamedTestSuite('internal')
 	internal_suite.addTest(interface.suite())
 	internal_suite.addTest(engine.suite(db_path, all_engines, all_storages))
+	internal_suite.addTest(structure.suite(db_path, all_engines, all_storages))
 	return internal_suite
@@ -1,6 +1,7 @@
 """Unit tests for database enginr layer"""
 
 import unittest
+import threading
 
 import helpers
 
@@ -96,6 +97,23 @@ class EngineTest(helpers.NamedTestCase):
 		self.failUnless(isinstance(res, list))
 		self.assertEqual(res, [tuple(test_vals)])
 
+	def testExecuteIter(self):
+		"""Test that executeIter() returns rows and allows other queries during iteration"""
+
+		test_table = 'ttt'
+		self.engine.begin()
+		self.engine.execute("CREATE TABLE {} (col1 " + self.str_type + ")", [test_table])
+		for val in ['a', 'b', 'c']:
+			self.engine.execute("INSERT INTO {} VALUES (?)", [test_table], [val])
+
+		res = []
+		for row in self.engine.executeIter("SELECT col1 FROM {} ORDER BY col1", [test_table]):
+			res.append(row[0])
+			self.engine.execute("SELECT COUNT(*) FROM {}", [test_table])
+		self.engine.commit()
+
+		self.assertEqual(res, ['a', 'b', 'c'])
+
 	def testTableExists(self):
 		"""Test work of tableExists() method for existing table"""
 		test_table = 'ttt'
@@ -129,6 +147,36 @@ class EngineTest(helpers.NamedTestCase):
 		self.engine.execute("INSERT INTO {} VALUES (?, ?)", [test_table], test_vals)
 		self.assertFalse(self.engine.tableIsEmpty(test_table))
 
+	def testExecuteUpdate(self):
+		"""Test that executeUpdate() returns number of affected rows"""
+
+		test_table = 'ttt'
+		test_vals = ['a', 'b', 'a']
+		val_type = self.engine.getColumnType(test_vals[0])
+
+		self.engine.begin()
+		self.engine.execute("CREATE TABLE {} (col1 " + val_type + ")", [test_table])
+		self.engine.insertMany(test_table, [[val] for val in test_vals])
+		self.assertEqual(self.engine.executeUpdate("DELETE FROM {} WHERE col1=?",
+			[test_table], ['a']), 2)
+		self.assertEqual(self.engine.executeUpdate("DELETE FROM {} WHERE col1=?",
+			[test_table], ['c']), 0)
+		self.assertEqual(self.engine.execute("SELECT col1 FROM {}", [test_table]), [('b',)])
+
+	def testIndexExists(self):
+		"""Test work of indexExists() method for existing index"""
+		test_table = 'ttt'
+		self.engine.begin()
+		self.engine.execute("CREATE TABLE {} (col1 " + self.str_type + ")", [test_table])
+		self.engine.execute("CREATE INDEX {} ON {} (col1)", ['ttt_index', test_table])
+		self.failUnless(self.engine.indexExists('ttt_index'))
+
+	def testIndexExistsMissingIndex(self):
+		"""Test work of indexExists() method for non-existing index"""
+		self.engine.begin()
+		self.engine.execute("CREATE TABLE {} (col1 " + self.str_type + ")", ['ttt'])
+		self.assertFalse(self.engine.indexExists('ttt'))
+
 	def testDeleteTable(self):
 		"""Test work of deleteTable() method for existing table"""
 		test_table = 'ttt'
@@ -187,6 +235,51 @@ class EngineTest(helpers.NamedTestCase):
 
 		self.failUnless(self.engine.tableExists(test_table))
 
+	def testCatalogRollback(self):
+		"""Check that cached list of tables is restored after rollback"""
+		self.engine.begin()
+		self.engine.execute("CREATE TABLE {} (col1 " + self.str_type + ")", ['ttt1'])
+		self.engine.commit()
+
+		self.engine.begin()
+		self.engine.execute("CREATE TABLE {} (col1 " + self.str_type + ")", ['ttt2'])
+		self.engine.deleteTable('ttt1')
+		self.assertEqual(self.engine.selectExistingTables(['ttt1', 'ttt2']), ['ttt2'])
+		self.engine.rollback()
+
+		self.engine.begin()
+		self.failUnless(self.engine.tableExists('ttt1'))
+		self.assertFalse(self.engine.tableExists('ttt2'))
+		self.assertEqual(self.engine.selectExistingTables(['ttt1', 'ttt2']), ['ttt1'])
+		self.engine.commit()
+
+	def testCatalogSchemaChangeByOtherConnection(self):
+		"""Check that tables created and deleted by other connection are noticed"""
+		engine2 = self.openSecondEngine()
+		if engine2 is None:
+			self.skipTest("Database does not support several connections")
+
+		self.engine.begin()
+		self.engine.execute("CREATE TABLE {} (col1 " + self.str_type + ")", ['ttt1'])
+		self.engine.commit()
+
+		# fill catalog of the second engine
+		engine2.begin()
+		self.failUnless(engine2.tableExists('ttt1'))
+		engine2.commit()
+
+		self.engine.begin()
+		self.engine.execute("CREATE TABLE {} (col1 " + self.str_type + ")", ['ttt2'])
+		self.engine.deleteTable('ttt1')
+		self.engine.commit()
+
+		engine2.begin()
+		res = engine2.selectExistingTables(['ttt1', 'ttt2'])
+		engine2.commit()
+		engine2.close()
+
+		self.assertEqual(res, ['ttt2'])
+
 	def testRegexpSupport(self):
 		"""Check that engine supports regexp search"""
 		test_table = 'ttt'
@@ -258,12 +351,97 @@ class EngineTest(helpers.NamedTestCase):
 
 		self.assertEqual(res, [('b',)])
 
+	def testStatementCache(self):
+		"""Check that repeated queries reuse prepared statements"""
+		if not hasattr(self.engine, 'getStatementCacheStats'):
+			self.skipTest("Engine does not cache prepared statements")
+
+		test_table = 'ttt'
+		self.engine.begin()
+		self.engine.execute("CREATE TABLE {} (col1 " + self.str_type + ")", [test_table])
+
+		stats_before = self.engine.getStatementCacheStats()
+		for val in ['a', 'b', 'c']:
+			self.engine.execute("INSERT INTO {} VALUES (?)", [test_table], [val])
+		stats_after = self.engine.getStatementCacheStats()
+		self.engine.commit()
+
+		self.assertEqual(stats_after['misses'] - stats_before['misses'], 1)
+		self.assertEqual(stats_after['hits'] - stats_before['hits'], 2)
+
+	def testReadTransaction(self):
+		"""Check that read-only transaction sees only committed changes"""
+		if not self.engine.supportsConcurrentReads():
+			self.skipTest("Engine does not support concurrent reads")
+
+		test_table = 'ttt'
+		self.engine.begin()
+		self.engine.execute("CREATE TABLE {} (col1 " + self.str_type + ")", [test_table])
+		self.engine.execute("INSERT INTO {} VALUES (?)", [test_table], ['a'])
+		self.engine.commit()
+
+		self.engine.begin()
+		self.engine.execute("INSERT INTO {} VALUES (?)", [test_table], ['b'])
+
+		self.engine.beginRead()
+		res = self.engine.execute("SELECT col1 FROM {}", [test_table])
+		self.engine.endRead()
+
+		self.engine.commit()
+		self.assertEqual(res, [('a',)])
+
+	def testReadTransactionsInThreads(self):
+		"""Check that read-only transactions can be performed from several threads"""
+		if not self.engine.supportsConcurrentReads():
+			self.skipTest("Engine does not support concurrent reads")
+
+		test_table = 'ttt'
+		self.engine.begin()
+		self.engine.execute("CREATE TABLE {} (col1 " + self.str_type + ")", [test_table])
+		self.engine.execute("INSERT INTO {} VALUES (?)", [test_table], ['a'])
+		self.engine.commit()
+
+		results = []
+		def reader():
+			for i in range(10):
+				self.engine.beginRead()
+				try:
+					results.append(self.engine.execute("SELECT col1 FROM {}", [test_table]))
+				finally:
+					self.engine.endRead()
+
+		threads = [threading.Thread(target=reader) for i in range(8)]
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+
+		self.assertEqual(results, [[('a',)]] * 80)
+
 	def testIdCounter(self):
 		"""Simple check for internal ID counter"""
 		id1 = self.engine.getNewId()
 		id2 = self.engine.getNewId()
 		self.assertNotEqual(id1, id2)
 
+	def testIdCounterBlocks(self):
+		"""Check that IDs are unique when they are handed out from several blocks"""
+		block_size = self.engine._id_block_size
+		ids = [self.engine.getNewId() for i in range(block_size * 2 + 1)]
+		self.assertEqual(len(set(ids)), len(ids))
+
+	def testIdCounterRollback(self):
+		"""Check that IDs, handed out during rolled back transaction, are not reused"""
+		self.engine.begin()
+		id1 = self.engine.getNewId()
+		self.engine.rollback()
+
+		self.engine.begin()
+		id2 = self.engine.getNewId()
+		self.engine.commit()
+
+		self.assertNotEqual(id1, id2)
+
 	def testIdCounterType(self):
 		"""Check that ID has proper type"""
 		id1 = self.engine.getNewId()
@@ -285,6 +463,25 @@ class EngineTest(helpers.NamedTestCase):
 		for table in test_tables:
 			self.assertTrue(table in tables_list)
 
+	def testIndexNames(self):
+		"""Check that names of indexes of the table with long name are distinct and stable"""
+		table_name = Field(self.engine, ['a' * 100, 'b' * 100], 'c').table_name
+		id_index = self.engine.getIndexName(['index', 'id', table_name])
+		value_index = self.engine.getIndexName(['index', 'value', table_name])
+
+		self.assertNotEqual(id_index, value_index)
+		self.assertEqual(id_index, self.engine.getIndexName(['index', 'id', table_name]))
+
+		self.engine.begin()
+		self.engine.execute("CREATE TABLE {} (id " + self.str_type + ", value " +
+			self.str_type + ")", [table_name])
+		self.engine.execute("CREATE INDEX {} ON {} (id)", [id_index, table_name])
+		self.engine.execute("CREATE INDEX {} ON {} (value)", [value_index, table_name])
+		self.engine.commit()
+
+		self.assertTrue(self.engine.indexExists(id_index))
+		self.assertTrue(self.engine.indexExists(value_index))
+
 	def testIsFieldTableName(self):
 		"""Check that Field.isFieldTableName works"""
 		f = Field(self.engine, ['aaa', 1])
@@ -309,6 +506,7 @@ class EngineTestParams:
 
 	def __init__(self, engine_tag, storage_tag, in_memory, engine_args, engine_kwds):
 		self.test_tag = engine_tag + "." + storage_tag
+		self.storage_tag = storage_tag
 		self.in_memory = in_memory
 		self.engine_tag = engine_tag
 		self.engine_args = engine_args
@@ -321,7 +519,8 @@ def getEngineTestParams(db_path, all_engines, all_storages):
 
 	storages = {
 		'sqlite3': [(IN_MEMORY, (None,), {}), ('file', ('test.db',),
-			{'open_existing': 0, 'db_path': db_path})],
+			{'open_existing': 0, 'db_path': db_path}), ('wal', ('test.db',),
+			{'open_existing': 0, 'db_path': db_path, 'wal': True})],
 		'postgre': [('tempdb', ('tempdb',), {'open_existing': 0,
 			'port': 5432, 'user': 'postgres', 'password': ''})]
 	}
@@ -353,6 +552,14 @@ def getParameterizedEngineTest(engine_tag, engine_args, engine_kwds):
 		def tearDown(self):
 			self.engine.close()
 
+		def openSecondEngine(self):
+			"""Returns another engine object connected to the same DB or None"""
+			if engine_args[0] is None:
+				return None
+			kwds = dict(engine_kwds)
+			kwds['open_existing'] = 1
+			return getEngineByTag(engine_tag)(*engine_args, **kwds)
+
 	return Derived
 
 def suite(db_path, all_engines, all_storages):
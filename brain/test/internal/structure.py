@@ -0,0 +1,481 @@
+"""Unit tests for database structure layer"""
+
+import threading
+import unittest
+
+import helpers
+
+import brain
+import brain.op as op
+from brain.connection import Connection
+from brain.engine import getEngineByTag
+from brain.interface import Field
+from brain.logic import LogicLayer
+from internal.engine import getEngineTestParams
+
+
+class StructureTest(helpers.NamedTestCase):
+	"""Test for structure layer internals, which are not visible through public API"""
+
+	def getIndexName(self, table_name, column):
+		return self.engine.getIndexName(['index', column, table_name])
+
+	def testFieldTableIndexes(self):
+		"""Check that indexes are created together with field table"""
+		self.conn.create({'tracks': ['Track 1', 'Track 2']})
+		table_name = Field(self.engine, ['tracks', None], 'a').table_name
+
+		self.failUnless(self.engine.indexExists(self.getIndexName(table_name, 'id')))
+		self.failUnless(self.engine.indexExists(self.getIndexName(table_name, 'value')))
+
+	def testSpecificationTableIndex(self):
+		"""Check that specification table has unique index"""
+		spec_table = self.engine.getNameString(['id'])
+		self.failUnless(self.engine.indexExists(self.getIndexName(spec_table, 'id')))
+
+	def testIndexesMigration(self):
+		"""Check that indexes are added to database, which was created without them"""
+		self.conn.create({'name': 'Alex', 'tracks': ['Track 1']})
+
+		tables = [self.engine.getNameString(['id'])] + \
+			[x for x in self.engine.getTablesList() if Field.isFieldTableName(self.engine, x)]
+
+		self.engine.begin()
+		for table in tables:
+			for column in ['id', 'value']:
+				index_name = self.getIndexName(table, column)
+				if self.engine.indexExists(index_name):
+					self.engine.execute("DROP INDEX {}", [index_name])
+		self.engine.commit()
+
+		# structure layer should add missing indexes on startup
+		LogicLayer(self.engine)
+
+		for table in tables:
+			self.failUnless(self.engine.indexExists(self.getIndexName(table, 'id')))
+
+		self.assertEqual(self.conn.read(self.conn.search()[0]),
+			{'name': 'Alex', 'tracks': ['Track 1']})
+
+	def testPathTable(self):
+		"""Check that specification table refers to field names by path IDs"""
+		self.conn.create({'name': 'Alex', 'tracks': ['Track 1']})
+
+		self.engine.begin()
+		spec_rows = self.engine.execute("SELECT field FROM {}",
+			[self.engine.getNameString(['id'])])
+		path_rows = self.engine.execute("SELECT path_id, path FROM {}",
+			[self.engine.getNameString(['paths'])])
+		self.engine.commit()
+
+		paths = {path_id: path for path_id, path in path_rows}
+		spec_paths = set(paths[path_id] for path_id, in spec_rows)
+		for name in [['name'], ['tracks', None]]:
+			self.assertTrue(Field(self.engine, name).name_str in spec_paths)
+
+	def testPathCacheRollback(self):
+		"""Check that path IDs reserved in rolled back transaction are not used"""
+		self.conn.beginSync()
+		self.conn.create({'name1': 'Alex'})
+		self.conn.rollback()
+
+		obj1 = self.conn.create({'name2': 'Bob'})
+		obj2 = self.conn.create({'name1': 'Carl'})
+
+		self.assertEqual(self.conn.read(obj1), {'name2': 'Bob'})
+		self.assertEqual(self.conn.read(obj2), {'name1': 'Carl'})
+		self.assertEqual(self.conn.search(['name1'], op.EQ, 'Carl'), [obj2])
+
+	def testPathIdsForManyFields(self):
+		"""Check that path IDs are created and looked up for objects with many fields"""
+		data = {'field' + str(i): i for i in range(1200)}
+		obj = self.conn.create(data)
+
+		# path IDs should be read from path table, not from cache
+		self.conn._logic._structure._path_ids = {}
+		self.assertEqual(self.conn.read(obj), data)
+
+		self.engine.begin()
+		path_ids = [path_id for path_id, in self.engine.execute("SELECT path_id FROM {}",
+			[self.engine.getNameString(['paths'])])]
+		self.engine.commit()
+		self.assertTrue(len(path_ids) >= len(data))
+		self.assertEqual(len(set(path_ids)), len(path_ids))
+
+	def testPathSequenceMigration(self):
+		"""Check that path IDs continue numbering of path table, created without sequence"""
+		self.conn.create({'name': 'Alex'})
+
+		# remove path ID sequence (a table for sqlite3), as if database
+		# was created by older version, which allocated IDs as MAX(path_id) + 1
+		path_table = self.engine.getNameString(['paths'])
+		path_sequence = self.engine.getNameString(['paths', 'sequence'])
+		self.engine.begin()
+		if self.engine.tableExists(path_sequence):
+			self.engine.deleteTable(path_sequence)
+		else:
+			self.engine.execute("DROP SEQUENCE {}", [path_sequence])
+		self.engine.execute("INSERT INTO {} VALUES (100, ?)", [path_table],
+			[Field(self.engine, ['phone']).name_str])
+		self.engine.commit()
+
+		obj = self.conn.create({'name': 'Bob', 'age': 20})
+		self.assertEqual(self.conn.read(obj), {'name': 'Bob', 'age': 20})
+		self.assertEqual(self.conn.search(['age'], op.EQ, 20), [obj])
+
+	def testSpecificationMigration(self):
+		"""Check that specification table with field names is converted on startup"""
+		data = {'name': 'Alex', 'tracks': [{'length': 300}]}
+		obj = self.conn.create(data)
+
+		# convert specification table to format with field names
+		spec_table = self.engine.getNameString(['id'])
+		path_table = self.engine.getNameString(['paths'])
+		self.engine.begin()
+		rows = self.engine.execute("SELECT id, path, type, refcount FROM {}, {} " +
+			"WHERE field=path_id", [spec_table, path_table])
+		self.engine.deleteTable(spec_table)
+		self.engine.deleteTable(path_table)
+		self.engine.execute("CREATE TABLE {} (id " + self.engine.getIdType() +
+			", field TEXT, type TEXT, refcount " + self.engine.getColumnType(int()) + ")",
+			[spec_table])
+		self.engine.insertMany(spec_table, rows)
+		self.engine.commit()
+
+		# structure layer should rebuild specification table on startup
+		conn = Connection(self.engine)
+		self.assertEqual(conn.read(obj), data)
+		self.assertEqual(conn.search(['tracks', None, 'length'], op.EQ, 300), [obj])
+
+	def testEavPathIds(self):
+		"""Check that records in value tables of EAV layout refer to field names by path IDs"""
+		self.conn.close()
+		self.conn = self.connect(storage='eav')
+		self.engine = self.conn._engine
+
+		obj = self.conn.create({'name': 'Alex', 'tracks': ['Track 1']})
+
+		field = Field(self.engine, ['tracks', None], 'Track 1')
+		table_name = self.conn._logic._structure.getFieldTableName(field)
+		self.engine.begin()
+		rows = self.engine.execute("SELECT path_id, value FROM {}", [table_name])
+		path_rows = self.engine.execute("SELECT path_id FROM {} WHERE path=?",
+			[self.engine.getNameString(['paths'])], [field.name_str])
+		self.engine.commit()
+
+		self.assertEqual(rows, [(path_rows[0][0], 'Track 1')])
+		self.assertEqual(self.conn.read(obj), {'name': 'Alex', 'tracks': ['Track 1']})
+		self.assertEqual(self.conn.search(['tracks', None], op.EQ, 'Track 1'), [obj])
+
+	def testSparseListLocalRespacing(self):
+		"""
+		Check that when there is no space left between elements of sparse list,
+		only elements around the insertion place get new keys
+		"""
+		self.conn.close()
+		self.conn = self.connect(lists='sparse')
+		self.engine = self.conn._engine
+
+		obj = self.conn.create({'key': list(range(1000))})
+		for i in range(100):
+			self.conn.insert(obj, ['key', 500], -i)
+
+		table_name = Field(self.engine, ['key', None], 1).table_name
+		self.engine.begin()
+		rows = self.engine.execute("SELECT c0 FROM {} WHERE value=999", [table_name])
+		self.engine.commit()
+
+		self.assertEqual(rows, [(999 * self.conn._logic._list_gap,)])
+		self.assertEqual(self.conn.read(obj, ['key', 500]), -99)
+		self.assertEqual(self.conn.read(obj, ['key', 599]), 0)
+		self.assertEqual(self.conn.read(obj, ['key', 1099]), 999)
+
+	def testDeferredTableDeletion(self):
+		"""Check that empty field tables are deleted by garbage collection"""
+		obj = self.conn.create({'name': 'Alex', 'tracks': ['Track 1']})
+		table_name = Field(self.engine, ['tracks', None], 'Track 1').table_name
+
+		self.conn.delete(obj, ['tracks'])
+		self.failUnless(self.engine.tableExists(table_name))
+		self.assertEqual(self.conn.read(obj), {'name': 'Alex'})
+
+		structure = self.conn._logic._structure
+		self.engine.begin()
+		structure.collectGarbage()
+		self.engine.commit()
+		self.assertFalse(self.engine.tableExists(table_name))
+
+		# table should be created again when necessary
+		self.conn.modify(obj, ['tracks'], ['Track 2'])
+		self.assertEqual(self.conn.read(obj), {'name': 'Alex', 'tracks': ['Track 2']})
+
+	def testGarbageCollectionThreshold(self):
+		"""Check that garbage collection starts when enough tables are marked"""
+		structure = self.conn._logic._structure
+		structure.GC_THRESHOLD = 3
+
+		obj = self.conn.create({'name': 'Alex', 'age': 22, 'phone': '1234'})
+		tables = [Field(self.engine, [name], 'a').table_name for name in ['name', 'phone']]
+
+		self.conn.delete(obj, ['name'])
+		self.conn.delete(obj, ['phone'])
+		for table_name in tables:
+			self.failUnless(self.engine.tableExists(table_name))
+
+		self.conn.delete(obj, ['age'])
+		for table_name in tables:
+			self.assertFalse(self.engine.tableExists(table_name))
+		self.assertEqual(structure._gc_tables, set())
+
+	def testGarbageCollectionAfterRollback(self):
+		"""Check that tables are not deleted if deletion of their records was rolled back"""
+		obj = self.conn.create({'name': 'Alex', 'tracks': ['Track 1']})
+		table_name = Field(self.engine, ['tracks', None], 'Track 1').table_name
+
+		self.conn.beginSync()
+		self.conn.delete(obj, ['tracks'])
+		self.conn.rollback()
+
+		structure = self.conn._logic._structure
+		self.engine.begin()
+		structure.collectGarbage()
+		self.engine.commit()
+		self.failUnless(self.engine.tableExists(table_name))
+		self.assertEqual(self.conn.read(obj), {'name': 'Alex', 'tracks': ['Track 1']})
+
+	def testGarbageCollectionKeepsFilledTables(self):
+		"""Check that garbage collection does not delete tables, which are still in use"""
+		obj1 = self.conn.create({'name': 'Alex'})
+		obj2 = self.conn.create({'name': 'Bob'})
+		table_name = Field(self.engine, ['name'], 'Alex').table_name
+
+		self.conn.delete(obj1)
+
+		structure = self.conn._logic._structure
+		self.engine.begin()
+		structure.collectGarbage()
+		self.engine.commit()
+		self.failUnless(self.engine.tableExists(table_name))
+		self.assertEqual(self.conn.read(obj2), {'name': 'Bob'})
+
+	def testShapeCache(self):
+		"""Check that object shapes are cached only until the end of transaction"""
+		obj = self.conn.create({'name': 'Alex'})
+		structure = self.conn._logic._structure
+		name_str = Field(self.engine, ['name']).name_str
+		type_str = Field(self.engine, ['name'], 'Alex').type_str
+
+		self.conn.beginSync()
+		self.conn.read(obj)
+		self.assertEqual(structure._shapes[obj][name_str], {type_str: 1})
+
+		# shape should be updated together with specification table
+		self.conn.modify(obj, ['name'], 1)
+		int_type_str = Field(self.engine, ['name'], 1).type_str
+		self.assertEqual(structure._shapes[obj][name_str], {int_type_str: 1})
+		self.conn.commit()
+		self.assertEqual(structure._shapes, {})
+
+		self.conn.beginSync()
+		self.conn.modify(obj, ['name'], 'Bob')
+		self.conn.rollback()
+		self.assertEqual(structure._shapes, {})
+		self.assertEqual(self.conn.read(obj), {'name': 1})
+
+	def testShapeCacheForCreatedObjects(self):
+		"""Check that shapes, cached before objects are created, are not used after"""
+		obj = self.conn.create({'name': 'Alex'})
+
+		self.conn.beginSync()
+
+		# empty shape of the next ID is cached
+		self.assertFalse(self.conn.objectExists(obj + 1))
+
+		ids = self.conn.createMany([{'name': 'Bob'}, {'name': 'Carl'}])
+		self.assertEqual(ids[0], obj + 1)
+		self.assertEqual(self.conn.read(ids[0]), {'name': 'Bob'})
+		self.conn.commit()
+
+		self.assertEqual(self.conn.read(ids[0]), {'name': 'Bob'})
+
+	def testMaskedFieldsInfoWithoutShape(self):
+		"""Check that fields, matching masks, are selected from database if shape is not cached"""
+		obj = self.conn.create({'a': {'b': 1, 'c': [2, 'x']}, 'a*': 3, 'ab': 4})
+		structure = self.conn._logic._structure
+		masks = [Field(self.engine, ['a']), Field(self.engine, ['a*'])]
+
+		self.engine.begin()
+		selected = structure._getRawFieldsInfo(obj, masks, include_refcounts=True)
+		self.assertEqual(structure._shapes, {})
+		from_shape = structure._getRawFieldsInfo(obj, masks, include_refcounts=True,
+			shape=structure._getShape(obj))
+		self.engine.commit()
+
+		self.assertCountEqual(selected, from_shape)
+		self.assertEqual(set(name_str for name_str, type_str, refcount in selected),
+			set(Field(self.engine, name).name_str
+				for name in [['a'], ['a', 'b'], ['a', 'c'], ['a', 'c', None], ['a*']]))
+
+	def testShapeChangedByOtherConnection(self):
+		"""
+		Check that connection sees changes of object structure,
+		made by another connection between transactions
+		"""
+
+		# this test makes no sense for in-memory databases - they allow only one connection
+		if self.in_memory: return
+
+		obj = self.conn.create({'name': 'Alex', 'tracks': ['Track 1']})
+		self.conn.read(obj)
+
+		conn2 = self.reconnect()
+		conn2.modify(obj, ['tracks'], {'title': 'Track 2'})
+		conn2.close()
+
+		self.conn.modify(obj, ['tracks', 'length'], 300)
+		self.assertEqual(self.conn.read(obj),
+			{'name': 'Alex', 'tracks': {'title': 'Track 2', 'length': 300}})
+
+	def testShapeCacheInReadTransaction(self):
+		"""
+		Check that read-only transactions in other threads do not use shapes,
+		cached by uncommitted main transaction
+		"""
+		if not self.engine.supportsConcurrentReads(): return
+
+		obj = self.conn.create({'name': 'Alex'})
+		structure = self.conn._logic._structure
+		masks = [Field(self.engine, ['tracks'])]
+
+		self.engine.begin()
+		committed_shape = dict(structure._getShape(obj))
+		self.engine.commit()
+
+		self.conn.beginSync()
+		self.conn.modify(obj, ['tracks'], ['Track 1'])
+		new_obj = self.conn.create({'name': 'Bob'})
+		self.assertTrue(obj in structure._shapes)
+
+		results = []
+		def reader():
+			self.engine.beginRead()
+			try:
+				results.append((structure._getShape(obj),
+					structure._getRawFieldsInfo(obj, masks),
+					structure.objectExists(new_obj)))
+			finally:
+				self.engine.endRead()
+
+		thread = threading.Thread(target=reader)
+		thread.start()
+		thread.join()
+		self.conn.commit()
+
+		self.assertEqual(results, [(committed_shape, [], False)])
+
+	def testRecordsNumbersInvalidation(self):
+		"""Check that cached numbers of field records are dropped when records are changed"""
+		structure = self.conn._logic._structure
+		field = Field(self.engine, ['name'], 'Alex')
+
+		def getRecordsNumber():
+			self.engine.begin()
+			try:
+				return structure._getRecordsNumber(field)
+			finally:
+				self.engine.commit()
+
+		obj = self.conn.create({'name': 'Alex'})
+		self.assertEqual(getRecordsNumber(), 1)
+
+		self.conn.createMany([{'name': 'Bob'}, {'name': 'Carl'}])
+		self.assertEqual(getRecordsNumber(), 3)
+
+		self.conn.modify(obj, ['name'], 1)
+		self.assertEqual(getRecordsNumber(), 2)
+
+		# numbers, which were read inside of rolled back transaction, are dropped too
+		self.conn.beginSync()
+		self.conn.create({'name': 'Dan'})
+		self.assertEqual(structure._getRecordsNumber(field), 3)
+		self.conn.rollback()
+		self.assertEqual(getRecordsNumber(), 2)
+
+	def testCreateManySpecification(self):
+		"""Check that createMany() creates the same specification entries as create()"""
+		data_list = [{'name': 'Alex', 'tracks': ['Track 1', 'Track 2', 3]},
+			{'name': 'Bob', 'tracks': [{'length': 300}]}]
+
+		spec_table = self.engine.getNameString(['id'])
+		query = "SELECT field, type, refcount FROM {} WHERE id=?"
+
+		ids = [self.conn.create(data) for data in data_list] + \
+			self.conn.createMany(data_list)
+
+		self.engine.begin()
+		specs = [sorted(self.engine.execute(query, [spec_table], [obj])) for obj in ids]
+		self.engine.commit()
+
+		self.assertEqual(specs[2:], specs[:2])
+
+	def testRepairRestoresSpecification(self):
+		"""Check that repair rebuilds damaged specification table"""
+		self.conn.create({'name': 'Alex', 'tracks': ['Track 1', 'Track 2', 3]})
+		self.conn.create({'name': 'Bob', 'tracks': [{'length': 300}]})
+
+		spec_table = self.engine.getNameString(['id'])
+		query = "SELECT id, field, type, refcount FROM {}"
+
+		self.engine.begin()
+		spec_before = sorted(self.engine.execute(query, [spec_table]))
+		self.engine.execute("UPDATE {} SET refcount=100", [spec_table])
+		self.engine.execute("DELETE FROM {} WHERE type=?", [spec_table],
+			[Field(self.engine, ['name'], 'Alex').type_str])
+		self.engine.commit()
+
+		field_tables = [x for x in self.engine.getTablesList()
+			if Field.isFieldTableName(self.engine, x)]
+		self.assertEqual(self.conn.repair(), (len(field_tables), len(field_tables)))
+
+		self.engine.begin()
+		spec_after = sorted(self.engine.execute(query, [spec_table]))
+		self.engine.commit()
+		self.assertEqual(spec_after, spec_before)
+
+		# support tables of repair should be deleted
+		self.assertFalse(self.engine.tableExists(self.engine.getNameString(['repair', 'id'])))
+		self.failUnless(self.engine.indexExists(self.getIndexName(spec_table, 'id')))
+
+
+def getParameterizedStructureTest(engine_tag, in_memory, engine_args, engine_kwds):
+
+	class Derived(StructureTest):
+		def connect(self, **additional_kwds):
+			kwds = dict(engine_kwds)
+			kwds.update(additional_kwds)
+			return brain.connect(engine_tag, *engine_args, **kwds)
+
+		def reconnect(self):
+			return self.connect(open_existing=1)
+
+		def setUp(self):
+			self.in_memory = in_memory
+			self.conn = self.connect()
+			self.engine = self.conn._engine
+
+		def tearDown(self):
+			self.conn.close()
+
+	return Derived
+
+def suite(db_path, all_engines, all_storages):
+
+	res = helpers.NamedTestSuite('structure')
+
+	for params in getEngineTestParams(db_path, all_engines, all_storages):
+		structure_suite = helpers.NamedTestSuite(params.test_tag)
+		structure_suite.addTestCaseClass(getParameterizedStructureTest(params.engine_tag,
+			params.in_memory, params.engine_args, params.engine_kwds))
+		res.addTest(structure_suite)
+
+	return res
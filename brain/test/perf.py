@@ -1,12 +1,15 @@
-"""Functionality tests"""
+"""Performance tests"""
 
 import tempfile
+import time
+import random
 
 import helpers
 import public
 import fuzz
 
 import brain
+import brain.op as op
 
 
 def runPerformanceTests(verbosity=2):
@@ -40,3 +43,463 @@ def runPerformanceTests(verbosity=2):
 		for action in total_times]
 	print("* Fuzz test, seeds " + ", ".join([str(seed) for seed in seeds]) +
 		", action times:\n" + "\n".join(time_strings))
+
+
+def _measure(func, repetitions):
+	"""Returns average time of given function call"""
+	time1 = time.time()
+	for i in range(repetitions):
+		func()
+	time2 = time.time()
+	return (time2 - time1) / repetitions
+
+def benchmarkIndexes(db_path, sizes=None, verbosity=2):
+	"""Measure read and search latency for growing number of objects"""
+
+	if sizes is None:
+		sizes = [10000, 100000, 1000000]
+
+	repetitions = 100
+	conn = brain.connect(None, 'bench.db', open_existing=0, db_path=db_path)
+
+	ids = []
+	for size in sorted(sizes):
+
+		# fill database with objects up to the next checkpoint
+		conn.beginSync()
+		for i in range(len(ids), size):
+			ids.append(conn.create({'name': 'object ' + str(i), 'number': i,
+				'tags': ['tag' + str(i % 10), 'tag' + str(i % 7)]}))
+		conn.commit()
+
+		read_time = _measure(lambda: conn.read(random.choice(ids)), repetitions)
+		search_time = _measure(lambda: conn.search(['number'], op.EQ,
+			random.randrange(size)), repetitions)
+		mask_time = _measure(lambda: conn.readByMask(random.choice(ids),
+			['tags', None]), repetitions)
+
+		print("* {size} objects: read {read:.3f} ms, read by mask {mask:.3f} ms, " \
+			"search {search:.3f} ms".format(size=size, read=read_time * 1000,
+			mask=mask_time * 1000, search=search_time * 1000))
+
+	conn.close()
+
+def benchmarkInsertMany(db_path, sizes=None, verbosity=2):
+	"""Measure creation of and insertion into long lists"""
+
+	if sizes is None:
+		sizes = [10000, 100000]
+
+	conn = brain.connect(None, 'bench.db', open_existing=0, db_path=db_path)
+
+	for size in sizes:
+		values = list(range(size))
+
+		time1 = time.time()
+		obj = conn.create({'list': values})
+		time2 = time.time()
+		conn.insertMany(obj, ['list', None], values)
+		time3 = time.time()
+		conn.delete(obj)
+
+		print("* {size} elements: create {create:.3f} s, insertMany {insert:.3f} s".format(
+			size=size, create=time2 - time1, insert=time3 - time2))
+
+	conn.close()
+
+def benchmarkStorage(db_path, sizes=None, verbosity=2):
+	"""Compare storage layouts for growing number of distinct field names"""
+
+	if sizes is None:
+		sizes = [10, 100, 1000]
+
+	objects = 1000
+	fields_in_object = 10
+	repetitions = 100
+
+	for size in sizes:
+		for storage in ['tables', 'eav']:
+			db_name = 'bench_' + storage + '_' + str(size) + '.db'
+			conn = brain.connect(None, db_name, open_existing=0, db_path=db_path,
+				storage=storage)
+
+			time1 = time.time()
+			conn.beginSync()
+			ids = []
+			for i in range(objects):
+				ids.append(conn.create({'field' + str((i + j) % size): i
+					for j in range(fields_in_object)}))
+			conn.commit()
+			time2 = time.time()
+
+			read_time = _measure(lambda: conn.read(random.choice(ids)), repetitions)
+			search_time = _measure(lambda: conn.search(
+				['field' + str(random.randrange(size))], op.EQ,
+				random.randrange(objects)), repetitions)
+			conn.close()
+
+			time3 = time.time()
+			conn = brain.connect(None, db_name, open_existing=1, db_path=db_path)
+			conn.read(ids[0])
+			time4 = time.time()
+			conn.close()
+
+			print("* {size} field names, {storage}: create {create:.3f} s, " \
+				"read {read:.3f} ms, search {search:.3f} ms, reopen {reopen:.3f} ms".format(
+				size=size, storage=storage, create=time2 - time1,
+				read=read_time * 1000, search=search_time * 1000,
+				reopen=(time4 - time3) * 1000))
+
+def benchmarkLists(db_path, sizes=None, verbosity=2):
+	"""Compare list formats for insertion to and deletion from the beginning of long lists"""
+
+	if sizes is None:
+		sizes = [1000, 10000, 100000]
+
+	repetitions = 20
+
+	for size in sizes:
+		for lists in ['dense', 'sparse']:
+			db_name = 'bench_' + lists + '_' + str(size) + '.db'
+			conn = brain.connect(None, db_name, open_existing=0, db_path=db_path,
+				lists=lists)
+			obj = conn.create({'list': [{'name': 'element ' + str(i), 'tags': ['tag']}
+				for i in range(size)]})
+
+			insert_time = _measure(lambda: conn.insert(obj, ['list', 0],
+				{'name': 'new element', 'tags': ['tag']}), repetitions)
+			delete_time = _measure(lambda: conn.delete(obj, ['list', 0]), repetitions)
+			read_time = _measure(lambda: conn.read(obj, ['list', size // 2, 'name']),
+				repetitions)
+			conn.close()
+
+			print("* {size} elements, {lists}: insert {insert:.3f} ms, " \
+				"delete {delete:.3f} ms, read element {read:.3f} ms".format(
+				size=size, lists=lists, insert=insert_time * 1000,
+				delete=delete_time * 1000, read=read_time * 1000))
+
+def benchmarkDeepModify(db_path, sizes=None, verbosity=2):
+	"""Measure modification of new fields deep in the hierarchy"""
+
+	if sizes is None:
+		sizes = [10, 20, 40]
+
+	repetitions = 100
+
+	for depth in sizes:
+		conn = brain.connect(None, 'bench_deep_' + str(depth) + '.db', open_existing=0,
+			db_path=db_path)
+
+		# levels alternate between maps and lists; list elements have values
+		# of several types, so that each ancestor has several types in database
+		data = {}
+		path = []
+		level = data
+		for i in range(depth // 2):
+			level['level'] = [1, 'text', 1.5, None, {}]
+			level = level['level'][-1]
+			path += ['level', 4]
+		obj = conn.create(data)
+
+		counter = [0]
+		def modify():
+			counter[0] += 1
+			conn.modify(obj, path + ['field' + str(counter[0])], counter[0])
+
+		modify_time = _measure(modify, repetitions)
+		conn.close()
+
+		print("* depth {depth}: modify {modify:.3f} ms".format(depth=depth,
+			modify=modify_time * 1000))
+
+def benchmarkDump(db_path, sizes=None, verbosity=2):
+	"""Measure full database dump for growing number of objects"""
+
+	if sizes is None:
+		sizes = [1000, 10000, 100000]
+
+	conn = brain.connect(None, 'bench.db', open_existing=0, db_path=db_path)
+
+	objects = 0
+	for size in sorted(sizes):
+
+		# fill database with objects up to the next checkpoint
+		conn.beginSync()
+		for i in range(objects, size):
+			conn.create({'name': 'object ' + str(i), 'number': i,
+				'tags': ['tag' + str(i % 10), 'tag' + str(i % 7)], 'ratio': {'value': i / 2}})
+		conn.commit()
+		objects = size
+
+		time1 = time.time()
+		for obj_id, data in conn.iterDump():
+			pass
+		time2 = time.time()
+
+		print("* {size} objects: dump {dump:.3f} s".format(size=size, dump=time2 - time1))
+
+	conn.close()
+
+def benchmarkCreateMany(db_path, sizes=None, verbosity=2):
+	"""Compare creation of small objects one by one and with createMany()"""
+
+	if sizes is None:
+		sizes = [1000, 10000, 100000]
+
+	for size in sizes:
+		data_list = [{'name': 'object ' + str(i), 'number': i,
+			'tags': ['tag' + str(i % 10), 'tag' + str(i % 7)]} for i in range(size)]
+
+		conn = brain.connect(None, 'bench_create_' + str(size) + '.db', open_existing=0,
+			db_path=db_path)
+
+		time1 = time.time()
+		conn.beginSync()
+		for data in data_list:
+			conn.create(data)
+		conn.commit()
+		time2 = time.time()
+		conn.createMany(data_list)
+		time3 = time.time()
+		conn.close()
+
+		print("* {size} objects: create {create:.3f} s, createMany {create_many:.3f} s".format(
+			size=size, create=time2 - time1, create_many=time3 - time2))
+
+def benchmarkReadMany(db_path, sizes=None, verbosity=2):
+	"""Compare reading of small objects one by one and with readMany()"""
+
+	if sizes is None:
+		sizes = [1000, 10000, 100000]
+
+	for size in sizes:
+		conn = brain.connect(None, 'bench_read_' + str(size) + '.db', open_existing=0,
+			db_path=db_path)
+		ids = conn.createMany([{'name': 'object ' + str(i), 'number': i,
+			'tags': ['tag' + str(i % 10), 'tag' + str(i % 7)]} for i in range(size)])
+
+		time1 = time.time()
+		conn.beginSync()
+		for obj in ids:
+			conn.read(obj)
+		conn.commit()
+		time2 = time.time()
+		conn.readMany(ids)
+		time3 = time.time()
+		conn.close()
+
+		print("* {size} objects: read {read:.3f} s, readMany {read_many:.3f} s".format(
+			size=size, read=time2 - time1, read_many=time3 - time2))
+
+def benchmarkSearch(db_path, sizes=None, verbosity=2):
+	"""Measure search by conjunctions of conditions with different selectivity"""
+
+	if sizes is None:
+		sizes = [10000, 100000, 1000000]
+
+	repetitions = 10
+	conn = brain.connect(None, 'bench.db', open_existing=0, db_path=db_path)
+
+	objects = 0
+	for size in sorted(sizes):
+
+		# fill database with objects up to the next checkpoint
+		conn.createMany([{'name': 'object ' + str(i), 'number': i,
+			'tags': ['tag' + str(i % 10), 'tag' + str(i % 7)]} for i in range(objects, size)])
+		objects = size
+
+		# the first operand selects most objects, and the last one selects only one
+		selective_time = _measure(lambda: conn.search(
+			[[['number'], op.GTE, 0], op.AND, [['tags', 0], op.EQ, 'tag1']],
+			op.AND, [['name'], op.EQ, 'object ' + str(random.randrange(size))]), repetitions)
+		inverted_time = _measure(lambda: conn.search(
+			[op.NOT, ['tags', 1], op.EQ, 'tag1'], op.AND,
+			[['number'], op.EQ, random.randrange(size)]), repetitions)
+
+		print("* {size} objects: selective conjunction {selective:.3f} ms, " \
+			"with inverted condition {inverted:.3f} ms".format(size=size,
+			selective=selective_time * 1000, inverted=inverted_time * 1000))
+
+	conn.close()
+
+def benchmarkPages(db_path, sizes=None, verbosity=2):
+	"""Measure reading pages of ordered search results"""
+
+	if sizes is None:
+		sizes = [10000, 100000, 1000000]
+
+	repetitions = 10
+	page_size = 20
+	conn = brain.connect(None, 'bench.db', open_existing=0, db_path=db_path)
+
+	objects = 0
+	for size in sorted(sizes):
+
+		# fill database with objects up to the next checkpoint
+		conn.createMany([{'name': 'object ' + str(i), 'number': random.randrange(size)}
+			for i in range(objects, size)])
+		objects = size
+
+		all_time = _measure(lambda: conn.search(['number'], op.GTE, 0)[:page_size],
+			repetitions)
+		first_time = _measure(lambda: conn.search(['number'], op.GTE, 0,
+			order_by=['number'], limit=page_size), repetitions)
+
+		# the cursor is the last object of some page near the end of results
+		# (or the first object, if there are less than two pages)
+		page, cursor = conn.searchPage(['number'], op.GTE, 0, order_by=['number'],
+			offset=max(size - page_size * 2, 0), limit=1)
+		offset_time = _measure(lambda: conn.search(['number'], op.GTE, 0,
+			order_by=['number'], offset=max(size - page_size, 0), limit=page_size), repetitions)
+		cursor_time = _measure(lambda: conn.search(['number'], op.GTE, 0,
+			order_by=['number'], cursor=cursor, limit=page_size), repetitions)
+
+		print("* {size} objects: all IDs {all:.3f} ms, first page {first:.3f} ms, " \
+			"last page by offset {offset:.3f} ms, by cursor {cursor:.3f} ms".format(
+			size=size, all=all_time * 1000, first=first_time * 1000,
+			offset=offset_time * 1000, cursor=cursor_time * 1000))
+
+	conn.close()
+
+def benchmarkCount(db_path, sizes=None, verbosity=2):
+	"""Measure counting of found objects and checking whether anything is found"""
+
+	if sizes is None:
+		sizes = [10000, 100000, 1000000]
+
+	repetitions = 10
+	conn = brain.connect(None, 'bench.db', open_existing=0, db_path=db_path)
+
+	objects = 0
+	for size in sorted(sizes):
+
+		# fill database with objects up to the next checkpoint
+		conn.createMany([{'name': 'object ' + str(i), 'number': i}
+			for i in range(objects, size)])
+		objects = size
+
+		condition = (['number'], op.GTE, size // 2)
+		search_time = _measure(lambda: len(conn.search(*condition)), repetitions)
+		count_time = _measure(lambda: conn.searchCount(*condition), repetitions)
+		exists_time = _measure(lambda: conn.searchExists(*condition), repetitions)
+
+		print("* {size} objects: len(search()) {search:.3f} ms, searchCount() {count:.3f} ms, " \
+			"searchExists() {exists:.3f} ms".format(size=size, search=search_time * 1000,
+			count=count_time * 1000, exists=exists_time * 1000))
+
+	conn.close()
+
+def benchmarkSearchRead(db_path, sizes=None, verbosity=2):
+	"""Measure reading of found objects one by one and with searchRead()"""
+
+	if sizes is None:
+		sizes = [100, 1000, 10000]
+
+	repetitions = 3
+	conn = brain.connect(None, 'bench.db', open_existing=0, db_path=db_path)
+
+	objects = 0
+	for size in sorted(sizes):
+
+		# each second object is found
+		conn.createMany([{'name': 'object ' + str(i), 'number': i % 2,
+			'tags': ['tag' + str(i % 10), 'tag' + str(i % 7)]}
+			for i in range(objects, size * 2)])
+		objects = size * 2
+
+		masks = [['name'], ['tags']]
+		single_time = _measure(lambda: [conn.readByMasks(obj, masks)
+			for obj in conn.search(['number'], op.EQ, 1)], repetitions)
+		many_time = _measure(lambda: conn.searchRead(['number'], op.EQ, 1, masks=masks),
+			repetitions)
+
+		print("* {size} objects: search() and readByMasks() {single:.3f} ms, " \
+			"searchRead() {many:.3f} ms".format(size=size,
+			single=single_time * 1000, many=many_time * 1000))
+
+	conn.close()
+
+def benchmarkLambda(db_path, sizes=None, verbosity=2):
+	"""Measure filtering of objects in Python and search by the same lambda"""
+
+	if sizes is None:
+		sizes = [1000, 10000, 100000]
+
+	repetitions = 3
+	conn = brain.connect(None, 'bench.db', open_existing=0, db_path=db_path)
+
+	objects = 0
+	for size in sorted(sizes):
+
+		# fill database with objects up to the next checkpoint
+		conn.createMany([{'name': 'object ' + str(i), 'age': i % 100,
+			'tags': ['tag' + str(i % 10), 'tag' + str(i % 7)]} for i in range(objects, size)])
+		objects = size
+
+		predicate = lambda o: o['age'] > 90 and o['tags'][1] == 'tag3'
+		filter_time = _measure(lambda: [obj for obj, data in conn.iterDump()
+			if predicate(data)], repetitions)
+		search_time = _measure(lambda: conn.search(predicate), repetitions)
+
+		print("* {size} objects: filtering in Python {filter:.3f} ms, " \
+			"search() {search:.3f} ms".format(size=size,
+			filter=filter_time * 1000, search=search_time * 1000))
+
+	conn.close()
+
+def benchmarkFullText(db_path, sizes=None, verbosity=2):
+	"""Measure search for words and phrases by regexp and with full-text index"""
+
+	if sizes is None:
+		sizes = [1000, 10000, 100000]
+
+	repetitions = 10
+	words = ['word' + str(i) for i in range(1000)]
+	conn = brain.connect(None, 'bench.db', open_existing=0, db_path=db_path,
+		fulltext='all')
+
+	objects = 0
+	for size in sorted(sizes):
+
+		# fill database with objects up to the next checkpoint
+		rnd = random.Random(size)
+		conn.createMany([{'text': " ".join(rnd.choice(words) for j in range(20))}
+			for i in range(objects, size)])
+		objects = size
+
+		word = rnd.choice(words)
+		regexp_time = _measure(lambda: conn.search(['text'], op.REGEXP,
+			r'\b' + word + r'\b'), repetitions)
+		match_time = _measure(lambda: conn.search(['text'], op.MATCH, word), repetitions)
+		phrase_time = _measure(lambda: conn.search(['text'], op.MATCH,
+			'"' + word + ' ' + rnd.choice(words) + '"'), repetitions)
+
+		print("* {size} objects: word by regexp {regexp:.3f} ms, by MATCH {match:.3f} ms, " \
+			"phrase by MATCH {phrase:.3f} ms".format(size=size, regexp=regexp_time * 1000,
+			match=match_time * 1000, phrase=phrase_time * 1000))
+
+	conn.close()
+
+BENCHMARKS = {
+	'indexes': benchmarkIndexes,
+	'insertMany': benchmarkInsertMany,
+	'storage': benchmarkStorage,
+	'lists': benchmarkLists,
+	'deepModify': benchmarkDeepModify,
+	'dump': benchmarkDump,
+	'createMany': benchmarkCreateMany,
+	'readMany': benchmarkReadMany,
+	'search': benchmarkSearch,
+	'pages': benchmarkPages,
+	'count': benchmarkCount,
+	'searchRead': benchmarkSearchRead,
+	'lambda': benchmarkLambda,
+	'fulltext': benchmarkFullText
+}
+
+def runBenchmark(name, sizes=None, verbosity=2):
+	"""Run one of the benchmarks for DB file in temporary folder"""
+
+	print("Benchmark '" + name + "':")
+	db_path = tempfile.mkdtemp(prefix='braindb')
+	BENCHMARKS[name](db_path, sizes=sizes, verbosity=verbosity)
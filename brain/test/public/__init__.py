@@ -1,7 +1,9 @@
+import asyncio
+
 import brain
 
 import helpers
-from public import delete, insert, modify, read, search, connection
+from public import delete, insert, modify, read, search, connection, asynclayer
 from internal import engine
 
 
@@ -29,6 +31,32 @@ class CachedGenerator:
 		return brain.CachedConnection(conn, size_threshold=1)
 
 
+class AsyncAdapter:
+	"""Class which mimics Connection interface, using AsyncConnection"""
+
+	def __init__(self, *args, **kwds):
+		self._loop = asyncio.new_event_loop()
+		self._conn = self._loop.run_until_complete(brain.connectAsync(*args, **kwds))
+
+	def close(self):
+		self._loop.run_until_complete(self._conn.close())
+		self._loop.close()
+
+	def __getattr__(self, name):
+		method = getattr(self._conn, name)
+		return lambda *args, **kwds: self._loop.run_until_complete(method(*args, **kwds))
+
+
+class AsyncGenerator:
+	"""Class which mimics brain interface"""
+
+	def __getattr__(self, name):
+		return getattr(brain, name)
+
+	def connect(self, *args, **kwds):
+		return AsyncAdapter(*args, **kwds)
+
+
 def suite(db_path, all_engines=False, all_storages=False,
 	all_connections=False, server_address=None):
 
@@ -42,6 +70,24 @@ def suite(db_path, all_engines=False, all_storages=False,
 
 	return res
 
+def getLayoutTestParams(db_path, all_engines=False, all_storages=False):
+	"""
+	Returns engine test parameters; if all storages are requested,
+	adds parameters for alternative storage layouts, list formats and full-text index modes
+	"""
+	res = engine.getEngineTestParams(db_path, all_engines, all_storages)
+
+	if all_storages:
+		for engine_params in list(res):
+			for key, value in [('storage', 'eav'), ('lists', 'sparse'), ('fulltext', 'all')]:
+				kwds = dict(engine_params.engine_kwds)
+				kwds[key] = value
+				res.append(engine.EngineTestParams(engine_params.engine_tag,
+					engine_params.storage_tag + '.' + value, engine_params.in_memory,
+					engine_params.engine_args, kwds))
+
+	return res
+
 def getEngineTestSuites(db_path, all_engines=False, all_storages=False,
 	all_connections=False, server_address=None):
 
@@ -50,16 +96,20 @@ def getEngineTestSuites(db_path, all_engines=False, all_storages=False,
 	if all_connections:
 		connection_generators = {'local': brain,
 			'xmlrpc': XMLRPCGenerator(server_address),
-			'cached': CachedGenerator()}
+			'cached': CachedGenerator(),
+			'async': AsyncGenerator()}
 	else:
 		connection_generators = {'local': brain}
 
 	for gen in connection_generators:
-		for engine_params in engine.getEngineTestParams(db_path, all_engines, all_storages):
+		for engine_params in getLayoutTestParams(db_path, all_engines, all_storages):
 			requests_suite = helpers.NamedTestSuite(gen + '.' + engine_params.test_tag)
 			for module in [delete, insert, modify, read, search, connection]:
 				requests_suite.addTest(module.suite(engine_params,
 					connection_generators[gen]))
 			res.append(requests_suite)
 
+	for engine_params in engine.getEngineTestParams(db_path, all_engines, all_storages):
+		res.append(asynclayer.suite(engine_params))
+
 	return res
@@ -0,0 +1,108 @@
+"""Unit tests for asyncio facade"""
+
+import asyncio
+
+import brain
+import brain.op as op
+
+import helpers
+
+class AsyncConnectionTest(helpers.NamedTestCase):
+	"""Test operation of AsyncConnection"""
+
+	def run(self, result=None):
+		self.loop = asyncio.new_event_loop()
+		try:
+			return helpers.NamedTestCase.run(self, result)
+		finally:
+			self.loop.close()
+
+	def call(self, coroutine):
+		return self.loop.run_until_complete(coroutine)
+
+	def setUp(self):
+		self.conn = self.call(self.connect())
+
+	def tearDown(self):
+		self.call(self.conn.close())
+
+	def testRequests(self):
+		"""Check that transacted methods are available as coroutines"""
+		async def test():
+			obj = await self.conn.create({'name': 'Alex'})
+			await self.conn.modify(obj, ['age'], 22)
+			return obj, await self.conn.read(obj), await self.conn.search(['age'], op.EQ, 22)
+
+		obj, data, found = self.call(test())
+		self.assertEqual(data, {'name': 'Alex', 'age': 22})
+		self.assertEqual(found, [obj])
+
+	def testTransactionCommit(self):
+		"""Check that transaction context manager commits changes"""
+		async def test():
+			async with self.conn.transaction():
+				obj = await self.conn.create({'name': 'Alex'})
+				await self.conn.modify(obj, ['name'], 'Bob')
+			return await self.conn.read(obj)
+
+		self.assertEqual(self.call(test()), {'name': 'Bob'})
+
+	def testTransactionRollback(self):
+		"""Check that transaction context manager rolls back changes on exception"""
+		objs = []
+		async def test():
+			async with self.conn.transaction():
+				objs.append(await self.conn.create({'name': 'Alex'}))
+				raise ValueError("test")
+
+		self.assertRaises(ValueError, self.call, test())
+		self.assertFalse(self.call(self.conn.objectExists(objs[0])))
+
+	def testTransactionErrorInRequest(self):
+		"""Check that error in request propagates from transaction context manager"""
+		async def test():
+			async with self.conn.transaction():
+				await self.conn.read(1000)
+
+		self.assertRaises(brain.LogicError, self.call, test())
+
+		# connection is still usable
+		obj = self.call(self.conn.create({'name': 'Alex'}))
+		self.assertEqual(self.call(self.conn.read(obj)), {'name': 'Alex'})
+
+	def testSeveralConnections(self):
+		"""Check that several connections can be used simultaneously"""
+		if self.in_memory:
+			self.skipTest("In-memory database allows only one connection")
+
+		async def test():
+			conn2 = await self.connect(open_existing=1)
+			objs = await asyncio.gather(
+				self.conn.create({'name': 'Alex'}), conn2.create({'name': 'Bob'}))
+			data = await asyncio.gather(conn2.read(objs[0]), self.conn.read(objs[1]))
+			await conn2.close()
+			return data
+
+		self.assertEqual(self.call(test()), [{'name': 'Alex'}, {'name': 'Bob'}])
+
+	def testUnknownMethod(self):
+		"""Check that only connection methods are available"""
+		self.assertRaises(AttributeError, getattr, self.conn, 'someMethod')
+
+
+def getParameterizedAsyncTest(engine_params):
+
+	class Derived(AsyncConnectionTest):
+		def connect(self, **additional_kwds):
+			self.in_memory = engine_params.in_memory
+			kwds = dict(engine_params.engine_kwds)
+			kwds.update(additional_kwds)
+			return brain.connectAsync(engine_params.engine_tag,
+				*engine_params.engine_args, **kwds)
+
+	return Derived
+
+def suite(engine_params):
+	res = helpers.NamedTestSuite('async.' + engine_params.test_tag)
+	res.addTestCaseClass(getParameterizedAsyncTest(engine_params))
+	return res
@@ -1,5 +1,6 @@
 """Unit tests for database facade"""
 
+import threading
 import unittest
 
 import brain
@@ -237,6 +238,67 @@ class Connection(TestRequest):
 
 		self.assertEqual(dump_dict, reference_data)
 
+	def testIterDump(self):
+		"""Check that iterDump() returns the same data as dump()"""
+		if not hasattr(self.conn, 'iterDump'):
+			self.skipTest("Connection does not support streaming")
+
+		self.prepareStandNoList()
+		res = self.conn.dump()
+		dump_dict = {obj_id: data for obj_id, data in zip(res[::2], res[1::2])}
+
+		self.assertEqual(dict(self.conn.iterDump()), dump_dict)
+
+	def testDumpComplexObjects(self):
+		"""Check that dump() returns the same data as read() for objects with nested lists"""
+		obj1 = self.conn.create({'tracks': [{'name': 'Track 1', 'tags': ['a', 'b']},
+			{'name': 'Track 2', 'length': 1.5, 'tags': [1, None, ['c']]}]})
+		obj2 = self.conn.create([[1, 2], 'text', {'key': b'bytes'}])
+		obj3 = self.conn.create({'ref': obj1})
+
+		# change list structure after creation, so that list keys are not contiguous
+		# for sparse lists
+		self.conn.insert(obj1, ['tracks', 0], {'name': 'Track 0'})
+		self.conn.delete(obj1, ['tracks', 1, 'tags', 0])
+		self.conn.insert(obj2, [0, 1], 10)
+
+		res = self.conn.dump()
+		dump_dict = {obj_id: data for obj_id, data in zip(res[::2], res[1::2])}
+		self.assertEqual(dump_dict, {obj: self.conn.read(obj) for obj in [obj1, obj2, obj3]})
+
+	def testCreateMany(self):
+		"""Check that createMany() creates objects, which can be used as usual"""
+		data_list = [{'name': 'Alex', 'tracks': ['Track 1', {'length': 300}]},
+			['text', 1, 1.5, None, b'bytes', {}, []],
+			{'name': 'Bob', 'tracks': []}]
+		ids = self.conn.createMany(data_list)
+
+		self.assertEqual(len(set(ids)), len(data_list))
+		self.assertEqual([self.conn.read(obj) for obj in ids], data_list)
+		self.assertEqual(self.conn.search(['name'], op.EQ, 'Bob'), [ids[2]])
+
+		# created objects should be modifiable as usual
+		self.conn.insert(ids[0], ['tracks', 0], 'Track 0')
+		self.conn.delete(ids[1], [0])
+		self.assertEqual(self.conn.read(ids[0]),
+			{'name': 'Alex', 'tracks': ['Track 0', 'Track 1', {'length': 300}]})
+		self.assertEqual(self.conn.read(ids[1]), [1, 1.5, None, b'bytes', {}, []])
+
+		# new IDs should not coincide with IDs of created objects
+		self.assertFalse(self.conn.create({'name': 'Carl'}) in ids)
+
+	def testCreateManyInAsyncTransaction(self):
+		"""Check that createMany() returns list of IDs after asynchronous transaction"""
+		data_list = [{'name': 'Alex'}, {'name': 'Bob'}]
+
+		self.conn.beginAsync()
+		self.conn.createMany(data_list)
+		self.conn.createMany([])
+		ids, empty = self.conn.commit()
+
+		self.assertEqual([self.conn.read(obj) for obj in ids], data_list)
+		self.assertEqual(empty, [])
+
 	def testReferences(self):
 		"""Check that object IDs can be saved in database"""
 		obj = self.conn.create({'test': 'val'})
@@ -266,6 +328,144 @@ class Connection(TestRequest):
 
 		self.assertEqual(res, data)
 
+	def testSecondConnectionIds(self):
+		"""Check that two connections to DB do not create objects with the same IDs"""
+
+		# this test makes no sense for in-memory databases - they allow only one connection
+		if self.in_memory: return
+
+		conn2 = self.reconnect()
+		ids = []
+		for i in range(3):
+			ids.append(self.conn.create({'name': 'Alex'}))
+			ids.append(conn2.create({'name': 'Bob'}))
+		conn2.close()
+
+		self.assertEqual(len(set(ids)), len(ids))
+
+	def testReadDuringWriteInSecondConnection(self):
+		"""Check that requests, which only read, do not wait for transaction of other connection"""
+
+		# this test makes no sense for in-memory databases - they allow only one connection
+		if self.in_memory: return
+
+		obj = self.conn.create({'name': 'Alex'})
+
+		conn2 = self.reconnect()
+		conn2.beginSync()
+		conn2.modify(obj, ['name'], 'Bob')
+		try:
+			res = self.conn.read(obj)
+			found = self.conn.search(['name'], op.EQ, 'Alex')
+		finally:
+			conn2.rollback()
+			conn2.close()
+
+		self.assertEqual(res, {'name': 'Alex'})
+		self.assertEqual(found, [obj])
+
+	def testReadsFromOtherThreadDuringTransaction(self):
+		"""
+		Check that read-only requests from other threads are not included
+		in transaction, which was started by this thread
+		"""
+		engine = getattr(self.conn, '_engine', None)
+		if engine is None or not engine.supportsConcurrentReads():
+			self.skipTest("Connection does not support concurrent reads")
+
+		obj = self.conn.create({'name': 'Alex'})
+
+		results = []
+		def reader():
+			results.append((self.conn.read(obj), self.conn.search(['name'], op.EQ, 'Alex')))
+
+		for begin, name in [(self.conn.beginSync, 'Bob'), (self.conn.beginAsync, 'Carl')]:
+			begin()
+			self.conn.modify(obj, ['name'], name)
+			thread = threading.Thread(target=reader)
+			thread.start()
+			thread.join()
+			self.conn.commit()
+
+		self.assertEqual(results, [({'name': 'Alex'}, [obj]), ({'name': 'Bob'}, [])])
+		self.assertEqual(self.conn.read(obj), {'name': 'Carl'})
+
+	def testStorageLayout(self):
+		"""Check that database remembers its storage layout"""
+
+		# this test makes no sense for in-memory databases - they allow only one connection
+		if self.in_memory: return
+
+		layout = self._connection_kwds.get('storage', 'tables')
+		other_layout = 'eav' if layout == 'tables' else 'tables'
+
+		data = {'name': 'Alex', 'tracks': [{'length': 300}]}
+		obj = self.conn.create(data)
+
+		self.assertRaises(brain.StructureError, self.reconnect, storage=other_layout)
+
+		# layout of existing database is used by default
+		conn2 = self.reconnect(storage=None)
+		res = conn2.read(obj)
+		conn2.close()
+
+		self.assertEqual(res, data)
+
+	def testWrongStorageLayout(self):
+		"""Check that error is thrown if wrong storage layout is provided"""
+		self.assertRaises(brain.FacadeError, brain.connect, None, None, storage='wrong')
+
+	def testListFormat(self):
+		"""Check that database remembers its list format"""
+
+		# this test makes no sense for in-memory databases - they allow only one connection
+		if self.in_memory: return
+
+		lists = self._connection_kwds.get('lists', 'dense')
+		other_lists = 'sparse' if lists == 'dense' else 'dense'
+
+		data = {'name': 'Alex', 'tracks': [{'length': 300}, {'length': 400}]}
+		obj = self.conn.create(data)
+
+		self.assertRaises(brain.StructureError, self.reconnect, lists=other_lists)
+
+		# list format of existing database is used by default
+		conn2 = self.reconnect(lists=None)
+		res = conn2.read(obj)
+		conn2.close()
+
+		self.assertEqual(res, data)
+
+	def testWrongListFormat(self):
+		"""Check that error is thrown if wrong list format is provided"""
+		self.assertRaises(brain.FacadeError, brain.connect, None, None, lists='wrong')
+
+	def testFullTextMode(self):
+		"""Check that database remembers its full-text index mode"""
+
+		# this test makes no sense for in-memory databases - they allow only one connection
+		if self.in_memory: return
+
+		fulltext = self._connection_kwds.get('fulltext', 'none')
+		other_fulltext = 'all' if fulltext == 'none' else 'none'
+
+		obj = self.conn.create({'name': 'Alex Smith'})
+
+		self.assertRaises(brain.StructureError, self.reconnect, fulltext=other_fulltext)
+
+		# mode of existing database is used by default
+		conn2 = self.reconnect(fulltext=None)
+		if fulltext == 'all':
+			res = conn2.search(['name'], op.MATCH, 'smith')
+			self.assertEqual(res, [obj])
+		else:
+			self.assertRaises(brain.StructureError, conn2.search, ['name'], op.MATCH, 'smith')
+		conn2.close()
+
+	def testWrongFullTextMode(self):
+		"""Check that error is thrown if wrong full-text index mode is provided"""
+		self.assertRaises(brain.FacadeError, brain.connect, None, None, fulltext='wrong')
+
 	def testWrongEngineTag(self):
 		"""Check that error is thrown if wrong engine tag is provided"""
 		self.assertRaises(brain.FacadeError, brain.connect, 'wrong_tag')
@@ -297,6 +497,51 @@ class Connection(TestRequest):
 			self.conn.delete(self.id2)
 			self.conn.delete(self.id3)
 
+	def testRepairInChunks(self):
+		"""Check that repair can be performed in several transactions"""
+		self.prepareStandDifferentTypes()
+		data_before = self.conn.dump()
+
+		results = []
+		while len(results) == 0 or results[-1][0] < results[-1][1]:
+			results.append(self.conn.repair(max_tables=2))
+
+		# each call processes given number of tables
+		self.assertTrue(len(results) > 1)
+		for i, (processed, total) in enumerate(results[:-1]):
+			self.assertEqual(processed, (i + 1) * 2)
+
+		self.assertEqual(self.conn.dump(), data_before)
+		self.assertEqual(self.conn.search(['name'], op.EQ, 'Album 1'), [self.id1])
+
+	def testModificationDuringRepair(self):
+		"""Check that objects can be changed between transactions of unfinished repair"""
+		self.prepareStandDifferentTypes()
+
+		processed, total = self.conn.repair(max_tables=1)
+		self.assertTrue(processed < total)
+
+		# change fields in tables, which were processed already and which were not
+		self.conn.modify(self.id1, ['name'], 'Album 4')
+		self.conn.modify(self.id1, ['tracks', 0, 'length'], 'long')
+		self.conn.delete(self.id2)
+		data_before = self.conn.dump()
+
+		while processed < total:
+			processed, total = self.conn.repair(max_tables=1)
+
+		self.assertEqual(self.conn.dump(), data_before)
+		self.assertEqual(self.conn.search(['name'], op.EQ, 'Album 4'), [self.id1])
+
+		# refcounts should be correct after repair
+		self.conn.delete(self.id1, ['tracks'])
+		self.assertRaises(brain.LogicError, self.conn.read, self.id1, ['tracks'])
+		self.assertEqual(self.conn.read(self.id1, ['name']), 'Album 4')
+
+	def testRepairWrongMaxTables(self):
+		"""Check that maximum number of tables for repair must be a positive integer"""
+		self.assertRaises(brain.FormatError, self.conn.repair, max_tables=0)
+
 	def testNoneAsEngineTag(self):
 		"""
 		Check that specifying None as engine tag works
@@ -372,6 +617,35 @@ class Connection(TestRequest):
 
 		self.assertEqual(res, '2222')
 
+	def testCacheUpdateOnReadMany(self):
+		"""
+		Coverage test, which checks that objects are stored in cache during
+		readMany() in case of cache miss.
+		"""
+		# this test makes no sense for in-memory databases - their data is not persistent
+		if self.in_memory: return
+
+		self.prepareStandNoList()
+
+		self.conn.close()
+		self.conn = self.reconnect()
+
+		self.conn.beginSync()
+		self.conn.read(self.id1)
+		res = self.conn.readMany([self.id1, self.id2, self.id2], ['phone'])
+		self.conn.commit()
+		self.assertEqual(res, ['1111', '2222', '2222'])
+
+		self.conn.beginAsync()
+		self.conn.read(self.id2)
+		self.conn.readMany([self.id2, self.id3, self.id4], ['name'])
+		self.conn.modify(self.id3, ['name'], 'Zed')
+		self.conn.readMany([self.id3, self.id5])
+		res = self.conn.commit()
+		self.assertEqual(res[1], ['Bob', 'Carl', 'Don'])
+		self.assertEqual(res[3], [{'name': 'Zed', 'phone': '3333', 'age': '27'},
+			{'name': 'Alex', 'phone': '1111', 'age': '22'}])
+
 	def testChangeDefaultRemoveConflictsValue(self):
 		"""Check that default remove_conflicts value can be changed for connection"""
 
@@ -279,6 +279,44 @@ class Insert(TestRequest):
 		self.assertEqual(self.conn.read(obj, [0]), None)
 		self.assertEqual(self.conn.read(obj, [1, 0]), None)
 
+	def testManyElements(self):
+		"""
+		Regression test for insertion of many elements at once:
+		values were inserted with one query, which exceeded engine limits
+		"""
+		values = list(range(2000))
+		obj = self.conn.create({'key': [-1]})
+		self.conn.insertMany(obj, ['key', None], values)
+		self.assertEqual(self.conn.read(obj), {'key': [-1] + values})
+
+	def testRepeatedInsertionToTheSamePlace(self):
+		"""
+		Check that repeated insertion to the same place in the list works
+		(in sparse lists, it exhausts space between neighbouring elements)
+		"""
+		obj = self.conn.create({'key': [0, {'nested': [1]}]})
+		for i in range(40):
+			self.conn.insert(obj, ['key', 1], i + 1)
+
+		self.assertEqual(self.conn.read(obj),
+			{'key': [0] + list(reversed(range(1, 41))) + [{'nested': [1]}]})
+		self.assertEqual(self.conn.read(obj, ['key', 41, 'nested', 0]), 1)
+
+
+	def testRepeatedInsertionToTheMiddle(self):
+		"""
+		Check that repeated insertion to places in the middle of the list works
+		(in sparse lists, it makes elements around these places to be moved)
+		"""
+		data = [{'nested': [i]} for i in range(20)]
+		obj = self.conn.create({'key': data})
+		for i in range(60):
+			position = 10 + i % 3
+			self.conn.insert(obj, ['key', position], i)
+			data.insert(position, i)
+
+		self.assertEqual(self.conn.read(obj), {'key': data})
+		self.assertEqual(self.conn.read(obj, ['key', 79, 'nested', 0]), 19)
 
 def suite(engine_params, connection_generator):
 	res = helpers.NamedTestSuite('insert')
@@ -255,6 +255,26 @@ class Modify(TestRequest):
 		data['key'][0] = to_add
 		self.assertEqual(res, data)
 
+	def testDeepConflictWithSeveralTypes(self):
+		"""
+		Check that conflict is found deep in the hierarchy,
+		when ancestors store values of several types
+		"""
+		data = {'key': [1, 'a', {'key': [None, 2.5, {'key': 'b'}]}]}
+		obj = self.conn.create(data)
+
+		# no conflicts, new field is added to existing map
+		self.conn.modify(obj, ['key', 2, 'key', 2, 'new'], 1)
+		data['key'][2]['key'][2]['new'] = 1
+		self.assertEqual(self.conn.read(obj), data)
+
+		# conflict with value in the middle of the hierarchy
+		self.assertRaises(brain.StructureError, self.conn.modify,
+			obj, ['key', 2, 'key', 1, 'key'], 2)
+		self.conn.modify(obj, ['key', 2, 'key', 1, 'key'], 2, remove_conflicts=True)
+		data['key'][2]['key'][1] = {'key': 2}
+		self.assertEqual(self.conn.read(obj), data)
+
 	def testRefcountForNullValue(self):
 		"""
 		Regression test for bug in refcounter logic, when refcounter for NULL values
@@ -350,6 +370,14 @@ class Modify(TestRequest):
 		res = self.conn.read(obj, [0, 0])
 		self.assertEqual(res, None)
 
+	def testLongList(self):
+		"""Check that list with many elements can be stored at once"""
+		data = {'key': list(range(2000))}
+		obj = self.conn.create(data)
+		self.conn.modify(obj, ['key2'], [str(x) for x in range(2000)])
+		data['key2'] = [str(x) for x in range(2000)]
+		self.assertEqual(self.conn.read(obj), data)
+
 
 def suite(engine_params, connection_generator):
 	res = helpers.NamedTestSuite('modify')
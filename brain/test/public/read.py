@@ -146,6 +146,73 @@ class Read(TestRequest):
 		res = self.conn.read(obj, ['tracks'], [[None, 'length']])
 		self.assertEqual(res, [{'length': 240}, {'length': 300}])
 
+	def testMasksWithPatternSymbols(self):
+		"""Check that symbols, special for SQL patterns, are matched literally in masks"""
+		obj = self.conn.create({'a': {'b': 1}, 'a*': 2, 'a?': 3, 'a[': 4,
+			'a%': 5, 'a_': 6, 'a.b': 7})
+
+		self.assertEqual(self.conn.readByMask(obj, ['a']), {'a': {'b': 1}})
+		for key in ['a*', 'a?', 'a[', 'a%', 'a_', 'a.b']:
+			res = self.conn.readByMask(obj, [key])
+			self.assertEqual(list(res.keys()), [key])
+
+	def testReadMany(self):
+		"""Check that readMany() returns the same data as read() for each object"""
+		self.prepareStandDifferentTypes()
+		ids = [self.id1, self.id2, self.id3]
+		self.conn.insert(self.id1, ['tracks', 0], {'name': 'Track 0 name'})
+		self.conn.delete(self.id2, ['tracks', 0, 'authors', 1])
+
+		res = self.conn.readMany(ids)
+		self.assertEqual(res, [self.conn.read(obj) for obj in ids])
+
+	def testReadManyPathAndMasks(self):
+		"""Check that path and masks arguments of readMany() are applied to each object"""
+		self.prepareStandNestedList()
+
+		res = self.conn.readMany([self.id1, self.id2], ['tracks', 1])
+		self.assertEqual(res, [{'name': 'Track 2 name', 'authors': ['Carl I']},
+			{'name': 'Track 2 name', 'authors': ['Alex']}])
+
+		res = self.conn.readMany([self.id2, self.id1], ['tracks'], [[None, 'authors', 0]])
+		self.assertEqual(res, [[{'authors': ['Carl II']}, {'authors': ['Alex']},
+			{'authors': ['Rob']}], [{'authors': ['Alex']}, {'authors': ['Carl I']}]])
+
+	def testReadManyRepeatedObjects(self):
+		"""Check that object can be requested several times in readMany()"""
+		self.prepareStandNoList()
+		res = self.conn.readMany([self.id1, self.id2, self.id1])
+		self.assertEqual(res, [{'name': 'Alex', 'phone': '1111'},
+			{'name': 'Bob', 'phone': '2222'}, {'name': 'Alex', 'phone': '1111'}])
+
+		# results should not share data
+		res[0]['name'] = 'Zed'
+		self.assertEqual(res[2]['name'], 'Alex')
+
+	def testReadManyNoObjects(self):
+		"""Check that readMany() for empty list of objects returns empty list"""
+		self.prepareStandNoList()
+		self.assertEqual(self.conn.readMany([]), [])
+
+	def testReadManyNonExistingObject(self):
+		"""Check that readMany() raises LogicError if one of objects does not exist"""
+		self.prepareStandNoList()
+		self.conn.delete(self.id2)
+		self.assertRaises(brain.LogicError, self.conn.readMany, [self.id1, self.id2])
+
+	def testReadManyNonExistentListElement(self):
+		"""Check that readMany() raises LogicError if one of objects does not have given path"""
+		obj1 = self.conn.create([1, [2, 3, 4]])
+		obj2 = self.conn.create([1, 2])
+		self.assertEqual(self.conn.readMany([obj1], [1, 2]), [4])
+		self.assertRaises(brain.LogicError, self.conn.readMany, [obj1, obj2], [1, 2])
+
+	def testManyFields(self):
+		"""Check that object with more fields than subqueries in one compound query can be read"""
+		data = {'field' + str(i): str(i) for i in range(600)}
+		obj = self.conn.create(data)
+		self.assertEqual(self.conn.read(obj), data)
+
 
 def suite(engine_params, connection_generator):
 	res = helpers.NamedTestSuite('read')
@@ -1,5 +1,6 @@
 """Unit tests for database layer search request"""
 
+import re
 import unittest
 
 import brain
@@ -393,6 +394,481 @@ class Search(TestRequest):
 		self.assertRaises(brain.FormatError, self.conn.search,
 			op.NOT, [op.NOT, ['name'], op.EQ, 'Alex'], op.OR, ['name'])
 
+	def testIterSearch(self):
+		"""Check that iterSearch() returns the same objects as search()"""
+		if not hasattr(self.conn, 'iterSearch'):
+			self.skipTest("Connection does not support streaming")
+
+		self.prepareStandNoList()
+		res = self.conn.iterSearch(['phone'], op.EQ, '1111')
+		self.assertFalse(isinstance(res, list))
+		self.assertCountEqual(list(res), [self.id1, self.id5])
+
+	def testIterSearchWithModification(self):
+		"""Check that objects can be modified while iterating over search results"""
+		if not hasattr(self.conn, 'iterSearch'):
+			self.skipTest("Connection does not support streaming")
+
+		self.prepareStandNoList()
+		self.conn.beginSync()
+		for obj in self.conn.iterSearch(['phone'], op.EQ, '1111'):
+			self.conn.modify(obj, ['age'], '30')
+		self.conn.commit()
+
+		res = self.conn.search(['age'], op.EQ, '30')
+		self.assertCountEqual(res, [self.id1, self.id5])
+
+	def testIterSearchInAsyncTransaction(self):
+		"""Check that iterSearch() cannot be used in asynchronous transaction"""
+		if not hasattr(self.conn, 'iterSearch'):
+			self.skipTest("Connection does not support streaming")
+
+		self.conn.beginAsync()
+		self.assertRaises(brain.FacadeError, self.conn.iterSearch, ['phone'], op.EQ, '1111')
+		self.conn.rollback()
+
+	def testIterSearchWrongCondition(self):
+		"""Check that condition format errors are raised by iterSearch() call itself"""
+		if not hasattr(self.conn, 'iterSearch'):
+			self.skipTest("Connection does not support streaming")
+
+		self.assertRaises(brain.FormatError, self.conn.iterSearch, ['age'], op.EQ)
+
+	def testConjunctionWithDifferentSelectivity(self):
+		"""Check that operands of conjunction give correct results in any order"""
+		ids = self.conn.createMany([{'name': 'object ' + str(i), 'number': i,
+			'tags': ['tag' + str(i % 3), 'tag' + str(i % 2)]} for i in range(30)])
+		self.conn.create({'name': 'object without number'})
+
+		res = self.conn.search([[['number'], op.GTE, 0], op.AND, [['tags', 1], op.EQ, 'tag1']],
+			op.AND, [['name'], op.REGEXP, 'object 1.$'])
+		self.assertCountEqual(res, [ids[i] for i in [11, 13, 15, 17, 19]])
+
+		res = self.conn.search([op.NOT, ['number'], op.GT, 3],
+			op.AND, [op.NOT, ['tags', 0], op.EQ, 'tag0'])
+		self.assertCountEqual(res, [ids[1], ids[2], self.conn.search(['name'],
+			op.EQ, 'object without number')[0]])
+
+		res = self.conn.search([['number'], op.LT, 10], op.AND,
+			[[['tags', 0], op.EQ, 'tag0'], op.OR, [['tags', 1], op.EQ, 'tag0']])
+		self.assertCountEqual(res, [ids[i] for i in [0, 2, 3, 4, 6, 8, 9]])
+
+	def testExplainSearch(self):
+		"""Check that explainSearch() describes the order, in which operands are checked"""
+		if not hasattr(self.conn, 'explainSearch'):
+			self.skipTest("Connection does not support search planning")
+
+		self.conn.createMany([{'name': 'object ' + str(i), 'number': i} for i in range(30)])
+
+		plan = self.conn.explainSearch([['number'], op.GTE, 0],
+			op.AND, [['name'], op.EQ, 'object 5'])
+		lines = plan.split("\n")
+		self.assertEqual(len(lines), 3)
+		self.assertTrue(lines[0].startswith("INTERSECT"))
+		self.assertTrue(lines[1].startswith("  SEARCH ['name'] == 'object 5'"))
+		self.assertTrue(lines[2].startswith("  EXISTS ['number'] >= 0"))
+
+		# condition for the field without values cannot be true
+		plan = self.conn.explainSearch([['number'], op.GTE, 0],
+			op.AND, [['weight'], op.EQ, 1])
+		self.assertTrue(plan.split("\n")[0].endswith("(~0 records)"))
+
+	def testOrderBy(self):
+		"""Check that objects are ordered by values of given field"""
+		data = [{'name': 'b'}, {'name': 3}, {'name': 1.5}, {'number': 1}, {'name': 'a'},
+			{'name': b'a'}, {'name': None}, {'name': 1}, {'name': 'a'}]
+		ids = self.conn.createMany(data)
+
+		# values of different types are ordered in the same way as in SQLite,
+		# objects with equal values are ordered by ID, objects without the field go last
+		expected = [ids[i] for i in [6, 7, 2, 1, 4, 8, 0, 5, 3]]
+		self.assertEqual(self.conn.search(order_by=['name']), expected)
+		self.assertEqual(self.conn.search(order_by=['name'], descending=True),
+			list(reversed(expected)))
+
+		self.assertEqual(self.conn.search([['name'], op.EQ, 'a'], op.OR,
+			[['name'], op.LT, 2], order_by=['name']), [ids[i] for i in [7, 4, 8]])
+
+	def testOrderByListElement(self):
+		"""Check that objects can be ordered by values of list elements"""
+		ids = self.conn.createMany([{'tracks': [{'length': 3}, {'length': 2}]},
+			{'tracks': [{'length': 1}, {'length': 4}]}, {'tracks': [{'length': 5}]}])
+
+		self.assertEqual(self.conn.search(order_by=['tracks', 0, 'length']),
+			[ids[1], ids[0], ids[2]])
+		self.assertEqual(self.conn.search(order_by=['tracks', 1, 'length']),
+			[ids[0], ids[1], ids[2]])
+
+	def testOrderByMissingField(self):
+		"""Check that ordering by field, which was never written, orders objects by IDs"""
+		ids = self.conn.createMany([{'number': 2}, {'number': 1}, {'number': 3}])
+
+		self.assertEqual(self.conn.search(order_by=['name']), ids)
+		self.assertEqual(self.conn.search(order_by=['name'], descending=True,
+			limit=2), [ids[2], ids[1]])
+		page, cursor = self.conn.searchPage(order_by=['name'], limit=1)
+		self.assertEqual(self.conn.search(order_by=['name'], cursor=cursor), ids[1:])
+
+	def testLimitAndOffset(self):
+		"""Check that the part of ordered results can be returned"""
+		ids = self.conn.createMany([{'number': i % 4} for i in range(10)])
+		ordered = sorted(ids, key=lambda id: (ids.index(id) % 4, id))
+
+		self.assertEqual(self.conn.search(order_by=['number'], limit=3), ordered[:3])
+		self.assertEqual(self.conn.search(order_by=['number'], offset=8), ordered[8:])
+		self.assertEqual(self.conn.search(order_by=['number'], offset=3, limit=4),
+			ordered[3:7])
+		self.assertEqual(self.conn.search(order_by=['number'], limit=0), [])
+
+		# without ordering field objects are ordered by IDs
+		self.assertEqual(self.conn.search([['number'], op.EQ, 1], limit=2), ids[1:6:4])
+
+	def testCursor(self):
+		"""Check that pages, which start after given object, cover all results"""
+		ids = self.conn.createMany([{'number': i % 3} for i in range(10)] +
+			[{'number': str(i)} for i in range(3)] + [{'name': 'object'}])
+
+		for descending in (False, True):
+			for order_by in (['number'], ['name'], ['missing'], None):
+				expected = self.conn.search(order_by=order_by, descending=descending)
+				page, cursor = self.conn.searchPage(order_by=order_by, descending=descending,
+					limit=4)
+				res = list(page)
+				while len(page) > 0:
+					page, cursor = self.conn.searchPage(order_by=order_by,
+						descending=descending, limit=4, cursor=cursor)
+					res += page
+				self.assertEqual(res, expected)
+
+		# search() continues from the same cursor
+		page, cursor = self.conn.searchPage(order_by=['number'], limit=5)
+		self.assertEqual(page, [ids[0], ids[3], ids[6], ids[9], ids[1]])
+		self.assertEqual(self.conn.search(order_by=['number'], cursor=cursor, limit=3),
+			[ids[4], ids[7], ids[2]])
+
+		# object can be modified between requests of pages
+		self.conn.modify(ids[7], ['number'], 5)
+		self.assertEqual(self.conn.search(order_by=['number'], cursor=cursor, limit=3),
+			[ids[4], ids[2], ids[5]])
+
+	def testCursorOfDeletedObject(self):
+		"""Check that paging continues after the last object of the page was deleted"""
+		ids = self.conn.createMany([{'number': i % 3} for i in range(10)] +
+			[{'name': 'object'}])
+
+		for order_by in (['number'], None):
+			expected = self.conn.search(order_by=order_by)
+			page, cursor = self.conn.searchPage(order_by=order_by, limit=3)
+			res = list(page)
+			while len(page) > 0:
+				self.conn.delete(page[-1])
+				page, cursor = self.conn.searchPage(order_by=order_by, limit=3, cursor=cursor)
+				res += page
+			self.assertEqual(res, expected)
+
+	def testSearchPageWithoutResults(self):
+		"""Check that searchPage() returns given cursor if nothing is found"""
+		self.conn.create({'number': 1})
+		self.assertEqual(self.conn.searchPage(['number'], op.EQ, 2, order_by=['number']),
+			[[], None])
+
+		page, cursor = self.conn.searchPage(order_by=['number'])
+		self.assertEqual(self.conn.searchPage(order_by=['number'], cursor=cursor),
+			[[], cursor])
+
+	def testIterSearchWithLimit(self):
+		"""Check that iterSearch() supports ordering and limit"""
+		if not hasattr(self.conn, 'iterSearch'):
+			self.skipTest("Connection does not support streaming")
+
+		ids = self.conn.createMany([{'number': 5 - i} for i in range(5)])
+		self.assertEqual(list(self.conn.iterSearch(order_by=['number'], limit=2)),
+			[ids[4], ids[3]])
+
+	def testWrongPagingParameters(self):
+		"""Check that wrong ordering and paging parameters are rejected"""
+		self.prepareStandNoList()
+		self.assertRaises(brain.FormatError, self.conn.search, limit=-1)
+		self.assertRaises(brain.FormatError, self.conn.search, offset='1')
+		self.assertRaises(brain.FormatError, self.conn.search, limit=True)
+		self.assertRaises(brain.FormatError, self.conn.search, cursor=[1, 2])
+		self.assertRaises(brain.FormatError, self.conn.search, order_by=['name'], cursor=[1])
+		self.assertRaises(brain.FormatError, self.conn.search, order_by=['name'],
+			cursor=['a', 'b', 1])
+		self.assertRaises(brain.FormatError, self.conn.search, offset=False)
+		self.assertRaises(brain.FormatError, self.conn.search, order_by=['tracks', None])
+		self.assertRaises(brain.FormatError, self.conn.search, order_by=['name'],
+			cursor=self.id1)
+
+	def testSearchCount(self):
+		"""Check that searchCount() returns the number of found objects"""
+		self.prepareStandNoList()
+		for condition in [
+				(),
+				(['phone'], op.EQ, '1111'),
+				(op.NOT, ['phone'], op.EQ, '1111'),
+				([['phone'], op.EQ, '1111'], op.OR, [['age'], op.EQ, '22']),
+				(['name'], op.EQ, 'Nobody'),
+				(['weight'], op.EQ, 60),
+				(op.NOT, ['weight'], op.EQ, 60)]:
+			self.assertEqual(self.conn.searchCount(*condition),
+				len(self.conn.search(*condition)))
+
+	def testSearchExists(self):
+		"""Check that searchExists() checks whether anything can be found"""
+		self.prepareStandNoList()
+		self.assertTrue(self.conn.searchExists())
+		self.assertTrue(self.conn.searchExists(['phone'], op.EQ, '1111'))
+		self.assertTrue(self.conn.searchExists(op.NOT, ['weight'], op.EQ, 60))
+		self.assertFalse(self.conn.searchExists(['name'], op.EQ, 'Nobody'))
+		self.assertFalse(self.conn.searchExists(['weight'], op.EQ, 60))
+
+	def testSearchCountInAsyncTransaction(self):
+		"""Check that searchCount() and searchExists() see changes of asynchronous transaction"""
+		self.prepareStandNoList()
+		self.conn.beginAsync()
+		self.conn.create({'phone': '1111'})
+		self.conn.searchCount(['phone'], op.EQ, '1111')
+		self.conn.delete(self.id2)
+		self.conn.searchExists(['name'], op.EQ, 'Bob')
+		results = self.conn.commit()
+		self.assertEqual(results[1:4:2], [3, False])
+
+	def testSearchCountWrongCondition(self):
+		"""Check that searchCount() and searchExists() reject wrong conditions"""
+		self.assertRaises(brain.FormatError, self.conn.searchCount, ['age'], op.EQ)
+		self.assertRaises(brain.FormatError, self.conn.searchExists, ['age'], op.EQ)
+
+	def testSearchRead(self):
+		"""Check that searchRead() returns found objects with their contents"""
+		self.prepareStandNoList()
+		res = self.conn.searchRead(['phone'], op.EQ, '1111')
+		self.assertEqual(len(res), 4)
+		self.assertCountEqual(res[0::2], [self.id1, self.id5])
+		for obj, data in zip(res[0::2], res[1::2]):
+			self.assertEqual(data, self.conn.read(obj))
+
+		self.assertEqual(self.conn.searchRead(['name'], op.EQ, 'Nobody'), [])
+
+	def testSearchReadWithMasks(self):
+		"""Check that searchRead() reads only fields matching masks"""
+		self.prepareStandNoList()
+		res = self.conn.searchRead(['name'], op.EQ, 'Alex', masks=[['age'], ['phone']],
+			order_by=['age'])
+
+		# object without fields matching masks has None instead of data
+		self.assertEqual(res, [self.id5, {'phone': '1111', 'age': '22'},
+			self.id1, {'phone': '1111'}])
+		self.assertEqual(self.conn.searchRead(['name'], op.EQ, 'Alex', masks=[['age']],
+			order_by=['age']), [self.id5, {'age': '22'}, self.id1, None])
+
+	def testSearchReadListElements(self):
+		"""Check that searchRead() reads list elements matching masks"""
+		self.prepareStandSimpleList()
+		res = self.conn.searchRead(masks=[['tracks', 1]], order_by=['tracks', 1])
+		self.assertEqual(res[1::2], [self.conn.readByMask(obj, ['tracks', 1])
+			for obj in res[0::2]])
+
+	def testSearchReadWithLimit(self):
+		"""Check that searchRead() supports ordering and paging"""
+		ids = self.conn.createMany([{'name': 'object ' + str(i), 'number': 5 - i}
+			for i in range(5)])
+		res = self.conn.searchRead(['number'], op.LT, 5, order_by=['number'], limit=2,
+			masks=[['name']])
+		self.assertEqual(res, [ids[4], {'name': 'object 4'}, ids[3], {'name': 'object 3'}])
+
+	def testSearchReadInAsyncTransaction(self):
+		"""Check that searchRead() sees changes of asynchronous transaction"""
+		self.prepareStandNoList()
+		self.conn.beginAsync()
+		self.conn.modify(self.id2, ['phone'], '1111')
+		self.conn.searchRead(['phone'], op.EQ, '1111', masks=[['name']], order_by=['name'])
+		results = self.conn.commit()
+		self.assertEqual(results[1], [self.id1, {'name': 'Alex'}, self.id5, {'name': 'Alex'},
+			self.id2, {'name': 'Bob'}])
+
+	def testLambdaCondition(self):
+		"""Check that lambdas give the same results as equivalent conditions"""
+		self.prepareStandNoList()
+		pairs = [
+			(lambda o: o['phone'] == '1111', (['phone'], op.EQ, '1111')),
+			(lambda o: '1111' == o['phone'], (['phone'], op.EQ, '1111')),
+			(lambda o: o['age'] > '21' and o['phone'] < '4444',
+				([['age'], op.GT, '21'], op.AND, [['phone'], op.LT, '4444'])),
+			(lambda o: o['name'] == 'Bob' or not o['age'] >= '22',
+				([['name'], op.EQ, 'Bob'], op.OR, [op.NOT, ['age'], op.GTE, '22'])),
+			(lambda o: '20' <= o['age'] < '27',
+				([['age'], op.GTE, '20'], op.AND, [['age'], op.LT, '27'])),
+			(lambda o: o['name'] != 'Alex', (op.NOT, ['name'], op.EQ, 'Alex')),
+			(lambda o: o['name'] in ('Bob', 'Don'),
+				([['name'], op.EQ, 'Bob'], op.OR, [['name'], op.EQ, 'Don'])),
+			(lambda o: o['name'] not in ['Bob', 'Don'],
+				(op.NOT, [[['name'], op.EQ, 'Bob'], op.OR, [['name'], op.EQ, 'Don']])),
+			(lambda o: re.search('^[AB]', o['name']), (['name'], op.REGEXP, '^[AB]')),
+			(lambda o: True, ())]
+
+		for func, condition in pairs:
+			self.assertCountEqual(self.conn.search(func), self.conn.search(*condition))
+
+	def testLambdaWithListElements(self):
+		"""Check that lambdas can refer to list elements"""
+		self.prepareStandSimpleList()
+		self.assertCountEqual(self.conn.search(lambda o: o['tracks'][None] == 'Track 3'),
+			[self.id1])
+		self.assertCountEqual(self.conn.search(lambda o: o['tracks'][0] == 'Track 2'),
+			[self.id2])
+
+	def testLambdaWithVariables(self):
+		"""Check that values in lambda can refer to its closure and globals"""
+		self.prepareStandNoList()
+		names = {'first': 'Alex'}
+		key = 'phone'
+		res = self.conn.search(lambda o: o['name'] == names['first'] and o[key] == PHONE)
+		self.assertCountEqual(res, [self.id1, self.id5])
+
+	def testLambdasInOneLine(self):
+		"""Check that several lambdas in one line are distinguished"""
+		self.prepareStandNoList()
+		func1, func2 = (lambda o: o['name'] == 'Bob'), (lambda o: o['name'] == 'Carl')
+		self.assertEqual(self.conn.search(func1), [self.id2])
+		self.assertEqual(self.conn.search(func2), [self.id3])
+
+	def testLambdaInOtherSearchMethods(self):
+		"""Check that lambdas can be used in all search methods"""
+		self.prepareStandNoList()
+		self.assertEqual(self.conn.searchCount(lambda o: o['phone'] == '1111'), 2)
+		self.assertTrue(self.conn.searchExists(lambda o: o['age'] == '27'))
+		self.assertEqual(self.conn.searchRead(lambda o: o['age'] == '27', masks=[['name']]),
+			[self.id3, {'name': 'Carl'}])
+		if hasattr(self.conn, 'iterSearch'):
+			self.assertEqual(list(self.conn.iterSearch(lambda o: o['age'] == '27')),
+				[self.id3])
+
+	def testWrongLambda(self):
+		"""Check that lambdas, which cannot be translated, are rejected immediately"""
+		self.conn.beginAsync()
+		for func in [
+				lambda o: o['age'],
+				lambda o: o['age'] + 1 > 2,
+				lambda o: o['age'] == o['height'],
+				lambda o: o['name'].startswith('A'),
+				lambda o: o['name'] in [],
+				lambda o: o['name'] is None,
+				lambda o, p: o['name'] == 'Alex',
+				lambda: True]:
+			self.assertRaises(brain.FormatError, self.conn.search, func)
+		self.conn.rollback()
+
+	def testLambdaWithoutSource(self):
+		"""Check that lambdas, whose source code is not available, are rejected"""
+		self.prepareStandNoList()
+		for func in [eval("lambda o: o['name'] == 'Alex'"),
+				eval(compile("lambda o: o['name'] == 'Alex'", "<stdin>", "eval"))]:
+			self.assertRaises(brain.FormatError, self.conn.search, func)
+			self.assertRaises(brain.FormatError, self.conn.searchCount, func)
+
+	def prepareStandText(self):
+		"""Prepare DB with several objects which contain texts"""
+		self.id1 = self.conn.create({'title': 'The quick brown fox',
+			'tags': ['Red fox', 'forest']})
+		self.id2 = self.conn.create({'title': 'Lazy dog sleeps all day',
+			'tags': ['dog', 'Quick dog']})
+		self.id3 = self.conn.create({'title': 'Quick dog and lazy fox', 'year': 2000})
+
+	def testConditionMatch(self):
+		"""Check full-text search by words and phrases"""
+		self.prepareStandText()
+
+		if self._connection_kwds.get('fulltext', 'none') == 'none':
+			self.assertRaises(brain.StructureError, self.conn.search,
+				['title'], op.MATCH, 'fox')
+			return
+
+		# words are found regardless of case and their order
+		res = self.conn.search(['title'], op.MATCH, 'FOX')
+		self.assertCountEqual(res, [self.id1, self.id3])
+		res = self.conn.search(['title'], op.MATCH, 'fox quick')
+		self.assertCountEqual(res, [self.id1, self.id3])
+
+		# phrases are found only as a whole
+		res = self.conn.search(['title'], op.MATCH, '"lazy dog"')
+		self.assertEqual(res, [self.id2])
+
+		res = self.conn.search(op.NOT, ['title'], op.MATCH, 'lazy')
+		self.assertEqual(res, [self.id1])
+
+	def testMatchInLists(self):
+		"""Check full-text search in list elements"""
+		if self._connection_kwds.get('fulltext', 'none') == 'none':
+			self.skipTest("Database does not have full-text index")
+
+		self.prepareStandText()
+
+		res = self.conn.search(['tags', None], op.MATCH, 'quick')
+		self.assertEqual(res, [self.id2])
+		res = self.conn.search(['tags', 0], op.MATCH, 'dog')
+		self.assertEqual(res, [self.id2])
+		res = self.conn.search([['tags', 1], op.MATCH, 'forest'], op.AND,
+			[['title'], op.MATCH, 'brown'])
+		self.assertEqual(res, [self.id1])
+
+	def testMatchAfterChanges(self):
+		"""Check that full-text index follows modification and deletion of values"""
+		if self._connection_kwds.get('fulltext', 'none') == 'none':
+			self.skipTest("Database does not have full-text index")
+
+		self.prepareStandText()
+
+		self.conn.modify(self.id1, ['title'], 'Slow turtle')
+		self.conn.insert(self.id3, ['tags', None], 'turtle')
+		self.conn.delete(self.id2)
+
+		self.assertEqual(self.conn.search(['title'], op.MATCH, 'brown'), [])
+		self.assertEqual(self.conn.search(['title'], op.MATCH, 'turtle'), [self.id1])
+		self.assertEqual(self.conn.search(['title'], op.MATCH, 'lazy'), [self.id3])
+		self.assertEqual(self.conn.search(['tags', None], op.MATCH, 'turtle'), [self.id3])
+		self.assertEqual(self.conn.searchCount(['tags', None], op.MATCH, 'dog'), 0)
+
+	def testMatchWrongValue(self):
+		"""Check that full-text search is possible only for strings"""
+		self.prepareStandText()
+		self.assertRaises(brain.FormatError, self.conn.search, ['year'], op.MATCH, 2000)
+		self.assertRaises(brain.FormatError, self.conn.search, ['title'], op.MATCH, b'fox')
+
+		# query should contain at least one word or phrase
+		for query in ['', '  ', '""', '" "']:
+			self.assertRaises(brain.FormatError, self.conn.search, ['title'], op.MATCH, query)
+
+	def testMatchPunctuation(self):
+		"""Check that punctuation and operator words in full-text query are just text"""
+		if self._connection_kwds.get('fulltext', 'none') == 'none':
+			self.skipTest("Database does not have full-text index")
+
+		id1 = self.conn.create({'title': 'foo-bar: C++ AND title:baz'})
+		id2 = self.conn.create({'title': 'Bar, and "foo"'})
+		id3 = self.conn.create({'title': 'Something else'})
+
+		# {query: expected results}
+		queries = {
+			'foo-bar': [id1], 'title:baz': [id1], 'C++': [id1], '"C++ and"': [id1],
+			'AND': [id1, id2], '(foo': [id1, id2], 'bar*': [id1, id2], '"foo"bar': [id1, id2],
+			'NOT': [], '"unbalanced': []
+		}
+		for query, expected in queries.items():
+			res = self.conn.search(['title'], op.MATCH, query)
+			self.assertCountEqual(res, expected)
+
+			# query is also used in conjunctions, which require estimates
+			res = self.conn.search([['title'], op.MATCH, query], op.AND,
+				[op.NOT, ['title'], op.EQ, 'x'])
+			self.assertCountEqual(res, expected)
+
+		res = self.conn.search(op.NOT, ['title'], op.MATCH, 'C++')
+		self.assertCountEqual(res, [id2, id3])
+
+# global variable for lambda tests
+PHONE = '1111'
+
 
 def suite(engine_params, connection_generator):
 	res = helpers.NamedTestSuite('search')
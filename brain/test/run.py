@@ -27,6 +27,12 @@ parser.add_option("-a", "--actions", action="store", type="int", default=100,
 parser.add_option("-s", "--seed", action="store", type="int", default=0,
 	dest="seed", help="[fuzz] starting seed for random number generator")
 
+parser.add_option("-b", "--benchmark", action="store", type="choice", default=None,
+	choices=sorted(perf.BENCHMARKS.keys()),
+	dest="benchmark", help="[perf] run given benchmark instead of default performance tests")
+parser.add_option("--sizes", action="store", type="string", default=None,
+	dest="sizes", help="[perf] comma-separated list of database sizes for benchmark")
+
 parser.add_option("-v", "--verbosity", action="store", type="int", default=2,
 	dest="verbosity", help="verbosity level, 0-3")
 
@@ -56,4 +62,8 @@ elif mode == 'fuzz':
 elif mode == 'doc':
 	doc.runDocTest(verbosity=opts.verbosity)
 elif mode == 'perf':
-	perf.runPerformanceTests(verbosity=opts.verbosity)
+	if opts.benchmark is not None:
+		sizes = None if opts.sizes is None else [int(x) for x in opts.sizes.split(',')]
+		perf.runBenchmark(opts.benchmark, sizes=sizes, verbosity=opts.verbosity)
+	else:
+		perf.runPerformanceTests(verbosity=opts.verbosity)